@@ -0,0 +1,385 @@
+"""
+API HTTP JSON de El Cruce Analyzer, independiente de Streamlit
+
+Expone los datos de las etapas, perfiles interpolados, predicciones de tiempo
+y pace y los cortes. Es una aplicación ASGI sin framework:
+
+    uvicorn api:app --workers 4
+"""
+
+import hashlib
+import json
+import math
+from collections import OrderedDict
+from urllib.parse import parse_qsl
+
+import numpy as np
+
+from data.catalogo import CAMPOS_NUMERICOS, catalogo
+from data.etapas import ETAPAS, RESUMEN_EVENTO
+from data.modelo import modelo_etapa
+from utils.calculadora import (
+    calcular_tiempo_estimado,
+    calcular_pace_necesario,
+    tiempo_limite_etapa,
+    formato_tiempo
+)
+from utils.cortes import barreras_corte
+from utils.mapa import piramide_etapa, puntos_interes, ruta_para_zoom
+from utils.perfiles import interpolar_altitudes, pace_plano_equivalente, tiempo_hasta_km
+
+TAMANO_CACHE = 4096
+MAX_CONSULTAS_LOTE = 1000
+MAX_RESULTADOS_CATALOGO = 500
+MAX_PUNTOS_PERFIL = 10_000
+
+
+class ErrorApi(Exception):
+    """Error de la API con su código HTTP."""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.mensaje = mensaje
+
+
+def _numero(parametros, nombre, defecto=None):
+    valor = parametros.get(nombre, defecto)
+    if valor is None:
+        raise ErrorApi(400, f"Falta el parámetro '{nombre}'")
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise ErrorApi(400, f"El parámetro '{nombre}' debe ser numérico")
+    if not math.isfinite(numero):
+        raise ErrorApi(400, f"El parámetro '{nombre}' debe ser un número finito")
+    return numero
+
+
+def _etapa(numero):
+    try:
+        indice = int(numero) - 1
+    except ValueError:
+        raise ErrorApi(404, "Etapa inexistente")
+    if not 0 <= indice < len(ETAPAS):
+        raise ErrorApi(404, "Etapa inexistente")
+    return ETAPAS[indice]
+
+
+def _resumen_etapa(numero, etapa):
+    compilada = modelo_etapa(etapa)
+    return {
+        "numero": numero,
+        "nombre": etapa["nombre"],
+        "distancia_km": etapa["distancia_km"],
+        "desnivel_positivo": etapa["desnivel_positivo"],
+        "intensidad_m_km": compilada.intensidad_m_km,
+        "inicio": etapa["inicio"],
+        "fin": etapa["fin"],
+        "oasis": etapa["oasis"],
+        "caracteristicas": etapa["caracteristicas"],
+        "tiempo_limite_horas": compilada.tiempo_limite_horas,
+    }
+
+
+# Manejadores: reciben los segmentos variables de la ruta y los parámetros
+
+def listar_etapas(parametros):
+    return {
+        "evento": RESUMEN_EVENTO,
+        "etapas": [_resumen_etapa(i + 1, e) for i, e in enumerate(ETAPAS)],
+    }
+
+
+def detalle_etapa(parametros, numero):
+    etapa = _etapa(numero)
+    return {**_resumen_etapa(int(numero), etapa), "perfil": etapa["perfil"]}
+
+
+def perfil_etapa(parametros, numero):
+    etapa = _etapa(numero)
+    paso = _numero(parametros, "paso_km", 0.5)
+    if paso <= 0:
+        raise ErrorApi(400, "'paso_km' debe ser positivo")
+    if etapa["distancia_km"] / paso > MAX_PUNTOS_PERFIL:
+        raise ErrorApi(400, f"'paso_km' debe ser al menos {etapa['distancia_km'] / MAX_PUNTOS_PERFIL:g} "
+                            f"(máximo {MAX_PUNTOS_PERFIL:,} puntos)")
+    kms = np.append(np.arange(0, etapa["distancia_km"], paso), etapa["distancia_km"])
+    return {
+        "km": np.round(kms, 3).tolist(),
+        "altitud": np.round(interpolar_altitudes(etapa["perfil"], kms), 1).tolist(),
+    }
+
+
+def cortes_etapa(parametros, numero):
+    etapa = _etapa(numero)
+    limite = _numero(parametros, "tiempo_limite_min_km", RESUMEN_EVENTO["tiempo_limite_min_km"])
+    return {"barreras": barreras_corte(etapa, limite)}
+
+
+def prediccion_etapa(parametros, numero):
+    etapa = _etapa(numero)
+    pace = _numero(parametros, "pace")
+    if pace <= 0:
+        raise ErrorApi(400, "'pace' debe ser positivo")
+    pace_plano = pace_plano_equivalente(etapa, pace)
+    barreras = barreras_corte(etapa)
+    llegadas = tiempo_hasta_km(etapa["perfil"], [b["km"] for b in barreras], pace_plano)
+    return {
+        "pace_promedio": pace,
+        "pace_plano": float(pace_plano),
+        "puntos": [
+            {
+                "nombre": b["nombre"],
+                "km": b["km"],
+                "llegada_min": float(llegada),
+                "limite_min": b["limite_min"],
+                "margen_min": float(b["limite_min"] - llegada),
+            }
+            for b, llegada in zip(barreras, llegadas)
+        ],
+    }
+
+
+def ruta_etapa(parametros, numero):
+    etapa = _etapa(numero)
+    piramide = piramide_etapa(int(numero) - 1, etapa["distancia_km"])
+    if piramide is None:
+        raise ErrorApi(404, "No hay track GPS para esta etapa")
+    ruta = ruta_para_zoom(piramide, _numero(parametros, "zoom", 12))
+    return {
+        "km": np.round(ruta["km"], 3).tolist(),
+        "lat": np.round(ruta["lat"], 6).tolist(),
+        "lon": np.round(ruta["lon"], 6).tolist(),
+        "puntos": puntos_interes(etapa, piramide),
+    }
+
+
+def buscar_catalogo(parametros):
+    rangos = {}
+    for campo in CAMPOS_NUMERICOS:
+        limites = tuple(
+            _numero(parametros, f"{campo}_{extremo}") if f"{campo}_{extremo}" in parametros else None
+            for extremo in ("min", "max")
+        )
+        if limites != (None, None):
+            rangos[campo] = limites
+    orden = parametros.get("orden")
+    if orden is not None and orden not in CAMPOS_NUMERICOS:
+        raise ErrorApi(400, f"'orden' debe ser uno de: {', '.join(CAMPOS_NUMERICOS)}")
+    k = int(_numero(parametros, "k", MAX_RESULTADOS_CATALOGO))
+    if not 1 <= k <= MAX_RESULTADOS_CATALOGO:
+        raise ErrorApi(400, f"'k' debe estar entre 1 y {MAX_RESULTADOS_CATALOGO}")
+    return {
+        "etapas": catalogo.buscar(
+            **rangos, region=parametros.get("region"), evento=parametros.get("evento"), orden=orden, k=k
+        )
+    }
+
+
+def detalle_catalogo(parametros, id_etapa):
+    try:
+        fila = catalogo.fila(id_etapa)
+    except KeyError:
+        raise ErrorApi(404, "Etapa inexistente en el catálogo")
+    try:
+        etapa = catalogo.cargar_etapa(id_etapa)
+    except FileNotFoundError:
+        raise ErrorApi(404, "Etapa inexistente en el catálogo")
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        # Archivo ilegible, JSON corrupto (json.JSONDecodeError) o datos que
+        # no pasan la validación (DatosInvalidos)
+        raise ErrorApi(500, "Los datos de la etapa en el catálogo están dañados")
+    return {**fila, **_resumen_etapa(fila["numero"], etapa), "perfil": etapa["perfil"]}
+
+
+def tiempo(parametros):
+    horas = calcular_tiempo_estimado(_numero(parametros, "distancia_km"), _numero(parametros, "pace"))
+    return {"horas": horas, "formato": formato_tiempo(horas)}
+
+
+def pace(parametros):
+    distancia = _numero(parametros, "distancia_km")
+    if distancia <= 0:
+        raise ErrorApi(400, "'distancia_km' debe ser positiva")
+    horas = _numero(parametros, "tiempo_horas")
+    if horas <= 0:
+        raise ErrorApi(400, "'tiempo_horas' debe ser positivo")
+    return {"pace": calcular_pace_necesario(distancia, horas)}
+
+
+def limite(parametros):
+    distancia = _numero(parametros, "distancia_km")
+    limite_min_km = _numero(parametros, "tiempo_limite_min_km", RESUMEN_EVENTO["tiempo_limite_min_km"])
+    horas = tiempo_limite_etapa(distancia, limite_min_km)
+    respuesta = {"horas": horas, "formato": formato_tiempo(horas)}
+    if "tiempo_horas" in parametros:
+        respuesta["cumple"] = _numero(parametros, "tiempo_horas") <= horas
+    return respuesta
+
+
+RUTAS = {
+    ("etapas",): listar_etapas,
+    ("etapas", None): detalle_etapa,
+    ("etapas", None, "perfil"): perfil_etapa,
+    ("etapas", None, "cortes"): cortes_etapa,
+    ("etapas", None, "prediccion"): prediccion_etapa,
+    ("etapas", None, "ruta"): ruta_etapa,
+    ("catalogo",): buscar_catalogo,
+    ("catalogo", None): detalle_catalogo,
+    ("tiempo",): tiempo,
+    ("pace",): pace,
+    ("limite",): limite,
+}
+
+
+def resolver(ruta, parametros):
+    """
+    Ejecuta la consulta de una ruta.
+
+    Args:
+        ruta: Ruta de la consulta, por ejemplo "/etapas/1/perfil"
+        parametros: Dict de parámetros
+
+    Returns:
+        Dict con la respuesta
+    """
+    segmentos = tuple(s for s in ruta.strip("/").split("/") if s)
+    for patron, manejador in RUTAS.items():
+        if len(patron) != len(segmentos):
+            continue
+        variables = []
+        for esperado, segmento in zip(patron, segmentos):
+            if esperado is None:
+                variables.append(segmento)
+            elif esperado != segmento:
+                break
+        else:
+            return manejador(parametros, *variables)
+    raise ErrorApi(404, "Ruta inexistente")
+
+
+def lote(consultas):
+    """
+    Resuelve varias consultas en una sola petición.
+
+    Args:
+        consultas: Lista de dicts con "ruta" y "parametros"
+
+    Returns:
+        Lista de dicts con "estado" y "respuesta" o "error"
+    """
+    if not isinstance(consultas, list) or len(consultas) > MAX_CONSULTAS_LOTE:
+        raise ErrorApi(400, f"'consultas' debe ser una lista de hasta {MAX_CONSULTAS_LOTE} elementos")
+    catalogo.refrescar()
+    resultados = []
+    for consulta in consultas:
+        try:
+            respuesta = resolver(consulta["ruta"], consulta.get("parametros", {}))
+            resultados.append({"estado": 200, "respuesta": respuesta})
+        except ErrorApi as e:
+            resultados.append({"estado": e.estado, "error": e.mensaje})
+        except (KeyError, TypeError, AttributeError):
+            resultados.append({"estado": 400, "error": "Consulta mal formada"})
+    return resultados
+
+
+class CacheRespuestas:
+    """
+    Caché LRU de respuestas serializadas con su ETag.
+    """
+
+    def __init__(self, tamano=TAMANO_CACHE):
+        self.tamano = tamano
+        self._datos = OrderedDict()
+
+    def obtener(self, clave, generar):
+        entrada = self._datos.get(clave)
+        if entrada is not None:
+            self._datos.move_to_end(clave)
+            return entrada
+        cuerpo = _serializar(generar())
+        entrada = (cuerpo, '"' + hashlib.blake2b(cuerpo, digest_size=12).hexdigest() + '"')
+        self._datos[clave] = entrada
+        if len(self._datos) > self.tamano:
+            self._datos.popitem(last=False)
+        return entrada
+
+
+def _serializar(datos):
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+cache = CacheRespuestas()
+
+
+async def _enviar(send, estado, cuerpo, etag=None):
+    encabezados = [
+        (b"content-type", b"application/json; charset=utf-8"),
+        (b"content-length", str(len(cuerpo)).encode()),
+    ]
+    if etag:
+        encabezados.append((b"etag", etag.encode()))
+        encabezados.append((b"cache-control", b"public, max-age=300"))
+    await send({"type": "http.response.start", "status": estado, "headers": encabezados})
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+async def _leer_cuerpo(receive):
+    partes = []
+    while True:
+        mensaje = await receive()
+        partes.append(mensaje.get("body", b""))
+        if not mensaje.get("more_body"):
+            return b"".join(partes)
+
+
+async def app(scope, receive, send):
+    """Aplicación ASGI."""
+    if scope["type"] == "lifespan":
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif mensaje["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    ruta = scope["path"]
+    metodo = scope["method"]
+
+    try:
+        if ruta.rstrip("/") == "/lote":
+            if metodo != "POST":
+                raise ErrorApi(405, "Usar POST")
+            try:
+                consultas = json.loads(await _leer_cuerpo(receive))["consultas"]
+            except (ValueError, KeyError, TypeError):
+                raise ErrorApi(400, "Se esperaba un JSON con 'consultas'")
+            await _enviar(send, 200, _serializar({"resultados": lote(consultas)}))
+            return
+
+        if metodo not in ("GET", "HEAD"):
+            raise ErrorApi(405, "Usar GET")
+
+        consulta = scope["query_string"].decode("latin-1")
+        clave = (ruta, consulta)
+        if ruta.strip("/").split("/")[0] == "catalogo":
+            # El catálogo puede crecer desde otro proceso: la versión del
+            # índice entra en la clave y las respuestas viejas quedan sin uso
+            catalogo.refrescar()
+            clave += (catalogo.version,)
+        cuerpo, etag = cache.obtener(
+            clave,
+            lambda: resolver(ruta, dict(parse_qsl(consulta)))
+        )
+    except ErrorApi as e:
+        await _enviar(send, e.estado, _serializar({"error": e.mensaje}))
+        return
+
+    for nombre, valor in scope["headers"]:
+        if nombre == b"if-none-match" and etag.encode() in valor:
+            await _enviar(send, 304, b"", etag)
+            return
+
+    await _enviar(send, 200, b"" if metodo == "HEAD" else cuerpo, etag)
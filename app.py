@@ -1,5 +1,9 @@
 import streamlit as st
 
+# Compila y valida los datos de las etapas al arrancar
+from data.modelo import EVENTO
+from utils.memoria import perfilar_pagina
+
 # Configuración de la página
 st.set_page_config(
     page_title="El Cruce Analyzer",
@@ -7,6 +11,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+perfilar_pagina(__file__)
 
 # Header
 st.title("🏔️ El Cruce Saucony 2025 - Analyzer")
@@ -18,16 +23,16 @@ st.divider()
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    st.metric("📏 Distancia Total", "~93 km")
-    st.metric("📅 Etapas", "3 días")
+    st.metric("📏 Distancia Total", f"~{EVENTO.distancia_total_km:.0f} km")
+    st.metric("📅 Etapas", f"{len(EVENTO.etapas)} días")
 
 with col2:
-    st.metric("⛰️ Desnivel Total", "+4,400m")
+    st.metric("⛰️ Desnivel Total", f"+{EVENTO.desnivel_total_positivo:,.0f}m")
     st.metric("🏕️ Campamentos", "2")
 
 with col3:
-    st.metric("⏱️ Tiempo Límite", "15 min/km")
-    st.metric("💧 Oasis", "7 puntos")
+    st.metric("⏱️ Tiempo Límite", f"{EVENTO.tiempo_limite_min_km:g} min/km")
+    st.metric("💧 Oasis", f"{EVENTO.num_oasis} puntos")
 
 st.divider()
 
@@ -63,6 +68,12 @@ Usa el menú del sidebar para navegar entre las diferentes secciones:
 - **📈 Comparativa:** Compara las 3 etapas (próximamente)
 - **⚡ Calculadora de Pace:** Calcula tiempos y estrategia (próximamente)
 - **🤖 Asistente IA:** Asistente personalizado con OpenAI (próximamente)
+- **📡 Seguimiento en Vivo:** Tiempos estimados de llegada de todo el pelotón en carrera
+- **🗺️ Mapa del Recorrido:** Trazado de las etapas con oasis y campamentos
+- **🚦 Olas de Largada:** Congestión en senderos angostos y reparto del pelotón en olas
+- **💧 Abastecimiento de Oasis:** Llegadas, agua, comida y voluntarios por oasis
+- **🔎 Rutas Similares:** Tus rutas de entrenamiento más parecidas a cada tramo de carrera
+- **🧠 Memoria del Servidor:** Depuración de memoria por módulo, página y sesión (`PERFIL_MEMORIA=1`)
 """)
 
 st.divider()
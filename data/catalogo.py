@@ -0,0 +1,328 @@
+"""
+Catálogo de carreras, ediciones y etapas para El Cruce Analyzer
+
+Al arrancar sólo se lee el índice (una fila chica por etapa con distancia,
+desnivel, intensidad y región); el perfil y los oasis de cada etapa están
+en su propio archivo y se leen recién cuando se eligen. Las consultas por
+rango usan los valores ordenados de cada columna, así filtrar cientos de
+recorridos no recorre ni carga ninguno. El Cruce 2025 de data/etapas.py
+está siempre incluido.
+
+Estructura en disco:
+
+    data/catalogo/indice.json          filas del índice
+    data/catalogo/etapas/<id>.json     datos completos de cada etapa
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+from data.etapas import ETAPAS
+from data.modelo import compilar_etapa, olvidar_etapa, registrar_etapa
+from utils.calculadora import mayores
+
+load_dotenv()
+
+CARPETA_CATALOGO = os.getenv("CATALOGO_CARPETA", str(Path(__file__).parent / "catalogo"))
+TAMANO_CACHE_ETAPAS = 64
+
+EVENTO_INTEGRADO = "El Cruce Saucony"
+EDICION_INTEGRADA = 2025
+REGION_INTEGRADA = "Neuquén"
+CAMPOS_NUMERICOS = ("distancia_km", "desnivel_positivo", "intensidad_m_km")
+
+
+def id_etapa(evento, edicion, numero):
+    """Identificador estable de una etapa: "el-cruce-saucony-2025-1"."""
+    base = re.sub(r"[^a-z0-9]+", "-", evento.lower()).strip("-")
+    return f"{base}-{edicion}-{numero}"
+
+
+def fila_indice(etapa, evento, edicion, numero, region):
+    """
+    Fila del índice de una etapa.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        evento: Nombre de la carrera
+        edicion: Año de la edición
+        numero: Número de etapa (desde 1)
+        region: Región del recorrido
+
+    Returns:
+        Dict con "id", "evento", "edicion", "numero", "nombre", "region",
+        "distancia_km", "desnivel_positivo" e "intensidad_m_km"
+    """
+    return {
+        "id": id_etapa(evento, edicion, numero),
+        "evento": evento,
+        "edicion": int(edicion),
+        "numero": int(numero),
+        "nombre": etapa["nombre"],
+        "region": region,
+        "distancia_km": float(etapa["distancia_km"]),
+        "desnivel_positivo": float(etapa["desnivel_positivo"]),
+        "intensidad_m_km": etapa["desnivel_positivo"] / etapa["distancia_km"],
+    }
+
+
+class Catalogo:
+    """
+    Índice en memoria de las etapas del catálogo con carga diferida.
+    """
+
+    def __init__(self, carpeta=CARPETA_CATALOGO):
+        """
+        Args:
+            carpeta: Carpeta del catálogo en disco (puede no existir)
+        """
+        self.carpeta = Path(carpeta)
+        self._lock = threading.Lock()
+        self._cargadas = OrderedDict()
+        self._integradas = {}
+        # Cambia cada vez que cambia el índice (sirve de clave de caché)
+        self.version = 0
+
+        self._filas_integradas = []
+        for numero, etapa in enumerate(ETAPAS, start=1):
+            fila = fila_indice(etapa, EVENTO_INTEGRADO, EDICION_INTEGRADA, numero, REGION_INTEGRADA)
+            self._integradas[fila["id"]] = etapa
+            self._filas_integradas.append(fila)
+
+        self._marca = self._marca_indice()
+        self._indexar(self._filas_integradas + self._leer_indice())
+
+    def _marca_indice(self):
+        try:
+            return (self.carpeta / "indice.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _leer_indice(self):
+        archivo = self.carpeta / "indice.json"
+        if not archivo.exists():
+            return []
+        return [f for f in json.loads(archivo.read_text(encoding="utf-8")) if f["id"] not in self._integradas]
+
+    def _olvidar_cargadas(self):
+        for etapa in self._cargadas.values():
+            olvidar_etapa(etapa)
+        self._cargadas.clear()
+
+    def refrescar(self):
+        """
+        Vuelve a leer el índice si otro proceso lo modificó.
+
+        Returns:
+            True si el índice cambió
+        """
+        if self._marca_indice() == self._marca:
+            return False
+        with self._lock:
+            marca = self._marca_indice()
+            if marca == self._marca:
+                return False
+            filas = self._filas_integradas + self._leer_indice()
+            self._olvidar_cargadas()
+            self._indexar(filas)
+            self._marca = marca
+            self.version += 1
+        return True
+
+    def _indexar(self, filas):
+        """Arma los índices: columnas ordenadas, regiones y ediciones."""
+        self.filas = filas
+        self._posicion = {f["id"]: i for i, f in enumerate(filas)}
+        self._columnas = {}
+        self._ordenados = {}
+        for campo in CAMPOS_NUMERICOS:
+            valores = np.array([f[campo] for f in filas], dtype=np.float64)
+            orden = np.argsort(valores, kind="stable")
+            self._columnas[campo] = valores
+            self._ordenados[campo] = (valores[orden], orden)
+        self._regiones = {}
+        self._ediciones = {}
+        for i, fila in enumerate(filas):
+            self._regiones.setdefault(fila["region"].casefold(), []).append(i)
+            self._ediciones.setdefault((fila["evento"], fila["edicion"]), []).append(i)
+        for posiciones in self._ediciones.values():
+            posiciones.sort(key=lambda i: filas[i]["numero"])
+
+    def _rango(self, campo, minimo, maximo):
+        valores, orden = self._ordenados[campo]
+        desde = 0 if minimo is None else np.searchsorted(valores, minimo, side="left")
+        hasta = len(valores) if maximo is None else np.searchsorted(valores, maximo, side="right")
+        return np.sort(orden[desde:hasta])
+
+    def buscar(self, distancia_km=None, desnivel_positivo=None, intensidad_m_km=None, region=None,
+               evento=None, orden=None, k=None):
+        """
+        Etapas del catálogo que cumplen todos los filtros.
+
+        Args:
+            distancia_km: Tupla (mínimo, máximo); cualquiera puede ser None
+            desnivel_positivo: Tupla (mínimo, máximo) en m
+            intensidad_m_km: Tupla (mínimo, máximo) en m/km
+            region: Región (sin distinguir mayúsculas)
+            evento: Nombre de la carrera
+            orden: Campo numérico para ordenar de mayor a menor (opcional)
+            k: Cantidad máxima de resultados
+
+        Returns:
+            Lista de filas del índice (no modificarlas)
+        """
+        posiciones = None
+        rangos = {"distancia_km": distancia_km, "desnivel_positivo": desnivel_positivo,
+                  "intensidad_m_km": intensidad_m_km}
+        for campo, rango in rangos.items():
+            if rango is None:
+                continue
+            encontradas = self._rango(campo, *rango)
+            posiciones = encontradas if posiciones is None else np.intersect1d(posiciones, encontradas,
+                                                                               assume_unique=True)
+        if region:
+            encontradas = np.array(self._regiones.get(region.casefold(), []), dtype=np.int64)
+            posiciones = encontradas if posiciones is None else np.intersect1d(posiciones, encontradas)
+        if evento:
+            encontradas = np.array(
+                [i for (nombre, _), lista in self._ediciones.items() if nombre == evento for i in lista],
+                dtype=np.int64
+            )
+            posiciones = encontradas if posiciones is None else np.intersect1d(posiciones, encontradas)
+        if posiciones is None:
+            posiciones = np.arange(len(self.filas))
+
+        if orden is not None:
+            posiciones = posiciones[mayores(self._columnas[orden][posiciones], k)]
+        elif k is not None:
+            posiciones = posiciones[:k]
+        return [self.filas[i] for i in posiciones]
+
+    def ediciones(self):
+        """
+        Carreras y ediciones del catálogo.
+
+        Returns:
+            Lista de dicts con "evento", "edicion", "region" y "etapas"
+            (cantidad), ordenada por evento y edición más reciente
+        """
+        resumen = [
+            {"evento": evento, "edicion": edicion, "region": self.filas[lista[0]]["region"], "etapas": len(lista)}
+            for (evento, edicion), lista in self._ediciones.items()
+        ]
+        return sorted(resumen, key=lambda e: (e["evento"] != EVENTO_INTEGRADO, e["evento"], -e["edicion"]))
+
+    def regiones(self):
+        """Regiones con al menos una etapa, en orden alfabético."""
+        return sorted({f["region"] for f in self.filas})
+
+    def etapas_edicion(self, evento, edicion):
+        """Filas del índice de una edición, por número de etapa."""
+        return [self.filas[i] for i in self._ediciones.get((evento, int(edicion)), [])]
+
+    def fila(self, id_etapa):
+        """
+        Fila del índice de una etapa.
+
+        Raises:
+            KeyError: Si la etapa no está en el catálogo
+        """
+        return self.filas[self._posicion[id_etapa]]
+
+    def cargar_etapa(self, id_etapa):
+        """
+        Datos completos de una etapa, leídos del disco la primera vez.
+
+        Args:
+            id_etapa: Identificador de la fila del índice
+
+        Returns:
+            Dict con datos de la etapa (mismo formato que data/etapas.py)
+
+        Raises:
+            KeyError: Si la etapa no está en el catálogo
+            DatosInvalidos: Si el archivo de la etapa no pasa la validación
+        """
+        if id_etapa in self._integradas:
+            return self._integradas[id_etapa]
+        fila = self.fila(id_etapa)
+        with self._lock:
+            etapa = self._cargadas.get(id_etapa)
+            if etapa is not None:
+                self._cargadas.move_to_end(id_etapa)
+                return etapa
+
+        datos = json.loads((self.carpeta / "etapas" / f"{id_etapa}.json").read_text(encoding="utf-8"))
+        datos["perfil"] = [tuple(punto) for punto in datos["perfil"]]
+        compilada = compilar_etapa(datos, fila["numero"])
+
+        with self._lock:
+            # Otro hilo pudo cargarla mientras tanto: se usa la suya
+            cargada = self._cargadas.get(id_etapa)
+            if cargada is not None:
+                return cargada
+            registrar_etapa(datos, compilada)
+            self._cargadas[id_etapa] = datos
+            if len(self._cargadas) > TAMANO_CACHE_ETAPAS:
+                olvidar_etapa(self._cargadas.popitem(last=False)[1])
+        return datos
+
+    def cargar_edicion(self, evento, edicion):
+        """Datos completos de todas las etapas de una edición."""
+        return [self.cargar_etapa(f["id"]) for f in self.etapas_edicion(evento, edicion)]
+
+    def agregar_edicion(self, evento, edicion, region, etapas):
+        """
+        Guarda en disco las etapas de una edición y las suma al índice.
+
+        Args:
+            evento: Nombre de la carrera
+            edicion: Año de la edición
+            region: Región del recorrido
+            etapas: Lista de dicts con datos de etapas (formato de data/etapas.py)
+
+        Returns:
+            Lista de filas del índice agregadas
+
+        Raises:
+            DatosInvalidos: Si alguna etapa no pasa la validación
+            ValueError: Si es la edición integrada de data/etapas.py
+        """
+        if (evento, int(edicion)) == (EVENTO_INTEGRADO, EDICION_INTEGRADA):
+            raise ValueError("La edición integrada se edita en data/etapas.py")
+        for numero, etapa in enumerate(etapas, start=1):
+            compilar_etapa(etapa, numero)
+
+        carpeta_etapas = self.carpeta / "etapas"
+        carpeta_etapas.mkdir(parents=True, exist_ok=True)
+        nuevas = [fila_indice(e, evento, edicion, n, region) for n, e in enumerate(etapas, start=1)]
+        for fila, etapa in zip(nuevas, etapas):
+            _escribir_json(carpeta_etapas / f"{fila['id']}.json", etapa)
+
+        with self._lock:
+            # Reemplaza la edición completa si ya estaba
+            filas = [f for f in self.filas if (f["evento"], f["edicion"]) != (evento, int(edicion))] + nuevas
+            self._olvidar_cargadas()
+            _escribir_json(self.carpeta / "indice.json",
+                           [f for f in filas if f["id"] not in self._integradas])
+            self._indexar(filas)
+            self._marca = self._marca_indice()
+            self.version += 1
+        return nuevas
+
+
+def _escribir_json(archivo, datos):
+    # Escritura atómica: un lector nunca ve un archivo a medias
+    temporal = archivo.with_suffix(f".{os.getpid()}.tmp")
+    temporal.write_text(json.dumps(datos, ensure_ascii=False), encoding="utf-8")
+    os.replace(temporal, archivo)
+
+
+catalogo = Catalogo()
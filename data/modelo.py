@@ -0,0 +1,229 @@
+"""
+Modelo compilado y validado de los datos de El Cruce Saucony 2025
+
+Convierte los dicts de data/etapas.py en dataclasses inmutables con
+__slots__ y perfiles en arrays de numpy. Se valida una sola vez al importar
+el módulo, así un dato mal cargado falla al arrancar y no dentro de una
+página, y los campos derivados (intensidad, tiempo límite, altitudes
+extremas) se calculan una única vez.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from data.etapas import ETAPAS, RESUMEN_EVENTO
+
+
+@dataclass(frozen=True, slots=True)
+class Oasis:
+    nombre: str
+    km: float
+
+
+@dataclass(frozen=True, slots=True)
+class Perfil:
+    kms: np.ndarray
+    altitudes: np.ndarray
+    altitud_minima: float
+    altitud_maxima: float
+
+
+@dataclass(frozen=True, slots=True)
+class Etapa:
+    numero: int
+    nombre: str
+    distancia_km: float
+    desnivel_positivo: float
+    inicio: str
+    fin: str
+    caracteristicas: str
+    oasis: tuple
+    perfil: Perfil
+    intensidad_m_km: float
+    tiempo_limite_horas: float
+
+
+@dataclass(frozen=True, slots=True)
+class Evento:
+    nombre: str
+    etapas: tuple
+    distancia_total_km: float
+    desnivel_total_positivo: float
+    tiempo_limite_min_km: float
+    num_oasis: int
+
+
+class DatosInvalidos(ValueError):
+    """Los datos de las etapas no pasan la validación."""
+
+
+def _compilar_perfil(puntos):
+    datos = np.asarray(puntos, dtype=np.float64)
+    kms, altitudes = datos[:, 0].copy(), datos[:, 1].copy()
+    kms.flags.writeable = False
+    altitudes.flags.writeable = False
+    return Perfil(kms, altitudes, float(altitudes.min()), float(altitudes.max()))
+
+
+def _validar_etapa(etapa, numero):
+    errores = []
+    nombre = etapa.get("nombre", f"Etapa {numero}")
+    distancia = etapa["distancia_km"]
+    if distancia <= 0:
+        errores.append(f"{nombre}: distancia no positiva ({distancia})")
+    if etapa["desnivel_positivo"] < 0:
+        errores.append(f"{nombre}: desnivel positivo negativo")
+
+    perfil = etapa["perfil"]
+    if len(perfil) < 2:
+        errores.append(f"{nombre}: el perfil necesita al menos dos puntos")
+    else:
+        kms = np.array([punto[0] for punto in perfil], dtype=np.float64)
+        if np.any(np.diff(kms) <= 0):
+            errores.append(f"{nombre}: los km del perfil no son estrictamente crecientes")
+        if kms[0] != 0 or kms[-1] != distancia:
+            errores.append(
+                f"{nombre}: el perfil va del km {kms[0]:g} al {kms[-1]:g} y la etapa tiene {distancia:g} km"
+            )
+
+    kms_oasis = [o["km"] for o in etapa["oasis"]]
+    if any(not 0 < km < distancia for km in kms_oasis):
+        errores.append(f"{nombre}: hay oasis fuera del recorrido")
+    if kms_oasis != sorted(kms_oasis):
+        errores.append(f"{nombre}: los oasis no están ordenados por km")
+    return errores
+
+
+def compilar_etapa(etapa, numero, tiempo_limite_min_km=15):
+    """
+    Compila el dict de una etapa.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        numero: Número de etapa (desde 1)
+        tiempo_limite_min_km: Tiempo límite en min/km
+
+    Returns:
+        Etapa
+
+    Raises:
+        DatosInvalidos
+    """
+    errores = _validar_etapa(etapa, numero)
+    if errores:
+        raise DatosInvalidos("; ".join(errores))
+    return Etapa(
+        numero=numero,
+        nombre=etapa["nombre"],
+        distancia_km=float(etapa["distancia_km"]),
+        desnivel_positivo=float(etapa["desnivel_positivo"]),
+        inicio=etapa["inicio"],
+        fin=etapa["fin"],
+        caracteristicas=etapa["caracteristicas"],
+        oasis=tuple(Oasis(o["nombre"], float(o["km"])) for o in etapa["oasis"]),
+        perfil=_compilar_perfil(etapa["perfil"]),
+        intensidad_m_km=etapa["desnivel_positivo"] / etapa["distancia_km"],
+        tiempo_limite_horas=etapa["distancia_km"] * tiempo_limite_min_km / 60,
+    )
+
+
+def compilar_evento(etapas, resumen):
+    """
+    Compila y valida todas las etapas y los totales del evento.
+
+    Args:
+        etapas: Lista de dicts con datos de etapas
+        resumen: Dict con el resumen del evento
+
+    Returns:
+        Evento
+
+    Raises:
+        DatosInvalidos: con todos los problemas encontrados
+    """
+    errores = []
+    for numero, etapa in enumerate(etapas, start=1):
+        errores.extend(_validar_etapa(etapa, numero))
+
+    nombres = [e["nombre"] for e in etapas]
+    if len(set(nombres)) != len(nombres):
+        errores.append("Hay etapas con nombres repetidos")
+
+    totales = (
+        ("num_etapas", len(etapas)),
+        ("num_oasis", sum(len(e["oasis"]) for e in etapas)),
+        ("distancia_total_km", sum(e["distancia_km"] for e in etapas)),
+        ("desnivel_total_positivo", sum(e["desnivel_positivo"] for e in etapas)),
+    )
+    for clave, calculado in totales:
+        if clave in resumen and resumen[clave] != calculado:
+            errores.append(f"Resumen del evento: {clave} es {resumen[clave]} y las etapas suman {calculado}")
+
+    if errores:
+        raise DatosInvalidos("; ".join(errores))
+
+    limite = resumen["tiempo_limite_min_km"]
+    compiladas = tuple(compilar_etapa(e, i, limite) for i, e in enumerate(etapas, start=1))
+    for etapa, compilada in zip(etapas, compiladas):
+        _COMPILADAS[id(etapa)] = (etapa, compilada)
+    return Evento(
+        nombre=resumen["nombre"],
+        etapas=compiladas,
+        distancia_total_km=float(sum(e.distancia_km for e in compiladas)),
+        desnivel_total_positivo=float(sum(e.desnivel_positivo for e in compiladas)),
+        tiempo_limite_min_km=float(limite),
+        num_oasis=sum(len(e.oasis) for e in compiladas),
+    )
+
+
+# Etapas compiladas por id del dict de origen (se guarda el dict para que el
+# id no pueda reutilizarse)
+_COMPILADAS = {}
+
+
+def registrar_etapa(etapa, compilada):
+    """
+    Registra la versión compilada de un dict de etapa cargado después del
+    arranque (por ejemplo desde el catálogo) para no recompilarla.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        compilada: Etapa de compilar_etapa()
+    """
+    _COMPILADAS[id(etapa)] = (etapa, compilada)
+
+
+def olvidar_etapa(etapa):
+    """
+    Quita una etapa de registrar_etapa() cuando deja de usarse, para que el
+    registro no crezca con cada dict cargado.
+
+    Args:
+        etapa: Dict con datos de la etapa
+    """
+    registrada = _COMPILADAS.get(id(etapa))
+    if registrada is not None and registrada[0] is etapa:
+        del _COMPILADAS[id(etapa)]
+
+
+def modelo_etapa(etapa):
+    """
+    Devuelve la etapa compilada que corresponde a un dict de etapa.
+
+    Los dicts de data/etapas.py ya están compilados; cualquier otro se
+    compila en el momento.
+
+    Args:
+        etapa: Dict con datos de la etapa
+
+    Returns:
+        Etapa
+    """
+    registrada = _COMPILADAS.get(id(etapa))
+    if registrada is not None:
+        return registrada[1]
+    return compilar_etapa(etapa, 0)
+
+
+EVENTO = compilar_evento(ETAPAS, RESUMEN_EVENTO)
@@ -0,0 +1,125 @@
+import streamlit as st
+import sys
+import time
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+sys.path.append(str(root_path))
+
+import pandas as pd
+
+from data.etapas import ETAPAS
+from utils.segmentacion import segmentar_perfil
+from utils.similitud_rutas import buscar_similares, cargar_biblioteca
+from utils.visualizaciones import grafico_rutas_similares
+from utils.memoria import perfilar_pagina
+
+st.set_page_config(
+    page_title="Rutas Similares",
+    page_icon="🔎",
+    layout="wide"
+)
+perfilar_pagina(__file__)
+
+st.title("🔎 Rutas de Entrenamiento Similares")
+st.markdown("Encuentra en tus rutas el tramo que más se parece a una subida, bajada u ondulado de la carrera")
+
+st.divider()
+
+
+@st.cache_data(show_spinner=False)
+def biblioteca(contenidos):
+    return cargar_biblioteca(contenidos)
+
+
+col_tramo, col_biblioteca = st.columns(2)
+
+with col_tramo:
+    st.markdown("### 🏔️ Tramo de carrera")
+    etapa_idx = st.selectbox(
+        "Etapa:",
+        options=list(range(len(ETAPAS))),
+        format_func=lambda x: ETAPAS[x]["nombre"]
+    )
+    etapa = ETAPAS[etapa_idx]
+
+    segmentos = segmentar_perfil(etapa["perfil"])
+    opciones = [
+        f"{s['tipo'].capitalize()} km {s['km_inicio']:g}-{s['km_fin']:g} ({s['pendiente_media']:+.1f}%)"
+        for s in segmentos
+    ] + ["Personalizado"]
+    eleccion = st.radio("Tramo:", options=opciones)
+    if eleccion == "Personalizado":
+        km_inicio, km_fin = st.slider(
+            "Kilómetros:", 0.0, float(etapa["distancia_km"]), (0.0, min(10.0, float(etapa["distancia_km"]))), 0.5
+        )
+    else:
+        segmento = segmentos[opciones.index(eleccion)]
+        km_inicio, km_fin = segmento["km_inicio"], segmento["km_fin"]
+
+with col_biblioteca:
+    st.markdown("### 🗂️ Tus rutas")
+    archivos = st.file_uploader("Rutas GPX con altitud:", type=["gpx"], accept_multiple_files=True)
+    tipo = st.radio(
+        "Comparar:",
+        options=["altitud", "pendiente"],
+        format_func=lambda x: {"altitud": "Altitud relativa", "pendiente": "Pendiente"}[x],
+        horizontal=True
+    )
+    cantidad = st.slider("Rutas a mostrar:", 1, 10, 5)
+
+if km_fin <= km_inicio:
+    st.warning("El tramo debe tener largo positivo")
+    st.stop()
+
+if not archivos:
+    st.info("Sube tus rutas de entrenamiento (GPX con altitud) para buscar las más parecidas al tramo")
+    st.stop()
+
+with st.spinner(f"Leyendo {len(archivos)} rutas..."):
+    rutas, errores = biblioteca(tuple((a.name, a.getvalue()) for a in archivos))
+
+for nombre, error in errores:
+    st.warning(f"No se pudo usar {nombre}: {error}")
+
+if not rutas:
+    st.stop()
+
+inicio = time.perf_counter()
+with st.spinner("Buscando tramos parecidos..."):
+    busqueda = buscar_similares(etapa, km_inicio, km_fin, rutas, k=cantidad, tipo=tipo)
+segundos = time.perf_counter() - inicio
+
+st.divider()
+
+if not busqueda["resultados"]:
+    st.info(f"Ninguna ruta llega a los {km_fin - km_inicio:g} km del tramo")
+    st.stop()
+
+perfiles = {nombre: (kms, altitudes) for nombre, kms, altitudes in rutas}
+coincidencias = [
+    (r["ruta"], *perfiles[r["ruta"]], r["km_inicio"]) for r in busqueda["resultados"]
+]
+st.plotly_chart(grafico_rutas_similares(etapa, km_inicio, km_fin, coincidencias), use_container_width=True)
+
+unidad = "m" if tipo == "altitud" else "%"
+st.dataframe(
+    pd.DataFrame([
+        {
+            "Ruta": r["ruta"],
+            "Desde km": round(r["km_inicio"], 2),
+            "Hasta km": round(r["km_fin"], 2),
+            f"Diferencia media ({unidad})": round(r["distancia"], 1),
+        }
+        for r in busqueda["resultados"]
+    ]),
+    hide_index=True,
+    use_container_width=True
+)
+
+descartadas = busqueda["ventanas"] - busqueda["dtw_calculados"]
+st.caption(
+    f"{busqueda['ventanas']:,} tramos candidatos en {len(rutas):,} rutas; la cota LB_Keogh descartó "
+    f"{descartadas:,} sin calcular el DTW ({segundos:.1f} s)"
+    + (f". {busqueda['rutas_cortas']} rutas son más cortas que el tramo." if busqueda["rutas_cortas"] else "")
+)
@@ -6,14 +6,24 @@ from pathlib import Path
 root_path = Path(__file__).parent.parent
 sys.path.append(str(root_path))
 
-from data.etapas import ETAPAS, RESUMEN_EVENTO
-from utils.visualizaciones import grafico_altimetria
+from data.catalogo import catalogo
+from data.etapas import RESUMEN_EVENTO
+from utils.visualizaciones import (
+    grafico_altimetria,
+    grafico_bandas_pendiente,
+    grafico_histograma_pendientes
+)
 from utils.calculadora import (
     calcular_desnivel_por_km,
     tiempo_limite_etapa,
     estimar_calorias,
     formato_tiempo
 )
+from utils.cortes import barreras_corte
+from utils.segmentacion import segmentar_perfil, describir_segmento, consejos_etapa
+from utils.pendientes import BORDES_PENDIENTE, tiempo_en_bandas, histograma_pendientes
+from utils.perfiles import pace_plano_equivalente
+from utils.memoria import perfilar_pagina
 
 # Configuración de la página
 st.set_page_config(
@@ -21,22 +31,36 @@ st.set_page_config(
     page_icon="📊",
     layout="wide"
 )
+perfilar_pagina(__file__)
 
 # Título
 st.title("📊 Análisis por Etapa")
-st.markdown("Análisis detallado de cada etapa de El Cruce Saucony 2025")
 
-st.divider()
+# Selector de carrera y etapa: sólo se cargan los datos de la etapa elegida
+ediciones = catalogo.ediciones()
+col_edicion, col_etapa = st.columns(2)
 
-# Selector de etapa
-etapa_seleccionada = st.selectbox(
-    "Selecciona una etapa:",
-    options=[0, 1, 2],
-    format_func=lambda x: f"Etapa {x+1}: {ETAPAS[x]['distancia_km']}km | +{ETAPAS[x]['desnivel_positivo']}m",
-    index=0
-)
+with col_edicion:
+    edicion = st.selectbox(
+        "Carrera:",
+        options=ediciones,
+        format_func=lambda e: f"{e['evento']} {e['edicion']} ({e['region']})"
+    )
+
+filas_etapas = catalogo.etapas_edicion(edicion["evento"], edicion["edicion"])
+
+with col_etapa:
+    fila_etapa = st.selectbox(
+        "Selecciona una etapa:",
+        options=filas_etapas,
+        format_func=lambda f: f"Etapa {f['numero']}: {f['distancia_km']:g}km | +{f['desnivel_positivo']:g}m",
+        index=0
+    )
 
-etapa = ETAPAS[etapa_seleccionada]
+etapa = catalogo.cargar_etapa(fila_etapa["id"])
+etapa_seleccionada = fila_etapa["id"]
+
+st.markdown(f"Análisis detallado de cada etapa de {edicion['evento']} {edicion['edicion']}")
 
 st.divider()
 
@@ -75,19 +99,52 @@ with col_info:
 
 with col_oasis:
     st.subheader("💧 Oasis de Hidratación")
-    for oasis in etapa['oasis']:
-        st.markdown(f"- **{oasis['nombre']}** (km {oasis['km']})")
+    for barrera in barreras_corte(etapa, RESUMEN_EVENTO["tiempo_limite_min_km"]):
+        st.markdown(
+            f"- **{barrera['nombre']}** (km {barrera['km']}) · "
+            f"corte {formato_tiempo(barrera['limite_min'] / 60)}"
+        )
 
 st.divider()
 
 # Gráfico de altimetría
 st.subheader("📈 Perfil de Altimetría")
 
-mostrar_oasis = st.checkbox("Mostrar ubicación de oasis", value=True)
+col_check1, col_check2 = st.columns(2)
+
+with col_check1:
+    mostrar_oasis = st.checkbox("Mostrar ubicación de oasis", value=True)
+
+with col_check2:
+    mostrar_segmentos = st.checkbox("Sombrear subidas y bajadas", value=True)
+
+with st.expander("⚙️ Umbrales de segmentación"):
+    col_umbral1, col_umbral2, col_umbral3 = st.columns(3)
+    with col_umbral1:
+        reversion = st.slider("Cambio de tendencia (m):", 10, 100, 30, 5)
+    with col_umbral2:
+        desnivel_minimo = st.slider("Desnivel mínimo (m):", 20, 300, 80, 10)
+    with col_umbral3:
+        pendiente_minima = st.slider("Pendiente media mínima (%):", 1.0, 10.0, 3.0, 0.5)
+
+segmentos = segmentar_perfil(
+    etapa['perfil'],
+    reversion_m=reversion,
+    desnivel_minimo_m=desnivel_minimo,
+    pendiente_minima_pct=pendiente_minima
+)
 
-fig = grafico_altimetria(etapa, mostrar_oasis=mostrar_oasis)
+fig = grafico_altimetria(
+    etapa,
+    mostrar_oasis=mostrar_oasis,
+    segmentos=segmentos if mostrar_segmentos else None
+)
 st.plotly_chart(fig, use_container_width=True)
 
+st.markdown("**Tramos de la etapa:**")
+for segmento in segmentos:
+    st.markdown(f"- {describir_segmento(segmento)}")
+
 st.divider()
 
 # Calculadora rápida
@@ -135,29 +192,39 @@ with col_calc2:
 
 st.divider()
 
+# Distribución de pendientes
+st.subheader("📐 Distribución de Pendientes")
+st.caption(f"Tiempo previsto por banda a {pace_usuario} min/km promedio, ajustado por pendiente")
+
+col_bandas1, col_bandas2 = st.columns([3, 1])
+
+with col_bandas2:
+    texto_bordes = st.text_input(
+        "Bordes de las bandas (%):",
+        value=", ".join(f"{b:g}" for b in BORDES_PENDIENTE),
+        help="Pendientes que separan las bandas, separadas por comas"
+    )
+    ancho_bin = st.select_slider("Ancho del histograma (%):", options=[0.5, 1.0, 2.0, 2.5, 5.0], value=2.5)
+
+try:
+    bordes = sorted({float(b) for b in texto_bordes.split(",") if b.strip()})
+except ValueError:
+    bordes = []
+
+with col_bandas1:
+    if not bordes:
+        st.warning("Ingresa al menos un borde numérico, por ejemplo: -10, -3, 3, 5, 10")
+    else:
+        bandas = tiempo_en_bandas(etapa, pace_plano_equivalente(etapa, pace_usuario), bordes)
+        st.plotly_chart(grafico_bandas_pendiente(bandas), use_container_width=True)
+
+centros, distancias_bin = histograma_pendientes(etapa['perfil'], ancho_bin)
+st.plotly_chart(grafico_histograma_pendientes(centros, distancias_bin, ancho_bin), use_container_width=True)
+
+st.divider()
+
 # Tips
 with st.expander("💡 Consejos para esta etapa"):
-    if etapa_seleccionada == 0:
-        st.markdown("""
-        **Etapa 1 - La más técnica:**
-        - Gestiona bien el ascenso inicial hasta los 1800m
-        - Mantén un ritmo conservador en los primeros 10km
-        - Hidratación clave en el Oasis B (km 16)
-        - Cuida las rodillas en los descensos después del km 12
-        """)
-    elif etapa_seleccionada == 1:
-        st.markdown("""
-        **Etapa 2 - La ondulada:**
-        - Múltiples subidas y bajadas, dosifica tu energía
-        - Ritmo constante, evita arranques en cada subida
-        - Descansa bien en el Campamento 1 la noche anterior
-        - Alimentación sólida importante en los oasis
-        """)
-    else:
-        st.markdown("""
-        **Etapa 3 - El gran ascenso:**
-        - Primera mitad muy exigente (ascenso continuo hasta km 16)
-        - Aprovecha el descenso final para recuperar tiempo
-        - Control en las bajadas para evitar lesiones
-        - ¡Es la última etapa, da todo pero inteligentemente!
-        """)
\ No newline at end of file
+    st.markdown(f"**{etapa['nombre']}:** {etapa['caracteristicas']}")
+    for consejo in consejos_etapa(etapa, segmentos):
+        st.markdown(f"- {consejo}")
@@ -5,22 +5,40 @@ from pathlib import Path
 root_path = Path(__file__).parent.parent
 sys.path.append(str(root_path))
 
-from data.etapas import ETAPAS, RESUMEN_EVENTO
+import pandas as pd
+
+from data.catalogo import EDICION_INTEGRADA, EVENTO_INTEGRADO, catalogo
+from data.modelo import modelo_etapa
 from utils.visualizaciones import (
     grafico_comparativo_etapas,
     grafico_desnivel_por_km,
-    grafico_altimetrias_superpuestas
+    grafico_altimetrias_superpuestas,
+    grafico_desnivel_acumulado,
+    grafico_diferencias_altitud,
+    grafico_pendiente_movil,
+    grafico_similitud
 )
 from utils.calculadora import comparar_etapas, formato_tiempo, tiempo_limite_etapa
+from utils.memoria import perfilar_pagina
 
 st.set_page_config(
     page_title="Comparativa de Etapas",
     page_icon="📈",
     layout="wide"
 )
+perfilar_pagina(__file__)
 
 st.title("📈 Comparativa de Etapas")
-st.markdown("Compara las métricas y perfiles de las 3 etapas de El Cruce Saucony 2025")
+
+edicion = st.selectbox(
+    "Carrera:",
+    options=catalogo.ediciones(),
+    format_func=lambda e: f"{e['evento']} {e['edicion']} ({e['region']}, {e['etapas']} etapas)"
+)
+ETAPAS = catalogo.cargar_edicion(edicion["evento"], edicion["edicion"])
+integrada = (edicion["evento"], edicion["edicion"]) == (EVENTO_INTEGRADO, EDICION_INTEGRADA)
+
+st.markdown(f"Compara las métricas y perfiles de las {len(ETAPAS)} etapas de {edicion['evento']} {edicion['edicion']}")
 
 st.divider()
 
@@ -45,16 +63,13 @@ with col3:
     st.subheader("📈 Más Intensa")
     etapa_intensa = comparacion["mas_desnivel_por_km"]
     st.info(f"**{etapa_intensa['nombre']}**")
-    desnivel_km = etapa_intensa['desnivel_positivo'] / etapa_intensa['distancia_km']
-    st.metric("Intensidad", f"{desnivel_km:.1f} m/km")
+    st.metric("Intensidad", f"{modelo_etapa(etapa_intensa).intensidad_m_km:.1f} m/km")
 
 st.divider()
 
 # Tabla comparativa
 st.subheader("📊 Tabla Comparativa")
 
-import pandas as pd
-
 datos_tabla = []
 for etapa in ETAPAS:
     tiempo_lim = tiempo_limite_etapa(etapa['distancia_km'])
@@ -62,7 +77,7 @@ for etapa in ETAPAS:
         "Etapa": etapa['nombre'],
         "Distancia (km)": etapa['distancia_km'],
         "Desnivel + (m)": etapa['desnivel_positivo'],
-        "Intensidad (m/km)": f"{etapa['desnivel_positivo']/etapa['distancia_km']:.1f}",
+        "Intensidad (m/km)": f"{modelo_etapa(etapa).intensidad_m_km:.1f}",
         "Tiempo Límite": formato_tiempo(tiempo_lim),
         "Oasis": len(etapa['oasis'])
     })
@@ -75,7 +90,9 @@ st.divider()
 # Gráficos comparativos
 st.subheader("📊 Comparación Visual")
 
-tab1, tab2, tab3 = st.tabs(["Distancia y Desnivel", "Intensidad", "Perfiles Superpuestos"])
+tab1, tab2, tab3, tab4 = st.tabs([
+    "Distancia y Desnivel", "Intensidad", "Perfiles Superpuestos", "Desnivel Acumulado y Similitud"
+])
 
 with tab1:
     fig1 = grafico_comparativo_etapas(ETAPAS)
@@ -86,9 +103,46 @@ with tab2:
     st.plotly_chart(fig2, use_container_width=True)
 
 with tab3:
-    fig3 = grafico_altimetrias_superpuestas(ETAPAS)
+    eje = st.radio(
+        "Eje horizontal:",
+        ["Distancia (km)", "% del recorrido"],
+        horizontal=True,
+        key="eje_superpuestas"
+    )
+    fig3 = grafico_altimetrias_superpuestas(ETAPAS, normalizado=eje == "% del recorrido")
     st.plotly_chart(fig3, use_container_width=True)
 
+    col_referencia, col_ventana = st.columns(2)
+    with col_referencia:
+        referencia = st.selectbox(
+            "Comparar contra:",
+            [e["nombre"] for e in ETAPAS],
+            key="referencia_diferencias"
+        )
+    with col_ventana:
+        ventana = st.slider("Ventana de pendiente (km):", 0.2, 3.0, 1.0, 0.2)
+    fig_diferencias = grafico_diferencias_altitud(
+        ETAPAS,
+        referencia=[e["nombre"] for e in ETAPAS].index(referencia),
+        normalizado=eje == "% del recorrido"
+    )
+    st.plotly_chart(fig_diferencias, use_container_width=True)
+    fig_pendiente = grafico_pendiente_movil(ETAPAS, ventana_km=ventana)
+    st.plotly_chart(fig_pendiente, use_container_width=True)
+
+with tab4:
+    st.caption("Con el eje en % del recorrido se comparan etapas de distinta longitud punto a punto")
+    eje_acumulado = st.radio(
+        "Eje horizontal:",
+        ["Distancia (km)", "% del recorrido"],
+        horizontal=True,
+        key="eje_acumulado"
+    )
+    fig4 = grafico_desnivel_acumulado(ETAPAS, normalizado=eje_acumulado == "% del recorrido")
+    st.plotly_chart(fig4, use_container_width=True)
+    fig5 = grafico_similitud(ETAPAS)
+    st.plotly_chart(fig5, use_container_width=True)
+
 st.divider()
 
 # Análisis estratégico
@@ -106,11 +160,19 @@ with col_analisis1:
 
 with col_analisis2:
     st.markdown("#### Recomendaciones")
-    st.markdown("""
-    - **Etapa 1:** La más técnica, gestiona bien el ritmo inicial
-    - **Etapa 2:** Recuperación activa, mantén ritmo constante
-    - **Etapa 3:** Gran ascenso, reserva energía para el final
-    """)
+    if integrada:
+        st.markdown("""
+        - **Etapa 1:** La más técnica, gestiona bien el ritmo inicial
+        - **Etapa 2:** Recuperación activa, mantén ritmo constante
+        - **Etapa 3:** Gran ascenso, reserva energía para el final
+        """)
+    else:
+        etapa_dura = comparacion["mas_desnivel_por_km"]
+        etapa_larga = comparacion["mas_larga"]
+        st.markdown(f"""
+        - **{etapa_dura['nombre']}:** La de más desnivel por km, gestiona bien el ritmo en las subidas
+        - **{etapa_larga['nombre']}:** La más larga, reserva energía para el final
+        """)
 
 st.divider()
 
@@ -144,4 +206,52 @@ with st.expander("🧮 Simular tiempos acumulados"):
                 st.error("⚠️ Excede límite")
     
     st.divider()
-    st.info(f"**Tiempo total estimado:** {formato_tiempo(tiempo_total)}")
\ No newline at end of file
+    st.info(f"**Tiempo total estimado:** {formato_tiempo(tiempo_total)}")
+
+st.divider()
+
+# Catálogo completo: se filtra y ordena sobre el índice, sin cargar perfiles
+st.subheader("🗂️ Explorar el catálogo")
+st.caption(f"{len(catalogo.filas):,} etapas de {len(catalogo.ediciones()):,} carreras y ediciones")
+
+col_filtro1, col_filtro2, col_filtro3, col_filtro4 = st.columns(4)
+
+with col_filtro1:
+    rango_distancia = st.slider("Distancia (km):", 0, 100, (0, 100), 5)
+
+with col_filtro2:
+    rango_desnivel = st.slider("Desnivel + (m):", 0, 5000, (0, 5000), 100)
+
+with col_filtro3:
+    region = st.selectbox("Región:", options=["Todas"] + catalogo.regiones())
+
+with col_filtro4:
+    top_k = st.slider("Etapas por ranking:", 1, 20, 5)
+
+encontradas = catalogo.buscar(
+    distancia_km=(rango_distancia[0], None if rango_distancia[1] == 100 else rango_distancia[1]),
+    desnivel_positivo=(rango_desnivel[0], None if rango_desnivel[1] == 5000 else rango_desnivel[1]),
+    region=None if region == "Todas" else region
+)
+
+if not encontradas:
+    st.info("Ninguna etapa del catálogo cumple los filtros")
+else:
+    ranking = comparar_etapas(encontradas, k=top_k)["ranking"]
+    titulos = {
+        "mas_larga": ("📏 Más largas", "distancia_km", "km"),
+        "mas_desnivel": ("⛰️ Más desnivel", "desnivel_positivo", "m"),
+        "mas_desnivel_por_km": ("📈 Más intensas", "intensidad_m_km", "m/km"),
+    }
+    columnas = st.columns(len(titulos))
+    for columna, (clave, (titulo, campo, unidad)) in zip(columnas, titulos.items()):
+        with columna:
+            st.markdown(f"**{titulo}**")
+            st.dataframe(pd.DataFrame([
+                {
+                    "Carrera": f"{f['evento']} {f['edicion']}",
+                    "Etapa": f["nombre"],
+                    unidad: round(f[campo], 1),
+                }
+                for f in ranking[clave]
+            ]), hide_index=True, use_container_width=True)
@@ -1,5 +1,6 @@
 import streamlit as st
 import sys
+import numpy as np
 from pathlib import Path
 
 root_path = Path(__file__).parent.parent
@@ -13,12 +14,21 @@ from utils.calculadora import (
     estimar_calorias,
     formato_tiempo
 )
+from utils.optimizador_pace import optimizar_plan, tarjeta_parciales
+from utils.nutricion import plan_hidratacion
+from utils.clima import cargar_pronostico, proyectar_olas
+from utils.perfiles import pace_plano_equivalente
+from utils.rutas import cargar_ruta_etapa
+from utils.actividades import analizar_actividades, ajustar_curva, predecir_etapa
+from utils.visualizaciones import grafico_curva_pace
+from utils.memoria import perfilar_pagina
 
 st.set_page_config(
     page_title="Calculadora de Pace",
     page_icon="⚡",
     layout="wide"
 )
+perfilar_pagina(__file__)
 
 st.title("⚡ Calculadora de Pace y Estrategia")
 st.markdown("Calcula tiempos, pace y estrategia para completar El Cruce")
@@ -28,7 +38,12 @@ st.divider()
 # Selector de modo
 modo = st.radio(
     "¿Qué quieres calcular?",
-    options=["Tiempo según mi pace", "Pace necesario para un tiempo objetivo"],
+    options=[
+        "Tiempo según mi pace",
+        "Pace necesario para un tiempo objetivo",
+        "Plan óptimo por tramos",
+        "Mi curva desde entrenamientos"
+    ],
     horizontal=True
 )
 
@@ -110,12 +125,12 @@ if modo == "Tiempo según mi pace":
         with col_tot2:
             st.metric("Calorías totales", f"{calorias_totales:,}")
 
-else:  # Pace necesario para un tiempo objetivo
+elif modo == "Pace necesario para un tiempo objetivo":
     st.subheader("🎯 Calcular pace necesario para un tiempo objetivo")
     
     etapa_objetivo = st.selectbox(
         "Selecciona la etapa:",
-        options=[0, 1, 2],
+        options=list(range(len(ETAPAS))),
         format_func=lambda x: f"{ETAPAS[x]['nombre']}: {ETAPAS[x]['distancia_km']}km"
     )
     
@@ -167,6 +182,131 @@ else:  # Pace necesario para un tiempo objetivo
         else:
             st.error("⚠️ El objetivo excede el tiempo límite")
 
+elif modo == "Mi curva desde entrenamientos":
+    st.subheader("📂 Predicción con tu curva de pace según pendiente")
+    st.markdown(
+        "Sube tus actividades (GPX, TCX o FIT): se mide tu pace real en cada pendiente "
+        "y se aplica a cada tramo de las etapas"
+    )
+    
+    archivos = st.file_uploader(
+        "Actividades de entrenamiento:",
+        type=["gpx", "tcx", "fit"],
+        accept_multiple_files=True
+    )
+    
+    if not archivos:
+        st.info("Sube una o más actividades con tiempo y altitud para ajustar tu curva")
+    else:
+        @st.cache_data(show_spinner=False)
+        def curva_personal(contenidos):
+            muestras = analizar_actividades(contenidos)
+            return muestras, ajustar_curva(muestras["pendientes"], muestras["paces"])
+        
+        with st.spinner(f"Procesando {len(archivos)} actividades..."):
+            muestras, curva = curva_personal(tuple((a.name, a.getvalue()) for a in archivos))
+        
+        for nombre, error in muestras["errores"]:
+            st.warning(f"No se pudo leer {nombre}: {error}")
+        
+        if curva is None:
+            st.error("⚠️ No hay suficientes tramos con tiempo y altitud para ajustar una curva")
+        else:
+            st.caption(
+                f"{muestras['actividades']} actividades · {len(muestras['paces']):,} tramos de 200 m · "
+                f"pendientes entrenadas de {curva['pendiente_minima']:.0f}% a {curva['pendiente_maxima']:.0f}%"
+            )
+            st.plotly_chart(grafico_curva_pace(curva), use_container_width=True)
+            
+            st.markdown("#### Resultados por etapa")
+            cols = st.columns(len(ETAPAS) + 1)
+            total = 0
+            predicciones = [predecir_etapa(curva, etapa) for etapa in ETAPAS]
+            for i, (etapa, prediccion) in enumerate(zip(ETAPAS, predicciones)):
+                total += prediccion["tiempo_min"]
+                limite = tiempo_limite_etapa(etapa['distancia_km'])
+                with cols[i]:
+                    st.metric(
+                        etapa['nombre'],
+                        formato_tiempo(prediccion["tiempo_min"] / 60),
+                        delta="dentro del límite" if prediccion["tiempo_min"] / 60 <= limite else "excede el límite",
+                        delta_color="normal" if prediccion["tiempo_min"] / 60 <= limite else "inverse"
+                    )
+            with cols[-1]:
+                st.metric("Total", formato_tiempo(total / 60))
+            
+            for etapa, prediccion in zip(ETAPAS, predicciones):
+                with st.expander(f"Tramos de la {etapa['nombre']}"):
+                    for segmento in prediccion["segmentos"]:
+                        st.markdown(
+                            f"- {segmento['tipo'].capitalize()} km {segmento['km_inicio']:g}-{segmento['km_fin']:g} "
+                            f"({segmento['pendiente_media']:+.1f}%): **{formato_tiempo(segmento['tiempo_min'] / 60)}** "
+                            f"a {segmento['pace_min_km']:.1f} min/km"
+                        )
+
+else:  # Plan óptimo por tramos
+    st.subheader("🧭 Plan de pace óptimo para las 3 etapas")
+    
+    col_input, col_output = st.columns([1, 2])
+    
+    with col_input:
+        st.markdown("#### Parámetros")
+        
+        pace_plano = st.number_input(
+            "Tu pace en plano (min/km):",
+            min_value=4.0,
+            max_value=12.0,
+            value=7.0,
+            step=0.25,
+            help="Pace sostenible en terreno plano; el plan lo ajusta por pendiente"
+        )
+        
+        presupuesto = st.slider(
+            "Presupuesto de esfuerzo (%):",
+            min_value=70,
+            max_value=130,
+            value=100,
+            step=5,
+            help="100% equivale a correr todo a tu intensidad habitual"
+        )
+        
+        fatiga = st.slider(
+            "Sensibilidad a la fatiga:",
+            min_value=0.0,
+            max_value=0.5,
+            value=0.15,
+            step=0.05,
+            help="Cuánto te enlentece el esfuerzo acumulado entre etapas"
+        )
+    
+    with col_output:
+        plan = optimizar_plan(ETAPAS, pace_plano, presupuesto, fatiga)
+        
+        if plan is None:
+            st.error("⚠️ Con este presupuesto no hay un plan que cumpla los cortes de los oasis")
+        else:
+            st.markdown("#### Resultados por etapa")
+            
+            cols = st.columns(len(ETAPAS) + 1)
+            for i, etapa in enumerate(ETAPAS):
+                tiempo_etapa = [t for t in plan["tramos"] if t["etapa"] == i][-1]["tiempo_etapa_min"]
+                with cols[i]:
+                    st.metric(etapa['nombre'], formato_tiempo(tiempo_etapa / 60))
+            with cols[-1]:
+                st.metric("Total", formato_tiempo(plan["tiempo_total_min"] / 60))
+            
+            tarjeta = tarjeta_parciales(plan, ETAPAS)
+            
+            with st.expander("📋 Tarjeta de parciales", expanded=True):
+                st.markdown(tarjeta)
+            
+            st.download_button(
+                label="📥 Descargar tarjeta (Markdown)",
+                data=tarjeta,
+                file_name="tarjeta_parciales_elcruce.md",
+                mime="text/markdown"
+            )
+
 st.divider()
 
 # Recomendaciones de estrategia
@@ -199,13 +339,78 @@ with st.expander("💡 Recomendaciones de estrategia de pace"):
 
 st.divider()
 
+# Ajuste por clima
+with st.expander("🌦️ Ajuste por pronóstico del clima"):
+    st.markdown("### Tiempo estimado según el pronóstico")
+    st.markdown(
+        "Sube una grilla de pronóstico (CSV con `fecha_hora, lat, lon, temperatura_c, "
+        "viento_u_ms, viento_v_ms` o NetCDF) para ajustar el tiempo por temperatura y viento."
+    )
+    
+    archivo_pronostico = st.file_uploader("Pronóstico:", type=["csv", "nc"], key="pronostico")
+    
+    col_clima1, col_clima2 = st.columns(2)
+    
+    with col_clima1:
+        etapa_clima = st.selectbox(
+            "Etapa:",
+            options=list(range(len(ETAPAS))),
+            format_func=lambda x: ETAPAS[x]['nombre'],
+            key="clima_etapa"
+        )
+        pace_clima = st.slider(
+            "Tu pace estimado (min/km):",
+            6.0, 15.0, 10.0, 0.5,
+            key="pace_clima"
+        )
+    
+    with col_clima2:
+        fecha_largada = st.date_input("Fecha de largada:", key="fecha_clima")
+        hora_largada = st.time_input("Hora de la primera ola:", key="hora_clima")
+        num_olas = st.number_input("Olas:", min_value=1, max_value=20, value=3, key="olas_clima")
+        separacion = st.number_input("Minutos entre olas:", min_value=1, max_value=120, value=15, key="sep_clima")
+    
+    if archivo_pronostico is not None:
+        try:
+            pronostico = cargar_pronostico(archivo_pronostico)
+        except (ValueError, KeyError, ImportError) as e:
+            st.error(f"⚠️ No se pudo leer el pronóstico: {e}")
+        else:
+            etapa_c = ETAPAS[etapa_clima]
+            primera = np.datetime64(f"{fecha_largada}T{hora_largada}")
+            largadas = primera + np.arange(num_olas) * np.timedelta64(int(separacion), "m")
+            ruta = cargar_ruta_etapa(etapa_clima, etapa_c['distancia_km'])
+            
+            proyeccion = proyectar_olas(
+                etapa_c,
+                pace_plano_equivalente(etapa_c, pace_clima),
+                largadas,
+                pronostico,
+                ruta
+            )
+            
+            if ruta is None:
+                st.caption("Sin track GPS de la etapa: el pronóstico se toma en Villa La Angostura.")
+            
+            for i, largada in enumerate(largadas):
+                ajustado = proyeccion["tiempo_ajustado_min"][i]
+                diferencia = ajustado - proyeccion["tiempo_base_min"]
+                st.metric(
+                    f"Ola {i + 1} ({str(largada)[11:16]})",
+                    formato_tiempo(ajustado / 60),
+                    delta=f"{diferencia:+.0f} min por clima",
+                    delta_color="inverse"
+                )
+
+st.divider()
+
 # Planificador de oasis
 with st.expander("🥤 Planificador de hidratación y alimentación"):
     st.markdown("### Estrategia de Oasis")
     
     etapa_plan = st.selectbox(
         "Selecciona etapa para planificar:",
-        options=[0, 1, 2],
+        options=list(range(len(ETAPAS))),
         format_func=lambda x: ETAPAS[x]['nombre'],
         key="plan_etapa"
     )
@@ -217,32 +422,33 @@ with st.expander("🥤 Planificador de hidratación y alimentación"):
         key="pace_plan"
     )
     
+    peso_plan = st.number_input(
+        "Tu peso (kg):",
+        min_value=40,
+        max_value=120,
+        value=70,
+        step=1,
+        key="peso_plan"
+    )
+    
     st.markdown(f"#### {etapa_sel['nombre']}")
     
     tiempo_transcurrido = 0
     
-    for i, oasis in enumerate(etapa_sel['oasis']):
-        km_oasis = oasis['km']
-        
-        if i == 0:
-            distancia_tramo = km_oasis
-        else:
-            distancia_tramo = km_oasis - etapa_sel['oasis'][i-1]['km']
-        
-        tiempo_tramo = calcular_tiempo_estimado(distancia_tramo, pace_plan)
-        tiempo_transcurrido += tiempo_tramo
+    for tramo in plan_hidratacion(etapa_sel, peso_plan, pace_plan):
+        tiempo_transcurrido += tramo['duracion_h']
         
-        st.markdown(f"**{oasis['nombre']}** (km {km_oasis})")
+        st.markdown(f"**{tramo['tramo']}** (hasta km {tramo['km_fin']})")
         col1, col2 = st.columns(2)
         
         with col1:
             st.info(f"Llegarás aproximadamente a las {formato_tiempo(tiempo_transcurrido)} de carrera")
         
         with col2:
-            st.markdown("**Recomendación:**")
-            st.markdown("- 200-300ml de líquido")
-            st.markdown("- 1 gel o snack energético")
-            if km_oasis > 15:
+            st.markdown("**Carga para este tramo:**")
+            st.markdown(f"- {tramo['liquido_ml']} ml de líquido")
+            st.markdown(f"- {tramo['carbohidratos_g']} g de carbohidratos (~{tramo['kcal']} kcal de gasto)")
+            if tramo['duracion_h'] > 1.5:
                 st.markdown("- Comida sólida (fruta, barras)")
 
 st.divider()
@@ -5,20 +5,29 @@ from pathlib import Path
 root_path = Path(__file__).parent.parent
 sys.path.append(str(root_path))
 
+from datetime import date
+
+import pandas as pd
+
 from data.etapas import ETAPAS
 from utils.asistente_ai import generar_respuesta_asistente, generar_plan_entrenamiento
+from utils.plan_entrenamiento import numero_semana, plan_a_ics, plan_a_markdown, plan_a_tabla
+from utils.metricas_ia import medidor
+from utils.memoria import perfilar_pagina
 
 st.set_page_config(
     page_title="Asistente IA",
     page_icon="🤖",
     layout="wide"
 )
+perfilar_pagina(__file__)
 
 st.title("🤖 Asistente Virtual de Entrenamiento")
 st.markdown("Asistente personalizado con IA para ayudarte a preparar El Cruce Saucony 2025")
 
 # Verificar API key
 import os
+import uuid
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -36,6 +45,10 @@ if not api_key or api_key == "tu-api-key-aqui":
     """)
     st.stop()
 
+# Identificador de sesión para métricas y presupuesto de IA
+if "sesion_id" not in st.session_state:
+    st.session_state.sesion_id = uuid.uuid4().hex
+
 st.divider()
 
 # Tabs para diferentes funcionalidades
@@ -69,7 +82,8 @@ with tab1:
                 respuesta = generar_respuesta_asistente(
                     pregunta, 
                     ETAPAS,
-                    st.session_state.mensajes[:-1]  # Historial sin el último mensaje
+                    st.session_state.mensajes[:-1],  # Historial sin el último mensaje
+                    sesion_id=st.session_state.sesion_id
                 )
                 st.markdown(respuesta)
         
@@ -132,20 +146,86 @@ with tab2:
         - Etapa 3 (30km): ~{(30 * pace_objetivo / 60):.1f}h
         """)
     
+    fecha_carrera = st.date_input(
+        "Fecha de la Etapa 1 (para el calendario):",
+        value=date(2025, 12, 1)
+    )
+
     if st.button("🎯 Generar Plan de Entrenamiento", type="primary"):
         with st.spinner("Generando tu plan personalizado..."):
-            plan = generar_plan_entrenamiento(semanas, nivel, pace_objetivo, ETAPAS)
-            
-            st.markdown("### Tu Plan de Entrenamiento")
-            st.markdown(plan)
-            
-            st.download_button(
-                label="📥 Descargar Plan (TXT)",
-                data=plan,
-                file_name=f"plan_entrenamiento_elcruce_{semanas}semanas.txt",
-                mime="text/plain"
+            st.session_state.plan_entrenamiento = generar_plan_entrenamiento(
+                semanas, nivel, pace_objetivo, ETAPAS, sesion_id=st.session_state.sesion_id
             )
 
+    if "plan_entrenamiento" in st.session_state:
+        plan = st.session_state.plan_entrenamiento
+        if plan["error"]:
+            st.warning(plan["error"])
+
+        if plan["semanas"]:
+            st.markdown("### Tu Plan de Entrenamiento")
+            reutilizadas = len(plan["semanas"]) - plan["nuevas"]
+            st.caption(f"{plan['nuevas']} semanas generadas, {reutilizadas} reutilizadas de planes anteriores")
+
+            tabla = plan_a_tabla(plan["semanas"], fecha_carrera, plan["semanas_totales"])
+            resumen = pd.DataFrame([
+                {
+                    "Semana": numero_semana(s, plan["semanas_totales"]),
+                    "Fase": s["fase"] + (" (descarga)" if s["descarga"] else ""),
+                    "Km": s["km"],
+                    "Desnivel (m)": s["desnivel_m"],
+                    "Sesiones": len(s["sesiones"]),
+                    "Objetivo": s["objetivo"],
+                }
+                for s in plan["semanas"]
+            ])
+            st.dataframe(resumen, hide_index=True, use_container_width=True)
+
+            with st.expander("📅 Sesiones día por día"):
+                st.dataframe(tabla.rename(columns={
+                    "semana": "Semana",
+                    "fecha": "Fecha",
+                    "dia": "Día",
+                    "fase": "Fase",
+                    "tipo": "Sesión",
+                    "duracion_min": "Duración (min)",
+                    "desnivel_m": "Desnivel (m)",
+                    "descripcion": "Descripción",
+                }), hide_index=True, use_container_width=True)
+
+            with st.expander("📝 Detalle por semana"):
+                st.markdown(plan_a_markdown(plan["semanas"], plan["semanas_totales"]))
+
+            nombre = f"plan_entrenamiento_elcruce_{len(plan['semanas'])}semanas"
+            col_csv, col_ics, col_md = st.columns(3)
+
+            with col_csv:
+                st.download_button(
+                    label="📥 Descargar Plan (CSV)",
+                    data=tabla.to_csv(index=False),
+                    file_name=f"{nombre}.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+
+            with col_ics:
+                st.download_button(
+                    label="📅 Descargar Calendario (ICS)",
+                    data=plan_a_ics(tabla),
+                    file_name=f"{nombre}.ics",
+                    mime="text/calendar",
+                    use_container_width=True
+                )
+
+            with col_md:
+                st.download_button(
+                    label="📥 Descargar Plan (TXT)",
+                    data=plan_a_markdown(plan["semanas"], plan["semanas_totales"]),
+                    file_name=f"{nombre}.txt",
+                    mime="text/plain",
+                    use_container_width=True
+                )
+
 st.divider()
 
 # Información sobre costos
@@ -157,6 +237,24 @@ with st.expander("ℹ️ Sobre el uso de IA"):
     - Costo aproximado: $0.0001 - $0.0005 por respuesta
     - Tu crédito de $4 alcanza para ~8,000-40,000 consultas
     
+    **Uso real de esta sesión:**
+    """)
+    
+    uso = medidor.uso_sesion(st.session_state.sesion_id)
+    col_uso1, col_uso2, col_uso3 = st.columns(3)
+    with col_uso1:
+        st.metric("Consultas", uso["llamadas"])
+    with col_uso2:
+        st.metric("Tokens (entrada / salida)", f"{uso['tokens_entrada']:,} / {uso['tokens_salida']:,}")
+    with col_uso3:
+        st.metric("Costo", f"${uso['costo_usd']:.4f}")
+    st.caption(
+        f"Presupuesto por sesión: ${medidor.presupuesto_sesion_usd:.2f} · "
+        f"Gastado hoy en el servidor: ${medidor.uso_total()['costo_dia_usd']:.4f} "
+        f"de ${medidor.presupuesto_dia_usd:.2f}"
+    )
+    
+    st.markdown("""
     **Privacidad:**
     - Las conversaciones no se guardan en OpenAI
     - Se procesan en tiempo real y luego se descartan
@@ -0,0 +1,240 @@
+import streamlit as st
+import sys
+import time
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+sys.path.append(str(root_path))
+
+import numpy as np
+import pandas as pd
+
+from data.etapas import ETAPAS
+from utils.seguimiento import SeguidorCarrera, LectorArchivo, LectorSocket
+from utils.cortes import MotorCortes
+from utils.calculadora import formato_tiempo
+from utils.perfiles import interpolar_altitudes
+from utils.rutas import cargar_ruta_etapa
+from utils.visualizaciones import grafico_corredores_perfil, grafico_distribucion_pasos
+from utils.memoria import perfilar_pagina
+
+st.set_page_config(
+    page_title="Seguimiento en Vivo",
+    page_icon="📡",
+    layout="wide"
+)
+perfilar_pagina(__file__)
+
+st.title("📡 Seguimiento en Vivo")
+st.markdown("Tiempos estimados de llegada de todo el pelotón durante la semana de carrera")
+
+
+@st.cache_resource
+def obtener_seguidor():
+    """Un único motor de seguimiento compartido por todas las sesiones."""
+    rutas = [cargar_ruta_etapa(i, etapa["distancia_km"]) for i, etapa in enumerate(ETAPAS)]
+    return SeguidorCarrera(ETAPAS, rutas=rutas)
+
+
+@st.cache_resource
+def obtener_motor_cortes():
+    return MotorCortes(ETAPAS)
+
+
+@st.cache_data(max_entries=8)
+def tabla_tablero(version, _seguidor, filas):
+    """
+    Tablero formateado de los corredores con menor tiempo total estimado.
+
+    La versión del seguidor es la clave: la tabla se rearma sólo cuando
+    entraron eventos nuevos, y se formatean sólo las filas que se muestran.
+    """
+    columnas = _seguidor.tablero()
+    orden = np.argsort(columnas["eta_fin_carrera_min"], kind="stable")[:filas]
+    df = pd.DataFrame({c: columnas[c][orden] for c in ("dorsal", "etapa", "km")})
+    df["eta_fin_etapa"] = [formato_tiempo(m / 60) for m in columnas["eta_fin_etapa_min"][orden]]
+    df["eta_fin_carrera"] = [formato_tiempo(m / 60) for m in columnas["eta_fin_carrera_min"][orden]]
+    return df
+
+
+@st.cache_resource
+def obtener_lector(origen, destino):
+    if origen == "Archivo":
+        return LectorArchivo(destino)
+    host, puerto = destino.rsplit(":", 1)
+    return LectorSocket(host, int(puerto))
+
+
+# Fuente de eventos
+with st.sidebar:
+    st.markdown("### 📥 Fuente de eventos")
+    origen = st.radio("Origen:", options=["Archivo", "Socket"], horizontal=True)
+    if origen == "Archivo":
+        destino = st.text_input("Ruta del archivo (JSON por línea):", value="eventos.jsonl")
+    else:
+        destino = st.text_input("Host:puerto del feed:", value="localhost:9000")
+    auto_refresco = st.checkbox("Actualizar automáticamente", value=False)
+    intervalo = st.slider("Intervalo (s):", 2, 60, 10)
+
+seguidor = obtener_seguidor()
+
+try:
+    lector = obtener_lector(origen, destino)
+    nuevos = seguidor.procesar_lineas(lector.leer())
+except OSError as e:
+    st.error(f"⚠️ No se pudo leer la fuente de eventos: {e}")
+    nuevos = 0
+
+recalculados = seguidor.actualizar_etas()
+
+st.divider()
+
+# Métricas generales
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric("🏃 Corredores en seguimiento", f"{seguidor.n:,}")
+
+with col2:
+    st.metric("📨 Eventos nuevos", f"{nuevos:,}")
+
+with col3:
+    st.metric("🔄 Estimaciones recalculadas", f"{recalculados:,}")
+
+with col4:
+    st.metric(
+        "🛰️ Posiciones GPS descartadas", f"{seguidor.posiciones_descartadas:,}",
+        help="Posiciones lejos del recorrido o de etapas sin track GPX"
+    )
+
+st.divider()
+
+if seguidor.n == 0:
+    st.info("Todavía no se recibieron eventos de paso")
+    st.stop()
+
+# Búsqueda por dorsal
+st.subheader("🔎 Buscar corredor")
+
+dorsal = st.number_input("Dorsal:", min_value=0, step=1, value=int(seguidor.dorsales[0]))
+fila = seguidor.indice.get(int(dorsal))
+
+if fila is None:
+    st.warning("Dorsal sin eventos registrados")
+else:
+    etapa = ETAPAS[seguidor.etapa[fila]]
+    col_a, col_b, col_c, col_d = st.columns(4)
+    with col_a:
+        st.metric("Posición", f"{etapa['nombre']} · km {seguidor.km[fila]:.1f}")
+    with col_b:
+        st.metric(
+            f"Llegada a {seguidor.nombre_proximo_oasis(fila)}",
+            formato_tiempo(seguidor.etas[fila, 0] / 60) if seguidor.proximo_oasis[fila] >= 0 else "—"
+        )
+    with col_c:
+        st.metric(f"Llegada a {etapa['fin']}", formato_tiempo(seguidor.etas[fila, 1] / 60))
+    with col_d:
+        st.metric("Tiempo total estimado", formato_tiempo(seguidor.etas[fila, 2] / 60))
+
+    estadisticas = seguidor.estadisticas
+    ultimo = estadisticas.ultimo_paso(int(dorsal), int(seguidor.etapa[fila]))
+    if ultimo is not None:
+        punto, tiempo_paso = ultimo
+        nombre_punto = estadisticas.puntos[seguidor.etapa[fila]][punto]
+        mensaje = (
+            f"🏅 En {nombre_punto} ({formato_tiempo(tiempo_paso / 60)}) está en el top "
+            f"{max(estadisticas.percentil(seguidor.etapa[fila], punto, tiempo_paso), 1):.0f}% del pelotón"
+        )
+        categoria = estadisticas.categorias.get(int(dorsal))
+        if categoria:
+            top_categoria = estadisticas.percentil(seguidor.etapa[fila], punto, tiempo_paso, categoria)
+            mensaje += f" y en el top {max(top_categoria, 1):.0f}% de {categoria}"
+        st.info(mensaje)
+
+st.divider()
+
+# Posiciones sobre el perfil
+st.subheader("🏔️ Corredores en el recorrido")
+
+etapa_perfil = st.selectbox(
+    "Etapa:",
+    options=list(range(len(ETAPAS))),
+    format_func=lambda x: ETAPAS[x]["nombre"],
+    index=int(seguidor.etapa[:seguidor.n].max())
+)
+en_etapa = seguidor.etapa[:seguidor.n] == etapa_perfil
+kms_etapa = seguidor.km[:seguidor.n][en_etapa]
+st.plotly_chart(
+    grafico_corredores_perfil(
+        ETAPAS[etapa_perfil],
+        kms_etapa,
+        interpolar_altitudes(ETAPAS[etapa_perfil]["perfil"], kms_etapa),
+        seguidor.dorsales[:seguidor.n][en_etapa]
+    ),
+    use_container_width=True
+)
+
+st.divider()
+
+# Tablero
+st.subheader("📋 Tablero en vivo")
+
+filas_tablero = st.select_slider("Corredores a mostrar:", options=[50, 100, 250, 500, 1000], value=100)
+st.dataframe(
+    tabla_tablero(seguidor.version, seguidor, filas_tablero),
+    use_container_width=True,
+    hide_index=True
+)
+st.caption(f"Los {min(filas_tablero, seguidor.n):,} de menor tiempo total estimado de {seguidor.n:,} corredores")
+
+st.divider()
+
+# Distribución de tiempos de paso
+st.subheader("📊 Distribución del pelotón")
+
+categoria_distribucion = st.selectbox("Categoría:", options=seguidor.estadisticas.categorias_disponibles())
+probabilidades = [0.1, 0.25, 0.5, 0.75, 0.9]
+st.plotly_chart(
+    grafico_distribucion_pasos(
+        seguidor.estadisticas.distribucion(etapa_perfil, probabilidades, categoria_distribucion), probabilidades
+    ),
+    use_container_width=True
+)
+st.caption(
+    f"{ETAPAS[etapa_perfil]['nombre']}: cuantiles estimados con bocetos KLL que se actualizan con cada paso "
+    "(error de ~1% en el percentil, sin ordenar los tiempos en cada actualización)"
+)
+
+st.divider()
+
+# Riesgo de corte
+st.subheader("⏰ Riesgo de corte")
+
+umbral = st.slider("Alertar desde un riesgo de:", 0.1, 0.9, 0.5, 0.05)
+motor_cortes = obtener_motor_cortes()
+orden, evaluacion, alertas = motor_cortes.ranking_seguidor(seguidor, umbral)
+
+st.metric("🚨 Corredores en alerta", f"{int(alertas.sum()):,}")
+
+en_riesgo = orden[:50]
+df_riesgo = pd.DataFrame({
+    "Dorsal": seguidor.dorsales[en_riesgo],
+    "Etapa": seguidor.etapa[en_riesgo] + 1,
+    "Km": seguidor.km[en_riesgo],
+    "Próxima barrera": [
+        motor_cortes.nombre_barrera(seguidor.etapa[i], evaluacion["barrera"][i]) for i in en_riesgo
+    ],
+    "Margen (min)": evaluacion["margen_min"][en_riesgo].round(0),
+    "Riesgo": (evaluacion["riesgo"][en_riesgo] * 100).round(0),
+    "Alerta": alertas[en_riesgo],
+})
+st.dataframe(df_riesgo, use_container_width=True, hide_index=True)
+
+st.caption(
+    "📡 Las estimaciones ajustan el pace observado de cada corredor según el perfil de cada etapa. "
+    "Los eventos con lat/lon en lugar de km se proyectan sobre el track GPX de la etapa."
+)
+
+if auto_refresco:
+    time.sleep(intervalo)
+    st.rerun()
@@ -0,0 +1,78 @@
+import streamlit as st
+import sys
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+sys.path.append(str(root_path))
+
+import numpy as np
+
+from data.etapas import ETAPAS
+from utils.mapa import (
+    ZOOM_MINIMO,
+    ZOOM_MAXIMO,
+    piramide_etapa,
+    puntos_interes,
+    ruta_para_zoom,
+    zoom_inicial
+)
+from utils.rutas import CARPETA_RUTAS
+from utils.visualizaciones import grafico_mapa_ruta
+from utils.memoria import perfilar_pagina
+
+st.set_page_config(
+    page_title="Mapa del Recorrido",
+    page_icon="🗺️",
+    layout="wide"
+)
+perfilar_pagina(__file__)
+
+st.title("🗺️ Mapa del Recorrido")
+st.markdown("Trazado de las etapas con oasis, largadas y campamentos")
+
+st.divider()
+
+piramides = {i: piramide_etapa(i, etapa["distancia_km"]) for i, etapa in enumerate(ETAPAS)}
+disponibles = [i for i, piramide in piramides.items() if piramide is not None]
+
+if not disponibles:
+    st.info(
+        "No hay tracks GPS cargados. Copia los GPX oficiales como "
+        f"`{CARPETA_RUTAS.relative_to(root_path)}/etapa_1.gpx`, `etapa_2.gpx`... para ver el mapa."
+    )
+    st.stop()
+
+col_etapas, col_detalle = st.columns([2, 1])
+
+with col_etapas:
+    seleccion = st.multiselect(
+        "Etapas:",
+        options=disponibles,
+        default=disponibles,
+        format_func=lambda x: ETAPAS[x]["nombre"]
+    )
+
+if not seleccion:
+    st.warning("Selecciona al menos una etapa")
+    st.stop()
+
+lats = np.concatenate([piramides[i]["lat"] for i in seleccion])
+lons = np.concatenate([piramides[i]["lon"] for i in seleccion])
+zoom = zoom_inicial(lats, lons)
+
+with col_detalle:
+    # Cada nivel de detalle sólo envía los puntos que se distinguen a ese zoom
+    nivel = st.select_slider(
+        "Nivel de detalle (zoom):",
+        options=list(range(ZOOM_MINIMO, ZOOM_MAXIMO + 1)),
+        value=zoom,
+        help="Más detalle agrega puntos del track; úsalo al acercarte a un tramo"
+    )
+
+trazados = [(ETAPAS[i]["nombre"], ruta_para_zoom(piramides[i], nivel)) for i in seleccion]
+puntos = [p for i in seleccion for p in puntos_interes(ETAPAS[i], piramides[i])]
+
+st.plotly_chart(grafico_mapa_ruta(trazados, puntos, zoom), use_container_width=True)
+
+enviados = sum(len(ruta["km"]) for _, ruta in trazados)
+st.caption(f"{enviados:,} de {len(lats):,} puntos del track en el nivel de detalle {nivel}")
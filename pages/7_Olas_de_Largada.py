@@ -0,0 +1,179 @@
+import streamlit as st
+import sys
+import time
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+sys.path.append(str(root_path))
+
+import numpy as np
+import pandas as pd
+
+from data.etapas import ETAPAS
+from utils.briefings import cargar_inscriptos
+from utils.cortes import simular_parciales
+from utils.olas import (
+    CORREDORES_POR_MINUTO,
+    INTERVALO_OLAS_MIN,
+    olas_por_cortes,
+    optimizar_olas,
+    secciones_angostas,
+    simular_largada
+)
+from utils.perfiles import pace_plano_equivalente
+from utils.visualizaciones import grafico_demora_olas
+from utils.memoria import perfilar_pagina
+
+st.set_page_config(
+    page_title="Olas de Largada",
+    page_icon="🚦",
+    layout="wide"
+)
+perfilar_pagina(__file__)
+
+st.title("🚦 Olas de Largada")
+st.markdown("Simula la congestión en los senderos angostos y reparte al pelotón en olas")
+
+st.divider()
+
+# Configuración
+col_etapa, col_peloton, col_olas = st.columns(3)
+
+with col_etapa:
+    etapa_idx = st.selectbox(
+        "Etapa:",
+        options=list(range(len(ETAPAS))),
+        format_func=lambda x: ETAPAS[x]["nombre"]
+    )
+    etapa = ETAPAS[etapa_idx]
+    texto_secciones = st.text_input(
+        "Senderos angostos (km):",
+        value=", ".join(f"{a:g}-{b:g}" for a, b in secciones_angostas(etapa)),
+        help="Tramos de una sola fila como km_inicio-km_fin, separados por comas"
+    )
+
+with col_peloton:
+    origen = st.radio("Pelotón:", options=["Simulado", "Lista de inscriptos"], horizontal=True)
+    if origen == "Simulado":
+        num_corredores = st.number_input("Corredores:", 100, 10000, 3000, step=100)
+        pace_medio = st.slider("Pace medio en plano (min/km):", 6.0, 16.0, 9.0, 0.5)
+        paces = simular_parciales(etapa, int(num_corredores), pace_medio, semilla=0)[2]
+    else:
+        archivo = st.file_uploader("CSV de inscriptos", type=["csv"], help="Columnas dorsal, nombre, pace_promedio")
+        if archivo is None:
+            st.info("Sube la lista de inscriptos para simular su largada")
+            st.stop()
+        try:
+            inscriptos = cargar_inscriptos(archivo)
+        except ValueError as e:
+            st.error(f"⚠️ {e}")
+            st.stop()
+        paces = pace_plano_equivalente(etapa, np.array([i["pace_promedio"] for i in inscriptos]))
+
+with col_olas:
+    num_olas = st.slider("Cantidad de olas:", 1, 10, 4)
+    intervalo = st.slider("Minutos entre olas:", 2, 30, INTERVALO_OLAS_MIN)
+    capacidad = st.slider(
+        "Capacidad del sendero (corredores/min):", 1.0, 20.0, float(CORREDORES_POR_MINUTO), 0.5
+    )
+
+try:
+    secciones = []
+    for tramo in texto_secciones.split(","):
+        if tramo.strip():
+            desde, hasta = (float(km) for km in tramo.split("-"))
+            if not 0 <= desde < hasta <= etapa["distancia_km"]:
+                raise ValueError(f"Tramo fuera de la etapa: {tramo.strip()}")
+            secciones.append((desde, hasta))
+    secciones.sort()
+    if any(a[1] > b[0] for a, b in zip(secciones[:-1], secciones[1:])):
+        raise ValueError("Los tramos no pueden superponerse")
+except ValueError as e:
+    st.error(f"⚠️ Senderos inválidos: {e}")
+    st.stop()
+
+if not secciones:
+    st.info("Indica al menos un sendero angosto para simular la congestión")
+    st.stop()
+
+st.divider()
+
+# Planes de largada
+inicio = time.perf_counter()
+n = len(paces)
+num_olas = min(num_olas, n)
+cortes = np.linspace(0, n, num_olas + 1).round().astype(np.int64)
+olas_dorsal = olas_por_cortes(np.arange(n), cortes)
+olas_rapidos = olas_por_cortes(np.argsort(paces, kind="stable"), cortes)
+optimo = optimizar_olas(etapa, paces, num_olas, secciones, intervalo, capacidad)
+planes = [
+    ("Por dorsal", olas_dorsal, simular_largada(etapa, paces, olas_dorsal, secciones, intervalo, capacidad)),
+    ("Rápidos primero", olas_rapidos, simular_largada(etapa, paces, olas_rapidos, secciones, intervalo, capacidad)),
+    ("Optimizado", optimo["olas"], optimo["resultado"]),
+]
+segundos = time.perf_counter() - inicio
+
+col1, col2, col3 = st.columns(3)
+base = planes[0][2]["demora_total_min"]
+
+for col, (nombre, _, resultado) in zip((col1, col2, col3), planes):
+    with col:
+        st.metric(
+            f"⏳ Demora total · {nombre}",
+            f"{resultado['demora_total_min'] / 60:,.0f} h",
+            delta=None if nombre == "Por dorsal" else f"{(resultado['demora_total_min'] - base) / 60:,.0f} h",
+            delta_color="inverse"
+        )
+        st.caption(
+            f"Media {resultado['demora_min'].mean():.1f} min · "
+            f"máxima {resultado['demora_min'].max():.0f} min por corredor"
+        )
+
+st.plotly_chart(grafico_demora_olas(planes), use_container_width=True)
+
+col_tabla, col_tamanos = st.columns([2, 1])
+
+with col_tabla:
+    st.markdown("### 🌲 Congestión por sendero (plan optimizado)")
+    resultado = optimo["resultado"]
+    st.dataframe(
+        pd.DataFrame({
+            "Sendero": [f"km {a:g} - {b:g}" for a, b in secciones],
+            "Demora total (h)": (resultado["demora_seccion_min"] / 60).round(1),
+            "Espera máxima (min)": resultado["espera_maxima_min"].round(1),
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+with col_tamanos:
+    st.markdown("### 🚦 Olas optimizadas")
+    olas = optimo["olas"]
+    st.dataframe(
+        pd.DataFrame({
+            "Ola": [f"Ola {i + 1}" for i in range(num_olas)],
+            "Largada": [f"+{i * intervalo} min" for i in range(num_olas)],
+            "Corredores": optimo["tamanos"],
+            "Pace plano": [f"{paces[olas == i].min():.1f}-{paces[olas == i].max():.1f}" for i in range(num_olas)],
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+if origen == "Lista de inscriptos":
+    asignacion = pd.DataFrame({
+        "dorsal": [i["dorsal"] for i in inscriptos],
+        "nombre": [i["nombre"] for i in inscriptos],
+        "ola": optimo["olas"] + 1,
+    })
+    st.download_button(
+        "📥 Descargar asignación de olas (CSV)",
+        asignacion.to_csv(index=False).encode("utf-8"),
+        file_name=f"olas_etapa_{etapa_idx + 1}.csv",
+        mime="text/csv"
+    )
+
+st.caption(
+    f"{optimo['evaluaciones'] + 2} simulaciones de {n:,} corredores "
+    f"({sum(r['eventos'] for _, _, r in planes):,} eventos en los planes mostrados) en {segundos:.1f} s"
+)
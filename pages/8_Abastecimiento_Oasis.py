@@ -0,0 +1,149 @@
+import streamlit as st
+import sys
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+sys.path.append(str(root_path))
+
+import numpy as np
+import pandas as pd
+
+from data.etapas import ETAPAS
+from utils.abastecimiento import (
+    ANCHO_FRANJA_MIN,
+    CORREDORES_POR_VOLUNTARIO,
+    INCERTIDUMBRE,
+    TIEMPO_ATENCION_MIN,
+    PronosticoOasis,
+    horizonte_necesario
+)
+from utils.briefings import PESO_DEFECTO_KG, cargar_inscriptos
+from utils.calculadora import formato_tiempo
+from utils.cortes import simular_parciales
+from utils.olas import INTERVALO_OLAS_MIN, olas_por_cortes
+from utils.perfiles import pace_plano_equivalente
+from utils.visualizaciones import grafico_carga_oasis
+from utils.memoria import perfilar_pagina
+
+st.set_page_config(
+    page_title="Abastecimiento de Oasis",
+    page_icon="💧",
+    layout="wide"
+)
+perfilar_pagina(__file__)
+
+st.title("💧 Abastecimiento de Oasis")
+st.markdown("Pronóstico de llegadas, agua, comida y voluntarios en cada oasis para todo el pelotón")
+
+st.divider()
+
+# Configuración
+col_etapa, col_peloton, col_parametros = st.columns(3)
+
+with col_etapa:
+    etapa_idx = st.selectbox(
+        "Etapa:",
+        options=list(range(len(ETAPAS))),
+        format_func=lambda x: ETAPAS[x]["nombre"]
+    )
+    etapa = ETAPAS[etapa_idx]
+    num_olas = st.slider("Olas de largada:", 1, 10, 1, help="Los más rápidos largan en la primera ola")
+    intervalo = st.slider("Minutos entre olas:", 2, 30, INTERVALO_OLAS_MIN, disabled=num_olas == 1)
+
+with col_peloton:
+    origen = st.radio("Pelotón:", options=["Simulado", "Lista de inscriptos"], horizontal=True)
+    if origen == "Simulado":
+        num_corredores = st.number_input("Corredores:", 100, 10000, 3000, step=100)
+        pace_medio = st.slider("Pace medio en plano (min/km):", 6.0, 16.0, 9.0, 0.5)
+        paces = simular_parciales(etapa, int(num_corredores), pace_medio, semilla=0)[2]
+        dorsales = np.arange(1, len(paces) + 1).tolist()
+        pesos = np.full(len(paces), PESO_DEFECTO_KG)
+    else:
+        archivo = st.file_uploader("CSV de inscriptos", type=["csv"], help="Columnas dorsal, nombre, pace_promedio, peso_kg")
+        if archivo is None:
+            st.info("Sube la lista de inscriptos para pronosticar la carga de cada oasis")
+            st.stop()
+        try:
+            inscriptos = cargar_inscriptos(archivo)
+        except ValueError as e:
+            st.error(f"⚠️ {e}")
+            st.stop()
+        paces = pace_plano_equivalente(etapa, np.array([i["pace_promedio"] for i in inscriptos]))
+        dorsales = [i["dorsal"] for i in inscriptos]
+        pesos = np.array([i["peso_kg"] for i in inscriptos])
+
+with col_parametros:
+    ancho_franja = st.select_slider("Franja horaria (min):", options=[5, 10, 15, 20, 30, 60], value=ANCHO_FRANJA_MIN)
+    incertidumbre = st.slider("Incertidumbre del tiempo de llegada (%):", 2, 25, int(INCERTIDUMBRE * 100)) / 100
+    atencion = st.slider("Tiempo de atención por corredor (min):", 0.5, 10.0, TIEMPO_ATENCION_MIN, 0.5)
+    por_voluntario = st.slider("Corredores por voluntario:", 1, 10, CORREDORES_POR_VOLUNTARIO)
+
+if not etapa["oasis"]:
+    st.info("Esta etapa no tiene oasis")
+    st.stop()
+
+n = len(paces)
+cortes = np.linspace(0, n, min(num_olas, n) + 1).round().astype(np.int64)
+largadas = olas_por_cortes(np.argsort(paces, kind="stable"), cortes) * intervalo
+horizonte = horizonte_necesario(etapa, paces, largadas, incertidumbre)
+
+# Un pronóstico por sesión y configuración: al cambiar la lista sólo se
+# recalculan los corredores que entran, salen o cambian
+clave = ("pronostico_oasis", etapa_idx, ancho_franja, incertidumbre, horizonte)
+if clave not in st.session_state:
+    # Los pronósticos de otras configuraciones no se reutilizan: liberarlos
+    for vieja in [k for k in st.session_state if isinstance(k, tuple) and k[:1] == ("pronostico_oasis",)]:
+        del st.session_state[vieja]
+    st.session_state[clave] = PronosticoOasis(etapa, ancho_franja, incertidumbre, horizonte)
+pronostico = st.session_state[clave]
+
+recalculados = pronostico.actualizar([
+    {"dorsal": d, "pace_plano": p, "peso_kg": w, "largada_min": l}
+    for d, p, w, l in zip(dorsales, paces, pesos, largadas)
+])
+
+st.divider()
+
+requerimientos = pronostico.requerimientos(tiempo_atencion_min=atencion, corredores_por_voluntario=por_voluntario)
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric("🏃 Corredores", f"{pronostico.n:,}")
+
+with col2:
+    st.metric("💧 Agua total", f"{sum(r['agua_l'] for r in requerimientos):,.0f} L")
+
+with col3:
+    st.metric("🍌 Porciones de comida", f"{sum(r['porciones'] for r in requerimientos):,}")
+
+with col4:
+    st.metric("🙋 Voluntarios", f"{sum(r['voluntarios'] for r in requerimientos):,}")
+
+st.plotly_chart(grafico_carga_oasis(pronostico.curvas()), use_container_width=True)
+
+st.markdown("### 📋 Requerimientos por oasis")
+st.dataframe(
+    pd.DataFrame([
+        {
+            "Oasis": r["oasis"],
+            "Corredores": round(r["corredores"]),
+            "Abre": formato_tiempo(r["apertura_min"] / 60),
+            "Cierra": formato_tiempo(r["cierre_min"] / 60),
+            "Pico": formato_tiempo(r["pico_inicio_min"] / 60),
+            "Pico (corredores/h)": round(r["pico_por_hora"]),
+            "Agua (L)": round(r["agua_l"]),
+            "Porciones": r["porciones"],
+            "Voluntarios": r["voluntarios"],
+        }
+        for r in requerimientos
+    ]),
+    hide_index=True,
+    use_container_width=True
+)
+
+st.caption(
+    "Apertura y cierre cubren del 1% al 99% de las llegadas esperadas; el pico y los voluntarios usan "
+    f"la banda alta (90%). Agua y comida alcanzan para el tramo siguiente a cada oasis. "
+    f"{recalculados:,} corredores recalculados en esta actualización."
+)
@@ -0,0 +1,145 @@
+import streamlit as st
+import sys
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+sys.path.append(str(root_path))
+
+import pandas as pd
+
+from utils.memoria import ACTIVO, ANTIGUEDAD_SESION_S, monitor, perfilar_pagina
+
+st.set_page_config(
+    page_title="Memoria del Servidor",
+    page_icon="🧠",
+    layout="wide"
+)
+perfilar_pagina(__file__)
+
+st.title("🧠 Memoria del Servidor")
+st.markdown("Crecimiento de memoria por módulo, página y sesión (depuración)")
+
+st.divider()
+
+# Sólo el operador habilita la página al arrancar el servidor: un visitante
+# no puede prender tracemalloc ni ver las sesiones de los demás
+if not ACTIVO:
+    st.info("Página de depuración deshabilitada. Arranca el servidor con `PERFIL_MEMORIA=1` para usarla.")
+    st.stop()
+
+if not monitor.activo:
+    st.info(
+        "El perfilado de memoria está apagado; tracemalloc agrega una sobrecarga notable mientras está activo."
+    )
+    if st.button("▶️ Activar perfilado"):
+        monitor.iniciar()
+        st.rerun()
+    st.stop()
+
+
+def formato_bytes(valor):
+    if abs(valor) < 1024 * 1024:
+        return f"{valor / 1024:,.1f} KB"
+    return f"{valor / 1024 / 1024:,.1f} MB"
+
+
+resumen = monitor.resumen(detalle=False)
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric("💾 RSS del proceso", formato_bytes(resumen["rss_bytes"]))
+
+with col2:
+    st.metric("🔍 Memoria trazada", formato_bytes(resumen["trazado_bytes"]))
+
+with col3:
+    st.metric("📈 Pico trazado", formato_bytes(resumen["trazado_pico_bytes"]))
+
+with col4:
+    st.metric("👥 Sesiones", len(resumen["sesiones"]))
+
+col_paginas, col_sesiones = st.columns(2)
+
+with col_paginas:
+    st.markdown("### 📄 Crecimiento por página")
+    st.caption("Lo que creció la memoria trazada durante las ejecuciones recientes de cada página")
+    if resumen["paginas"]:
+        df = pd.DataFrame(resumen["paginas"])
+        for columna in ("crecimiento_bytes", "maximo_bytes"):
+            df[columna] = df[columna].map(formato_bytes)
+        st.dataframe(df.rename(columns={
+            "pagina": "Página",
+            "ejecuciones": "Ejecuciones",
+            "crecimiento_bytes": "Crecimiento",
+            "maximo_bytes": "Mayor ejecución",
+        }), hide_index=True, use_container_width=True)
+
+with col_sesiones:
+    st.markdown("### 👥 Sesiones")
+    st.caption(
+        "Tamaño de st.session_state (historial del chat, figuras, DataFrames) y cuánto creció; "
+        f"las sesiones sin actividad en {ANTIGUEDAD_SESION_S // 60} min se quitan"
+    )
+    if resumen["sesiones"]:
+        df = pd.DataFrame(resumen["sesiones"])
+        for columna in ("estado_bytes", "crecimiento_estado_bytes", "crecimiento_bytes"):
+            df[columna] = df[columna].map(formato_bytes)
+        df["ultima"] = pd.to_datetime(df["ultima"], unit="s").dt.strftime("%H:%M:%S")
+        st.dataframe(df[[
+            "sesion", "pagina", "ejecuciones", "estado_bytes", "crecimiento_estado_bytes", "crecimiento_bytes", "ultima"
+        ]].rename(columns={
+            "sesion": "Sesión",
+            "pagina": "Última página",
+            "ejecuciones": "Ejecuciones",
+            "estado_bytes": "session_state",
+            "crecimiento_estado_bytes": "Crecimiento del estado",
+            "crecimiento_bytes": "Crecimiento atribuido",
+            "ultima": "Última ejecución",
+        }), hide_index=True, use_container_width=True)
+
+st.divider()
+
+# El desglose recorre todos los bloques trazados: sólo a pedido
+st.markdown("### 📦 Qué está creciendo")
+if st.button("🔍 Analizar módulos y líneas"):
+    with st.spinner("Comparando con la instantánea de referencia..."):
+        modulos = monitor.crecimiento_por_modulo()
+        lineas = monitor.lineas_que_crecen()
+
+    col_modulos, col_lineas = st.columns(2)
+
+    with col_modulos:
+        st.markdown("**Módulos que más crecieron desde la referencia**")
+        if modulos:
+            df = pd.DataFrame(modulos)
+            df["bytes"] = df["bytes"].map(formato_bytes)
+            st.dataframe(df.rename(columns={"modulo": "Módulo", "bytes": "Crecimiento", "bloques": "Bloques"}),
+                         hide_index=True, use_container_width=True)
+
+    with col_lineas:
+        st.markdown("**Líneas propias que retienen memoria**")
+        if lineas:
+            df = pd.DataFrame(lineas)
+            df["bytes"] = df["bytes"].map(formato_bytes)
+            st.dataframe(df.rename(columns={"modulo": "Módulo", "linea": "Línea", "bytes": "Crecimiento", "bloques": "Bloques"}),
+                         hide_index=True, use_container_width=True)
+
+st.divider()
+
+col_reporte, col_referencia, col_apagar = st.columns(3)
+
+with col_reporte:
+    if st.button("📝 Escribir reporte", use_container_width=True):
+        with st.spinner("Generando reporte..."):
+            st.success(f"Reporte escrito en `{monitor.escribir_reporte()}`")
+
+with col_referencia:
+    if st.button("🔄 Nueva referencia", use_container_width=True):
+        monitor.iniciar()
+        st.rerun()
+
+with col_apagar:
+    if st.button("⏹️ Apagar perfilado", use_container_width=True):
+        monitor.detener()
+        st.rerun()
@@ -0,0 +1,243 @@
+"""
+Pronóstico de carga, insumos y voluntarios por oasis para El Cruce Analyzer
+
+Cada corredor llega a cada oasis en un tiempo incierto (lognormal alrededor
+de su estimación ajustada por pendiente). Sumando las probabilidades de
+llegada de todo el pelotón por franja horaria se obtiene la curva de carga
+de cada oasis con su banda de incertidumbre, y de ahí el agua, la comida y
+los voluntarios que hacen falta. Las llegadas posteriores a la última franja
+se acumulan aparte, así los totales cuentan a todo el pelotón. Las sumas se mantienen de forma
+incremental: cambiar la lista de largada sólo recalcula a los corredores
+que entran, salen o cambian.
+"""
+
+import numpy as np
+
+from data.modelo import modelo_etapa
+from utils.nutricion import requerimientos_peloton
+from utils.perfiles import km_equivalentes_en
+
+ANCHO_FRANJA_MIN = 15
+INCERTIDUMBRE = 0.08
+Z_BANDA = 1.645
+GRAMOS_POR_PORCION = 25
+TIEMPO_ATENCION_MIN = 2.0
+CORREDORES_POR_VOLUNTARIO = 4
+
+
+def horizonte_necesario(etapa, paces_plano, largadas_min, incertidumbre=INCERTIDUMBRE):
+    """
+    Minutos desde la largada que cubren las llegadas de todo el pelotón.
+
+    Es el mayor entre el tiempo límite más la última ola y la llegada al
+    último oasis del corredor más lento con tres desvíos de margen, redondeado
+    a la hora para que cambios chicos de la lista no lo muevan.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        paces_plano: Array de paces en plano (min/km)
+        largadas_min: Array de minutos de largada de cada corredor
+        incertidumbre: Desvío relativo del tiempo de llegada
+
+    Returns:
+        Minutos (múltiplo de 60)
+    """
+    largadas_min = np.asarray(largadas_min, dtype=np.float64)
+    ultima_ola = float(largadas_min.max()) if len(largadas_min) else 0.0
+    horizonte = modelo_etapa(etapa).tiempo_limite_horas * 60 + ultima_ola
+    if etapa["oasis"] and len(largadas_min):
+        ultimo = km_equivalentes_en(etapa["perfil"], [etapa["oasis"][-1]["km"]])[0]
+        llegadas = largadas_min + ultimo * np.asarray(paces_plano, dtype=np.float64)
+        horizonte = max(horizonte, float(llegadas.max()) * np.exp(3 * incertidumbre))
+    return float(np.ceil(horizonte / 60) * 60)
+
+
+def _cdf_normal(x):
+    # Abramowitz y Stegun 7.1.26 (error < 1.5e-7), para no depender de scipy
+    z = np.abs(x) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * z)
+    polinomio = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - polinomio * np.exp(-z * z)
+    return 0.5 * (1 + np.sign(x) * erf)
+
+
+class PronosticoOasis:
+    """
+    Curvas de carga por oasis y franja horaria de todo el pelotón.
+    """
+
+    def __init__(self, etapa, ancho_franja_min=ANCHO_FRANJA_MIN, incertidumbre=INCERTIDUMBRE,
+                 horizonte_min=None):
+        """
+        Args:
+            etapa: Dict con datos de la etapa
+            ancho_franja_min: Duración de cada franja horaria en minutos
+            incertidumbre: Desvío relativo del tiempo de llegada de cada corredor
+            horizonte_min: Minutos desde la largada cubiertos por las franjas
+                (default: tiempo límite; ver horizonte_necesario())
+        """
+        self.etapa = etapa
+        self.incertidumbre = incertidumbre
+        self.oasis = [o["nombre"] for o in etapa["oasis"]]
+        if horizonte_min is None:
+            horizonte_min = modelo_etapa(etapa).tiempo_limite_horas * 60
+        self.bordes = np.arange(0, horizonte_min + ancho_franja_min, ancho_franja_min, dtype=np.float64)
+        self._equivalentes = km_equivalentes_en(etapa["perfil"], [o["km"] for o in etapa["oasis"]])
+
+        forma = (len(self.oasis), len(self.bordes) - 1)
+        self._esperados = np.zeros(forma)
+        self._varianza = np.zeros(forma)
+        self._liquido = np.zeros(forma)
+        self._carbohidratos = np.zeros(forma)
+        # Llegadas después de la última franja, por oasis
+        self._tardios = np.zeros(len(self.oasis))
+        self._liquido_tardio = np.zeros(len(self.oasis))
+        self._carbohidratos_tardio = np.zeros(len(self.oasis))
+        self._corredores = {}
+
+    @property
+    def n(self):
+        """Corredores en la lista de largada."""
+        return len(self._corredores)
+
+    def _contribucion(self, paces_plano, pesos_kg, largadas_min):
+        """Probabilidad de llegada por franja y carga a reponer de cada corredor."""
+        llegada = largadas_min[:, None] + self._equivalentes[None, :] * paces_plano[:, None]
+        # Tiempo lognormal: P(llegada <= borde) para cada corredor, oasis y borde
+        z = (np.log(np.maximum(self.bordes, 1e-9))[None, None, :] - np.log(llegada)[:, :, None]) / self.incertidumbre
+        acumuladas = _cdf_normal(z)
+        probabilidades = np.diff(acumuladas, axis=2)
+        tardios = 1 - acumuladas[:, :, -1]
+
+        # En cada oasis se carga lo necesario para el tramo siguiente
+        requerimientos = requerimientos_peloton(self.etapa, pesos_kg, paces_plano)
+        liquido = requerimientos["liquido_ml"][:, 1:] / 1000
+        carbohidratos = requerimientos["carbohidratos_g"][:, 1:]
+        return probabilidades, tardios, liquido, carbohidratos
+
+    def _acumular(self, paces_plano, pesos_kg, largadas_min, signo):
+        if len(paces_plano) == 0:
+            return
+        probabilidades, tardios, liquido, carbohidratos = self._contribucion(
+            np.asarray(paces_plano, dtype=np.float64),
+            np.asarray(pesos_kg, dtype=np.float64),
+            np.asarray(largadas_min, dtype=np.float64)
+        )
+        self._esperados += signo * probabilidades.sum(axis=0)
+        self._varianza += signo * (probabilidades * (1 - probabilidades)).sum(axis=0)
+        self._liquido += signo * np.einsum("nmb,nm->mb", probabilidades, liquido)
+        self._carbohidratos += signo * np.einsum("nmb,nm->mb", probabilidades, carbohidratos)
+        self._tardios += signo * tardios.sum(axis=0)
+        self._liquido_tardio += signo * (tardios * liquido).sum(axis=0)
+        self._carbohidratos_tardio += signo * (tardios * carbohidratos).sum(axis=0)
+
+    def _sacar(self, dorsales):
+        datos = [self._corredores.pop(d) for d in dorsales]
+        if datos:
+            self._acumular(*zip(*datos), signo=-1)
+
+    def actualizar(self, inscriptos):
+        """
+        Aplica una nueva lista de largada recalculando sólo las diferencias.
+
+        Args:
+            inscriptos: Lista de dicts con "dorsal", "pace_plano", "peso_kg" y
+                opcionalmente "largada_min" (minutos de su ola)
+
+        Returns:
+            Cantidad de corredores recalculados (altas, bajas y cambios)
+        """
+        nuevos = {
+            i["dorsal"]: (float(i["pace_plano"]), float(i["peso_kg"]), float(i.get("largada_min", 0.0)))
+            for i in inscriptos
+        }
+        salen = [d for d, datos in self._corredores.items() if nuevos.get(d) != datos]
+        entran = [d for d, datos in nuevos.items() if self._corredores.get(d) != datos]
+        self._sacar(salen)
+        if entran:
+            self._acumular(*zip(*(nuevos[d] for d in entran)), signo=1)
+            self._corredores.update((d, nuevos[d]) for d in entran)
+        if not self._corredores:
+            # Sin corredores las sumas vuelven a cero exacto, sin error de redondeo
+            for suma in (self._esperados, self._varianza, self._liquido, self._carbohidratos,
+                         self._tardios, self._liquido_tardio, self._carbohidratos_tardio):
+                suma.fill(0.0)
+        return len(salen) + len(entran) - len(set(salen) & set(entran))
+
+    def curvas(self, z=Z_BANDA):
+        """
+        Llegadas por oasis y franja horaria con su banda de incertidumbre.
+
+        Args:
+            z: Ancho de la banda en desvíos (1.645 = 90%)
+
+        Returns:
+            Dict con "oasis", "inicio_min" (de cada franja) y arrays
+            (oasis x franjas) de "esperados", "inferior", "superior",
+            "agua_l" y "porciones" (estimación alta, para planificar)
+        """
+        esperados = np.maximum(self._esperados, 0.0)
+        desvio = np.sqrt(np.maximum(self._varianza, 0.0))
+        superior = esperados + z * desvio
+        # Insumos por corredor que llega en la franja, escalados a la banda alta
+        por_corredor = superior / np.maximum(esperados, 1e-9)
+        return {
+            "oasis": self.oasis,
+            "inicio_min": self.bordes[:-1],
+            "esperados": esperados,
+            "inferior": np.maximum(esperados - z * desvio, 0.0),
+            "superior": superior,
+            "agua_l": np.maximum(self._liquido, 0.0) * por_corredor,
+            "porciones": np.maximum(self._carbohidratos, 0.0) * por_corredor / GRAMOS_POR_PORCION,
+        }
+
+    def requerimientos(self, z=Z_BANDA, tiempo_atencion_min=TIEMPO_ATENCION_MIN,
+                       corredores_por_voluntario=CORREDORES_POR_VOLUNTARIO):
+        """
+        Agua, comida y voluntarios por oasis.
+
+        Los voluntarios salen de la ley de Little: corredores atendidos a la
+        vez = llegadas por minuto en la franja más cargada x tiempo de atención.
+
+        Args:
+            z: Ancho de la banda en desvíos
+            tiempo_atencion_min: Minutos que cada corredor pasa en el oasis
+            corredores_por_voluntario: Corredores que atiende un voluntario a la vez
+
+        Returns:
+            Lista de dicts por oasis con "oasis", "corredores", "apertura_min",
+            "cierre_min", "pico_inicio_min", "pico_por_hora" (banda alta),
+            "agua_l" y "porciones" (totales esperados, incluidas las
+            llegadas después del horizonte), "fuera_de_horizonte"
+            (corredores esperados después de la última franja) y "voluntarios"
+        """
+        curvas = self.curvas(z)
+        ancho = np.diff(self.bordes)
+        tardios = np.maximum(self._tardios, 0.0)
+        acumulado = np.cumsum(curvas["esperados"], axis=1)
+        total = np.maximum(acumulado[:, -1:] + tardios[:, None], 1e-9)
+        apertura = np.argmax(acumulado / total >= 0.01, axis=1)
+        # Si el 99% llega después del horizonte, el cierre queda en la última franja
+        cierre = np.where((acumulado / total >= 0.99).any(axis=1), np.argmax(acumulado / total >= 0.99, axis=1),
+                          len(ancho) - 1)
+        pico = np.argmax(curvas["superior"], axis=1)
+        por_minuto = curvas["superior"][np.arange(len(self.oasis)), pico] / ancho[pico]
+        voluntarios = np.ceil(por_minuto * tiempo_atencion_min / corredores_por_voluntario).astype(int)
+
+        return [
+            {
+                "oasis": nombre,
+                "corredores": float(acumulado[i, -1] + tardios[i]),
+                "fuera_de_horizonte": float(tardios[i]),
+                "apertura_min": float(self.bordes[apertura[i]]),
+                "cierre_min": float(self.bordes[cierre[i] + 1]),
+                "pico_inicio_min": float(self.bordes[pico[i]]),
+                "pico_por_hora": float(por_minuto[i] * 60),
+                "agua_l": float(max(self._liquido[i].sum() + self._liquido_tardio[i], 0.0)),
+                "porciones": int(np.ceil(
+                    max(self._carbohidratos[i].sum() + self._carbohidratos_tardio[i], 0.0) / GRAMOS_POR_PORCION
+                )),
+                "voluntarios": int(voluntarios[i]),
+            }
+            for i, nombre in enumerate(self.oasis)
+        ]
@@ -0,0 +1,276 @@
+"""
+Curva personal de pace según pendiente a partir de entrenamientos
+
+Lee actividades GPX, TCX o FIT en un pool de procesos, las corta en
+ventanas de distancia fija y ajusta, con medianas por banda de pendiente,
+una curva pace-pendiente propia del corredor que luego se aplica a cada
+tramo de las etapas.
+"""
+
+import io
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.cache_disco import cache
+from utils.perfiles import grilla_tramos
+from utils.rutas import distancias_acumuladas
+from utils.segmentacion import segmentar_perfil
+
+VENTANA_M = 200
+PACE_MINIMO = 2.5
+PACE_MAXIMO = 40.0
+PENDIENTE_MAXIMA_PCT = 40.0
+ANCHO_BANDA_PCT = 2.0
+MINIMO_MUESTRAS = 5
+
+
+def _nombre_local(etiqueta):
+    return etiqueta.rsplit("}", 1)[-1]
+
+
+def _leer_gpx(contenido):
+    tiempos, lats, lons, altitudes = [], [], [], []
+    for _, elemento in ET.iterparse(io.BytesIO(contenido), events=("end",)):
+        if _nombre_local(elemento.tag) != "trkpt":
+            continue
+        hijos = {_nombre_local(hijo.tag): hijo.text for hijo in elemento}
+        if hijos.get("time"):
+            tiempos.append(hijos["time"])
+            lats.append(float(elemento.get("lat")))
+            lons.append(float(elemento.get("lon")))
+            altitudes.append(float(hijos["ele"]) if hijos.get("ele") else np.nan)
+        elemento.clear()
+    return tiempos, np.array(lats), np.array(lons), np.array(altitudes), None
+
+
+def _leer_tcx(contenido):
+    tiempos, lats, lons, altitudes, distancias = [], [], [], [], []
+    for _, elemento in ET.iterparse(io.BytesIO(contenido), events=("end",)):
+        if _nombre_local(elemento.tag) != "Trackpoint":
+            continue
+        valores = {_nombre_local(hijo.tag): hijo.text for hijo in elemento.iter()}
+        if valores.get("Time") and valores.get("LatitudeDegrees"):
+            tiempos.append(valores["Time"])
+            lats.append(float(valores["LatitudeDegrees"]))
+            lons.append(float(valores["LongitudeDegrees"]))
+            altitudes.append(float(valores["AltitudeMeters"]) if valores.get("AltitudeMeters") else np.nan)
+            distancias.append(float(valores["DistanceMeters"]) if valores.get("DistanceMeters") else np.nan)
+        elemento.clear()
+    distancias = np.array(distancias)
+    return tiempos, np.array(lats), np.array(lons), np.array(altitudes), distancias
+
+
+def _leer_fit(contenido):
+    import fitparse  # Dependencia opcional, sólo para archivos FIT
+
+    semicirculos = 180 / 2 ** 31
+    tiempos, lats, lons, altitudes, distancias = [], [], [], [], []
+    for registro in fitparse.FitFile(io.BytesIO(contenido)).get_messages("record"):
+        valores = registro.get_values()
+        if valores.get("timestamp") is None or valores.get("position_lat") is None:
+            continue
+        tiempos.append(valores["timestamp"])
+        lats.append(valores["position_lat"] * semicirculos)
+        lons.append(valores["position_long"] * semicirculos)
+        altitud = valores.get("enhanced_altitude", valores.get("altitude"))
+        altitudes.append(np.nan if altitud is None else altitud)
+        distancia = valores.get("distance")
+        distancias.append(np.nan if distancia is None else distancia)
+    return tiempos, np.array(lats), np.array(lons), np.array(altitudes, dtype=np.float64), np.array(
+        distancias, dtype=np.float64
+    )
+
+
+def muestras_actividad(nombre, contenido, ventana_m=VENTANA_M):
+    """
+    Pendiente y pace de cada ventana de distancia fija de una actividad.
+
+    Args:
+        nombre: Nombre del archivo (la extensión define el formato)
+        contenido: Bytes del archivo
+        ventana_m: Largo de cada ventana en metros
+
+    Returns:
+        Tupla (pendientes_pct, paces_min_km) de arrays float32
+    """
+    extension = nombre.lower().rsplit(".", 1)[-1]
+    lectores = {"gpx": _leer_gpx, "tcx": _leer_tcx, "fit": _leer_fit}
+    if extension not in lectores:
+        raise ValueError(f"Formato no soportado: {nombre}")
+    tiempos, lats, lons, altitudes, distancias = lectores[extension](contenido)
+
+    vacio = (np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32))
+    if len(tiempos) < 2 or np.isnan(altitudes).all():
+        return vacio
+
+    segundos = pd.to_datetime(pd.Series(tiempos), utc=True).astype("int64").to_numpy() / 1e9
+    if distancias is not None and not np.isnan(distancias).any():
+        metros = distancias
+    else:
+        metros = distancias_acumuladas(lats, lons) * 1000
+    validos = ~np.isnan(altitudes)
+    altitudes = np.interp(metros, metros[validos], altitudes[validos])
+
+    # Ventanas de distancia fija; las pausas quedan como paces muy lentos
+    metros = np.maximum.accumulate(metros)
+    bordes = np.arange(metros[0], metros[-1], ventana_m)
+    if len(bordes) < 2:
+        return vacio
+    tiempo_bordes = np.interp(bordes, metros, segundos)
+    altitud_bordes = np.interp(bordes, metros, altitudes)
+    paces = np.diff(tiempo_bordes) / 60 / (ventana_m / 1000)
+    pendientes = np.diff(altitud_bordes) / ventana_m * 100
+
+    utiles = (
+        (paces >= PACE_MINIMO) & (paces <= PACE_MAXIMO)
+        & (np.abs(pendientes) <= PENDIENTE_MAXIMA_PCT)
+    )
+    return pendientes[utiles].astype(np.float32), paces[utiles].astype(np.float32)
+
+
+def _procesar(archivo):
+    nombre, contenido = archivo
+    try:
+        # Un archivo ya procesado (en cualquier sesión o proceso) no se vuelve a leer
+        muestras = cache.obtener_o_calcular(
+            contenido,
+            lambda: dict(zip(("pendientes", "paces"), muestras_actividad(nombre, contenido))),
+            "actividad", nombre.lower().rsplit(".", 1)[-1], VENTANA_M
+        )
+        return nombre, (muestras["pendientes"], muestras["paces"]), None
+    except Exception as e:  # Un archivo dañado no frena al resto
+        return nombre, None, str(e)
+
+
+def analizar_actividades(archivos, procesos=None):
+    """
+    Extrae las muestras de muchas actividades en un pool de procesos.
+
+    Args:
+        archivos: Iterable de tuplas (nombre, bytes)
+        procesos: Cantidad de procesos (default: CPUs disponibles; 1 = sin pool)
+
+    Returns:
+        Dict con arrays "pendientes" y "paces", "actividades" (cantidad leída)
+        y "errores" (lista de tuplas (nombre, mensaje))
+    """
+    pendientes, paces, errores = [], [], []
+    actividades = 0
+
+    def acumular(resultados):
+        nonlocal actividades
+        for nombre, muestras, error in resultados:
+            if error:
+                errores.append((nombre, error))
+            else:
+                actividades += 1
+                pendientes.append(muestras[0])
+                paces.append(muestras[1])
+
+    if procesos == 1:
+        acumular(map(_procesar, archivos))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            acumular(pool.map(_procesar, archivos, chunksize=4))
+
+    return {
+        "pendientes": np.concatenate(pendientes) if pendientes else np.empty(0, dtype=np.float32),
+        "paces": np.concatenate(paces) if paces else np.empty(0, dtype=np.float32),
+        "actividades": actividades,
+        "errores": errores,
+    }
+
+
+def ajustar_curva(pendientes, paces, ancho_pct=ANCHO_BANDA_PCT, minimo_muestras=MINIMO_MUESTRAS):
+    """
+    Ajusta la curva pace-pendiente con medianas por banda de pendiente.
+
+    Args:
+        pendientes: Array de pendientes en %
+        paces: Array de paces en min/km
+        ancho_pct: Ancho de cada banda de pendiente
+        minimo_muestras: Muestras mínimas para usar una banda
+
+    Returns:
+        Dict con "centros", "p25", "mediana", "p75" y "muestras" por banda
+        válida, "coeficientes" (polinomio de grado 2), "pendiente_minima",
+        "pendiente_maxima" y "pace_plano"; None si no hay datos suficientes
+    """
+    pendientes = np.asarray(pendientes, dtype=np.float64)
+    paces = np.asarray(paces, dtype=np.float64)
+    bordes = np.arange(-PENDIENTE_MAXIMA_PCT, PENDIENTE_MAXIMA_PCT + ancho_pct, ancho_pct)
+    bandas = np.clip(np.digitize(pendientes, bordes) - 1, 0, len(bordes) - 2)
+
+    # Cuantiles por banda en una sola pasada: ordenar por banda y por pace
+    orden = np.lexsort((paces, bandas))
+    ordenados = paces[orden]
+    conteos = np.bincount(bandas, minlength=len(bordes) - 1)
+    inicios = np.concatenate(([0], np.cumsum(conteos)[:-1]))
+    validas = conteos >= minimo_muestras
+    if validas.sum() < 3:
+        return None
+
+    def cuantil(q):
+        posiciones = inicios[validas] + np.floor(q * (conteos[validas] - 1)).astype(np.int64)
+        return ordenados[posiciones]
+
+    centros = (bordes[:-1] + ancho_pct / 2)[validas]
+    mediana = cuantil(0.5)
+    coeficientes = np.polyfit(centros, mediana, 2, w=np.sqrt(conteos[validas]))
+    return {
+        "centros": centros,
+        "p25": cuantil(0.25),
+        "mediana": mediana,
+        "p75": cuantil(0.75),
+        "muestras": conteos[validas],
+        "coeficientes": coeficientes,
+        "pendiente_minima": float(centros.min()),
+        "pendiente_maxima": float(centros.max()),
+        "pace_plano": float(np.polyval(coeficientes, 0.0)),
+    }
+
+
+def pace_en_pendiente(curva, pendientes):
+    """
+    Pace personal en una o varias pendientes.
+
+    Fuera del rango entrenado se usa el pace del borde más cercano.
+
+    Args:
+        curva: Dict devuelto por ajustar_curva()
+        pendientes: Pendiente en % (escalar o array)
+
+    Returns:
+        Pace en min/km
+    """
+    g = np.clip(pendientes, curva["pendiente_minima"], curva["pendiente_maxima"])
+    return np.maximum(np.polyval(curva["coeficientes"], g), PACE_MINIMO)
+
+
+def predecir_etapa(curva, etapa, paso_km=0.5):
+    """
+    Tiempo de una etapa y de cada uno de sus segmentos con la curva personal.
+
+    Args:
+        curva: Dict devuelto por ajustar_curva()
+        etapa: Dict con datos de la etapa
+        paso_km: Resolución de la grilla de cálculo en km
+
+    Returns:
+        Dict con "tiempo_min" y "segmentos" (los de segmentar_perfil() con
+        "tiempo_min" y "pace_min_km")
+    """
+    inicios, fines, pendientes = grilla_tramos(etapa, paso_km)
+    minutos = (fines - inicios) * pace_en_pendiente(curva, pendientes)
+    acumulado = np.concatenate(([0.0], np.cumsum(minutos)))
+    kms = np.append(inicios, fines[-1])
+
+    segmentos = segmentar_perfil(etapa["perfil"])
+    llegadas = np.interp([[s["km_inicio"], s["km_fin"]] for s in segmentos], kms, acumulado)
+    for segmento, (desde, hasta) in zip(segmentos, llegadas):
+        segmento["tiempo_min"] = float(hasta - desde)
+        segmento["pace_min_km"] = float((hasta - desde) / segmento["longitud_km"])
+    return {"tiempo_min": float(acumulado[-1]), "segmentos": segmentos}
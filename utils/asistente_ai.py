@@ -6,6 +6,18 @@ import os
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from data.modelo import modelo_etapa
+from utils.metricas_ia import medir_llamada, PresupuestoExcedido
+from utils.plan_entrenamiento import (
+    SEMANAS_POR_LLAMADA, clave_semana, especificacion_semana, guardar_semana,
+    parsear_semanas, prompt_semanas, semana_en_cache,
+)
+from utils.segmentacion import segmentar_perfil, describir_segmento
+from utils.herramientas_ia import HERRAMIENTAS, ejecutar_herramienta, responder_localmente
+
+# Rondas máximas de llamadas a herramientas por pregunta
+MAX_RONDAS_HERRAMIENTAS = 3
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -23,16 +35,20 @@ def crear_contexto_etapas(etapas):
         contexto += f"{etapa['nombre']}:\n"
         contexto += f"- Distancia: {etapa['distancia_km']}km\n"
         contexto += f"- Desnivel positivo: {etapa['desnivel_positivo']}m\n"
-        contexto += f"- Intensidad: {etapa['desnivel_positivo']/etapa['distancia_km']:.1f} m/km\n"
+        contexto += f"- Intensidad: {modelo_etapa(etapa).intensidad_m_km:.1f} m/km\n"
         contexto += f"- Inicio: {etapa['inicio']}\n"
         contexto += f"- Fin: {etapa['fin']}\n"
         contexto += f"- Características: {etapa['caracteristicas']}\n"
-        contexto += f"- Oasis: {len(etapa['oasis'])} puntos\n\n"
+        contexto += f"- Oasis: {len(etapa['oasis'])} puntos\n"
+        contexto += "- Tramos:\n"
+        for segmento in segmentar_perfil(etapa['perfil']):
+            contexto += f"  - {describir_segmento(segmento)}\n"
+        contexto += "\n"
     
     return contexto
 
 
-def generar_respuesta_asistente(pregunta_usuario, etapas, historial=[]):
+def generar_respuesta_asistente(pregunta_usuario, etapas, historial=[], sesion_id=None):
     """
     Genera una respuesta del asistente usando GPT-4.
     
@@ -40,11 +56,17 @@ def generar_respuesta_asistente(pregunta_usuario, etapas, historial=[]):
         pregunta_usuario: La pregunta del usuario
         etapas: Lista de datos de etapas
         historial: Lista de mensajes previos (opcional)
+        sesion_id: Identificador de la sesión para métricas y presupuesto
     
     Returns:
         Respuesta del asistente
     """
     
+    # Preguntas numéricas inequívocas: responder sin llamar a la API
+    respuesta_local = responder_localmente(pregunta_usuario, etapas)
+    if respuesta_local is not None:
+        return respuesta_local
+    
     # Sistema de prompt
     system_prompt = f"""Eres un asistente experto en trail running y entrenamiento para carreras de montaña.
 Tu especialidad es ayudar a corredores a prepararse para El Cruce Saucony 2025, una carrera por etapas de 3 días 
@@ -60,6 +82,7 @@ IMPORTANTE:
 - Si preguntan sobre estrategia de carrera, usa los datos de altimetría
 - Si preguntan sobre nutrición/hidratación, considera la ubicación de los oasis
 - Tiempo límite: 15 min/km por etapa
+- Para tiempos, paces, cortes, calorías, altitudes u oasis usa siempre las herramientas de cálculo
 - Formato: Usa markdown para estructura (listas, negritas, etc.)
 """
     
@@ -73,57 +96,112 @@ IMPORTANTE:
     mensajes.append({"role": "user", "content": pregunta_usuario})
     
     try:
-        # Llamada a OpenAI
-        respuesta = client.chat.completions.create(
-            model="gpt-4o-mini",  # Modelo más económico
-            messages=mensajes,
-            temperature=0.7,
-            max_tokens=800
-        )
-        
-        return respuesta.choices[0].message.content
+        for ronda in range(MAX_RONDAS_HERRAMIENTAS + 1):
+            # Llamada a OpenAI (la última ronda ya no ofrece herramientas)
+            opciones = {"tools": HERRAMIENTAS} if ronda < MAX_RONDAS_HERRAMIENTAS else {}
+            respuesta = medir_llamada(
+                client,
+                sesion_id,
+                "chat",
+                model="gpt-4o-mini",  # Modelo más económico
+                messages=mensajes,
+                temperature=0.7,
+                max_tokens=800,
+                **opciones
+            )
+            
+            mensaje = respuesta.choices[0].message
+            if not mensaje.tool_calls:
+                return mensaje.content
+            
+            # Ejecutar las herramientas pedidas y devolver los resultados
+            mensajes.append({
+                "role": "assistant",
+                "content": mensaje.content,
+                "tool_calls": [llamada.model_dump() for llamada in mensaje.tool_calls]
+            })
+            for llamada in mensaje.tool_calls:
+                mensajes.append({
+                    "role": "tool",
+                    "tool_call_id": llamada.id,
+                    "content": ejecutar_herramienta(
+                        llamada.function.name, llamada.function.arguments, etapas
+                    )
+                })
+    
+    except PresupuestoExcedido as e:
+        return f"⚠️ {e}. Intenta más tarde."
     
     except Exception as e:
         return f"Error al generar respuesta: {str(e)}"
 
 
-def generar_plan_entrenamiento(semanas_disponibles, nivel_actual, objetivo_pace, etapas):
+def generar_plan_entrenamiento(semanas_disponibles, nivel_actual, objetivo_pace, etapas, sesion_id=None):
     """
-    Genera un plan de entrenamiento personalizado.
+    Genera un plan de entrenamiento personalizado, estructurado por semana.
+
+    Cada semana se guarda en caché según cuántas faltan para la carrera, el
+    nivel y el pace, así que sólo se piden al modelo las semanas que cambian.
+
+    Args:
+        semanas_disponibles: Semanas hasta la carrera
+        nivel_actual: Nivel del corredor
+        objetivo_pace: Pace objetivo en min/km
+        etapas: Lista de etapas
+        sesion_id: Identificador de la sesión para métricas y presupuesto
+
+    Returns:
+        Dict con "semanas" (lista de semanas, de la primera a la de carrera),
+        "semanas_totales" (semanas pedidas), "nuevas" (semanas generadas en
+        esta llamada) y "error" (mensaje o None)
     """
-    
-    prompt = f"""Genera un plan de entrenamiento de {semanas_disponibles} semanas para El Cruce Saucony 2025.
-
-Perfil del corredor:
-- Nivel actual: {nivel_actual}
-- Objetivo de pace: {objetivo_pace} min/km
-- Etapas a completar: 3 días consecutivos, ~93km totales, +4,400m desnivel
-
-Estructura el plan por semanas con:
-1. Objetivo de la semana
-2. Días de entrenamiento (tipo y duración)
-3. Desnivel acumulado semanal objetivo
-4. Punto clave a trabajar
-
-Sé específico y progresivo. Considera que necesitan entrenar:
-- Resistencia aeróbica
-- Fuerza en piernas
-- Técnica de subida/bajada
-- Adaptación a desnivel acumulado
-"""
-    
-    try:
-        respuesta = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": crear_contexto_etapas(etapas)},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500
-        )
-        
-        return respuesta.choices[0].message.content
-    
-    except Exception as e:
-        return f"Error al generar plan: {str(e)}"
\ No newline at end of file
+    modelo = "gpt-4o-mini"
+    especificaciones = [
+        especificacion_semana(restantes, nivel_actual) for restantes in range(semanas_disponibles, 0, -1)
+    ]
+    claves = {e["semanas_restantes"]: clave_semana(e["semanas_restantes"], nivel_actual, objetivo_pace, modelo)
+              for e in especificaciones}
+    semanas = {r: semana for r, clave in claves.items() if (semana := semana_en_cache(clave)) is not None}
+    faltantes = [e for e in especificaciones if e["semanas_restantes"] not in semanas]
+
+    nuevas, error = 0, None
+    for inicio in range(0, len(faltantes), SEMANAS_POR_LLAMADA):
+        lote = faltantes[inicio:inicio + SEMANAS_POR_LLAMADA]
+        try:
+            respuesta = medir_llamada(
+                client,
+                sesion_id,
+                "plan",
+                model=modelo,
+                messages=[
+                    {"role": "system", "content": crear_contexto_etapas(etapas)},
+                    {"role": "user", "content": prompt_semanas(lote, nivel_actual, objetivo_pace)}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.7,
+                max_tokens=350 * len(lote) + 100
+            )
+            generadas = parsear_semanas(respuesta.choices[0].message.content, lote)
+        except PresupuestoExcedido as e:
+            error = f"⚠️ {e}. Intenta más tarde."
+            break
+        except ValueError:
+            error = "Error al generar plan: la respuesta no tenía el formato esperado"
+            continue
+        except Exception as e:
+            error = f"Error al generar plan: {str(e)}"
+            break
+
+        for restantes, semana in generadas.items():
+            guardar_semana(claves[restantes], semana)
+            semanas[restantes] = semana
+            nuevas += 1
+        if len(generadas) < len(lote):
+            error = "Algunas semanas no se pudieron generar; vuelve a intentar para completarlas"
+
+    return {
+        "semanas": [semanas[e["semanas_restantes"]] for e in especificaciones if e["semanas_restantes"] in semanas],
+        "semanas_totales": semanas_disponibles,
+        "nuevas": nuevas,
+        "error": error,
+    }
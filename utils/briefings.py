@@ -0,0 +1,265 @@
+"""
+Generador masivo de briefings de carrera sin llamadas a la API
+
+Completa plantillas (Markdown, HTML o PDF) con los tiempos por etapa, la
+llegada y el margen en cada corte y la carga de carbohidratos y líquido por
+tramo, para toda una lista de inscriptos. Los cálculos se vectorizan sobre
+los corredores de cada lote y los lotes se reparten en un pool de procesos:
+
+    python -m utils.briefings inscriptos.csv briefings/ --formato html
+"""
+
+import argparse
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+
+import numpy as np
+import pandas as pd
+
+from data.etapas import ETAPAS, RESUMEN_EVENTO
+from utils.calculadora import formato_tiempo
+from utils.cortes import barreras_corte
+from utils.nutricion import requerimientos_peloton
+from utils.perfiles import km_equivalentes_en, tiempo_hasta_km
+
+CARPETA_PLANTILLAS = Path(__file__).parent.parent / "data" / "plantillas"
+FORMATOS = ("md", "html", "pdf")
+PESO_DEFECTO_KG = 70
+TAMANO_CACHE = 20000
+
+_FILAS = {
+    "md": {
+        "punto": "| $nombre | $km | $llegada | $corte | $margen |",
+        "tramo": "| $tramo | $carbohidratos g | $liquido ml |",
+        "alerta": "**$texto**",
+    },
+    "html": {
+        "punto": "<tr><td>$nombre</td><td>$km</td><td>$llegada</td><td>$corte</td><td>$margen</td></tr>",
+        "tramo": "<tr><td>$tramo</td><td>$carbohidratos g</td><td>$liquido ml</td></tr>",
+        "alerta": '<span class="alerta">$texto</span>',
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def _plantilla(nombre):
+    return Template((CARPETA_PLANTILLAS / nombre).read_text(encoding="utf-8"))
+
+
+def _texto(valor, formato):
+    return html.escape(str(valor)) if formato == "html" else str(valor)
+
+
+def cargar_inscriptos(archivo):
+    """
+    Carga la lista de inscriptos.
+
+    El CSV debe tener columnas dorsal, nombre y pace_promedio (min/km);
+    peso_kg es opcional.
+
+    Args:
+        archivo: Ruta o archivo subido
+
+    Returns:
+        Lista de dicts con "dorsal", "nombre", "pace_promedio" y "peso_kg"
+    """
+    df = pd.read_csv(archivo)
+    faltantes = {"dorsal", "nombre", "pace_promedio"} - set(df.columns)
+    if faltantes:
+        raise ValueError(f"Faltan columnas en la lista de inscriptos: {', '.join(sorted(faltantes))}")
+    if "peso_kg" not in df.columns:
+        df["peso_kg"] = PESO_DEFECTO_KG
+    df["peso_kg"] = df["peso_kg"].fillna(PESO_DEFECTO_KG)
+    if (df["pace_promedio"] <= 0).any() or df["pace_promedio"].isna().any():
+        raise ValueError("Todos los inscriptos necesitan un pace promedio positivo")
+    return df[["dorsal", "nombre", "pace_promedio", "peso_kg"]].to_dict("records")
+
+
+def _margen(minutos, formato):
+    texto = ("+" if minutos >= 0 else "-") + formato_tiempo(abs(minutos) / 60)
+    if minutos < 0:
+        return Template(_FILAS[formato]["alerta"]).substitute(texto=texto)
+    return texto
+
+
+def _bloques_etapa(etapa, paces, pesos, formato, tiempo_limite_min_km):
+    """Bloques de una etapa para varios corredores, calculados en conjunto."""
+    filas = _FILAS[formato]
+    pace_plano = paces * etapa["distancia_km"] / km_equivalentes_en(etapa["perfil"], etapa["distancia_km"])
+    barreras = barreras_corte(etapa, tiempo_limite_min_km)
+    llegadas = tiempo_hasta_km(etapa["perfil"], [b["km"] for b in barreras], pace_plano[:, None])
+    requerimientos = requerimientos_peloton(etapa, pesos, pace_plano)
+
+    bloques = []
+    for j in range(len(paces)):
+        puntos = "\n".join(
+            Template(filas["punto"]).substitute(
+                nombre=_texto(b["nombre"], formato),
+                km=f"{b['km']:g}",
+                llegada=formato_tiempo(llegadas[j, k] / 60),
+                corte=formato_tiempo(b["limite_min"] / 60),
+                margen=_margen(b["limite_min"] - llegadas[j, k], formato),
+            )
+            for k, b in enumerate(barreras)
+        )
+        tramos = "\n".join(
+            Template(filas["tramo"]).substitute(
+                tramo=_texto(nombre, formato),
+                carbohidratos=int(round(requerimientos["carbohidratos_g"][j, k], -1)),
+                liquido=int(round(requerimientos["liquido_ml"][j, k], -1)),
+            )
+            for k, nombre in enumerate(requerimientos["tramos"])
+        )
+        bloques.append(_plantilla(f"etapa.{formato}").substitute(
+            nombre=_texto(etapa["nombre"], formato),
+            distancia=etapa["distancia_km"],
+            desnivel=etapa["desnivel_positivo"],
+            inicio=_texto(etapa["inicio"], formato),
+            fin=_texto(etapa["fin"], formato),
+            tiempo=formato_tiempo(llegadas[j, -1] / 60),
+            limite=formato_tiempo(barreras[-1]["limite_min"] / 60),
+            puntos=puntos,
+            tramos=tramos,
+        ))
+    return bloques, llegadas[:, -1]
+
+
+# Bloques ya armados en este proceso, por (formato, pace, peso, límite):
+# corredores con el mismo pace y peso comparten todo salvo el encabezado
+_BLOQUES = {}
+
+
+def _renderizar_lote(inscriptos, etapas, formato, tiempo_limite_min_km):
+    """
+    Renderiza los briefings de un lote de inscriptos.
+
+    Returns:
+        Lista de tuplas (dorsal, texto); en PDF el texto es el Markdown
+    """
+    formato_plantilla = "md" if formato == "pdf" else formato
+    claves = {
+        (formato_plantilla, float(i["pace_promedio"]), float(i["peso_kg"]), tiempo_limite_min_km)
+        for i in inscriptos
+    }
+    faltantes = sorted(claves - _BLOQUES.keys())
+    if faltantes:
+        if len(_BLOQUES) + len(faltantes) > TAMANO_CACHE:
+            _BLOQUES.clear()
+        paces = np.array([c[1] for c in faltantes])
+        pesos = np.array([c[2] for c in faltantes])
+        por_etapa = [
+            _bloques_etapa(etapa, paces, pesos, formato_plantilla, tiempo_limite_min_km)
+            for etapa in etapas
+        ]
+        for j, clave in enumerate(faltantes):
+            _BLOQUES[clave] = (
+                "\n".join(bloques[j] for bloques, _ in por_etapa),
+                sum(minutos[j] for _, minutos in por_etapa) / 60,
+            )
+
+    resultado = []
+    for inscripto in inscriptos:
+        etapas_texto, horas = _BLOQUES[(
+            formato_plantilla, float(inscripto["pace_promedio"]), float(inscripto["peso_kg"]),
+            tiempo_limite_min_km
+        )]
+        resultado.append((inscripto["dorsal"], _plantilla(f"briefing.{formato_plantilla}").substitute(
+            evento=_texto(RESUMEN_EVENTO["nombre"], formato_plantilla),
+            nombre=_texto(inscripto["nombre"], formato_plantilla),
+            dorsal=_texto(inscripto["dorsal"], formato_plantilla),
+            pace=f"{inscripto['pace_promedio']:g}",
+            tiempo_total=formato_tiempo(horas),
+            etapas=etapas_texto,
+            limite_min_km=f"{tiempo_limite_min_km:g}",
+        )))
+    return resultado
+
+
+def _guardar_pdf(texto, ruta):
+    from fpdf import FPDF  # Dependencia opcional, sólo para PDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    for linea in texto.replace("→", "->").splitlines():
+        if linea.startswith("|---"):
+            continue
+        if linea.startswith("#"):
+            pdf.set_font("Helvetica", "B", 16 if linea.startswith("# ") else 12)
+            linea = linea.lstrip("# ")
+        else:
+            pdf.set_font("Helvetica", size=10)
+            linea = linea.strip("|").replace(" | ", "    ")
+        pdf.multi_cell(0, 6, linea.replace("**", "").encode("latin-1", "replace").decode("latin-1"),
+                       new_x="LMARGIN", new_y="NEXT")
+    pdf.output(str(ruta))
+
+
+def _generar_lote(inscriptos, etapas, formato, tiempo_limite_min_km, carpeta):
+    """Renderiza un lote y lo escribe en la carpeta de salida (corre en un worker)."""
+    for dorsal, texto in _renderizar_lote(inscriptos, etapas, formato, tiempo_limite_min_km):
+        ruta = Path(carpeta) / f"briefing_{dorsal}.{formato}"
+        if formato == "pdf":
+            _guardar_pdf(texto, ruta)
+        else:
+            ruta.write_text(texto, encoding="utf-8")
+    return len(inscriptos)
+
+
+def generar_briefings(inscriptos, carpeta, formato="md", etapas=ETAPAS,
+                      tiempo_limite_min_km=RESUMEN_EVENTO["tiempo_limite_min_km"],
+                      procesos=None, tamano_lote=500):
+    """
+    Genera un briefing por inscripto en una carpeta.
+
+    Args:
+        inscriptos: Lista de dicts (ver cargar_inscriptos)
+        carpeta: Carpeta de salida (se crea si no existe)
+        formato: "md", "html" o "pdf" (PDF necesita fpdf2)
+        etapas: Lista de dicts con datos de etapas
+        tiempo_limite_min_km: Tiempo límite en min/km para los cortes
+        procesos: Cantidad de procesos (default: CPUs disponibles; 1 = sin pool)
+        tamano_lote: Inscriptos por tarea
+
+    Returns:
+        Cantidad de briefings generados
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato}")
+    Path(carpeta).mkdir(parents=True, exist_ok=True)
+    # Agrupar por pace y peso para que cada lote reutilice sus bloques
+    inscriptos = sorted(inscriptos, key=lambda i: (i["pace_promedio"], i["peso_kg"]))
+    lotes = [inscriptos[i:i + tamano_lote] for i in range(0, len(inscriptos), tamano_lote)]
+    procesos = procesos or os.cpu_count() or 1
+
+    if procesos == 1 or len(lotes) <= 1:
+        return sum(_generar_lote(l, etapas, formato, tiempo_limite_min_km, carpeta) for l in lotes)
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [
+            pool.submit(_generar_lote, l, etapas, formato, tiempo_limite_min_km, carpeta)
+            for l in lotes
+        ]
+        return sum(f.result() for f in futuros)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera briefings de carrera para una lista de inscriptos")
+    parser.add_argument("inscriptos", help="CSV con dorsal, nombre, pace_promedio y peso_kg (opcional)")
+    parser.add_argument("carpeta", help="Carpeta de salida")
+    parser.add_argument("--formato", choices=FORMATOS, default="md")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--tamano-lote", type=int, default=500)
+    argumentos = parser.parse_args()
+
+    cantidad = generar_briefings(
+        cargar_inscriptos(argumentos.inscriptos),
+        argumentos.carpeta,
+        formato=argumentos.formato,
+        procesos=argumentos.procesos,
+        tamano_lote=argumentos.tamano_lote,
+    )
+    print(f"{cantidad} briefings generados en {argumentos.carpeta}")
@@ -0,0 +1,153 @@
+"""
+Caché en disco de tracks procesados, direccionada por contenido
+
+Guarda los arrays derivados de un archivo (GPX, FIT, TCX...) en .npz bajo el
+hash de su contenido y de los parámetros del cálculo, así el mismo archivo
+no se vuelve a procesar en otra ejecución, sesión o proceso. Las escrituras
+son atómicas (archivo temporal + rename) y el desalojo por tamaño tolera
+que otros procesos estén leyendo o escribiendo a la vez.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CARPETA_CACHE = os.getenv("CACHE_TRACKS_CARPETA", ".cache/tracks")
+TAMANO_MAXIMO_MB = float(os.getenv("CACHE_TRACKS_TAMANO_MB", "512"))
+# Cambiar al modificar el formato de lo guardado invalida las entradas viejas
+VERSION_FORMATO = 1
+
+
+class CacheDisco:
+    """
+    Caché de arrays en disco con desalojo por tamaño (el menos usado primero).
+    """
+
+    def __init__(self, carpeta=CARPETA_CACHE, tamano_maximo_mb=TAMANO_MAXIMO_MB):
+        self.carpeta = Path(carpeta)
+        self.tamano_maximo = int(tamano_maximo_mb * 1024 * 1024)
+
+    def clave(self, contenido, *parametros):
+        """
+        Clave de un contenido y de los parámetros con que se procesa.
+
+        Args:
+            contenido: Bytes del archivo de origen
+            *parametros: Valores que cambian el resultado (tipo, resolución...)
+
+        Returns:
+            String hexadecimal
+        """
+        h = hashlib.blake2b(contenido, digest_size=20)
+        h.update(repr((VERSION_FORMATO,) + parametros).encode("utf-8"))
+        return h.hexdigest()
+
+    def _ruta(self, clave):
+        return self.carpeta / clave[:2] / f"{clave}.npz"
+
+    def obtener(self, clave):
+        """
+        Lee una entrada.
+
+        Args:
+            clave: Clave devuelta por clave()
+
+        Returns:
+            Dict de arrays, o None si no está
+        """
+        ruta = self._ruta(clave)
+        try:
+            with np.load(ruta, allow_pickle=False) as datos:
+                arrays = {nombre: datos[nombre] for nombre in datos.files}
+            os.utime(ruta)  # Marca de uso para el desalojo
+            return arrays
+        except OSError:
+            # Inexistente, desalojada mientras se leía o ilegible
+            return None
+        except (zipfile.BadZipFile, EOFError, KeyError, ValueError):
+            # Truncada o dañada: se borra para que se vuelva a calcular
+            ruta.unlink(missing_ok=True)
+            return None
+
+    def guardar(self, clave, arrays):
+        """
+        Escribe una entrada de forma atómica y desaloja si hace falta.
+
+        Args:
+            clave: Clave devuelta por clave()
+            arrays: Dict de arrays de numpy
+        """
+        ruta = self._ruta(clave)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as archivo:
+                np.savez(archivo, **arrays)
+            os.replace(temporal, ruta)
+        except BaseException:
+            Path(temporal).unlink(missing_ok=True)
+            raise
+        self.desalojar()
+
+    def obtener_o_calcular(self, contenido, calcular, *parametros):
+        """
+        Devuelve la entrada de un contenido o la calcula y la guarda.
+
+        Args:
+            contenido: Bytes del archivo de origen
+            calcular: Función sin argumentos que devuelve un dict de arrays
+            *parametros: Valores que cambian el resultado
+
+        Returns:
+            Dict de arrays
+        """
+        clave = self.clave(contenido, *parametros)
+        arrays = self.obtener(clave)
+        if arrays is None:
+            arrays = calcular()
+            self.guardar(clave, arrays)
+        return arrays
+
+    def _entradas(self):
+        entradas = []
+        for ruta in self.carpeta.glob("*/*"):
+            try:
+                estado = ruta.stat()
+            except FileNotFoundError:
+                continue
+            # Temporales abandonados por un proceso que murió a mitad de escritura
+            if ruta.suffix == ".tmp" and time.time() - estado.st_mtime > 3600:
+                ruta.unlink(missing_ok=True)
+            elif ruta.suffix == ".npz":
+                entradas.append((estado.st_mtime, estado.st_size, ruta))
+        return entradas
+
+    def tamano(self):
+        """Bytes ocupados por la caché."""
+        return sum(tamano for _, tamano, _ in self._entradas())
+
+    def desalojar(self):
+        """Borra las entradas usadas hace más tiempo hasta respetar el tamaño máximo."""
+        entradas = self._entradas()
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.tamano_maximo:
+                break
+            ruta.unlink(missing_ok=True)
+            total -= tamano
+
+    def limpiar(self):
+        """Borra todas las entradas."""
+        for _, _, ruta in self._entradas():
+            ruta.unlink(missing_ok=True)
+
+
+cache = CacheDisco()
@@ -2,6 +2,9 @@
 Funciones de cálculo para El Cruce Analyzer
 """
 
+import numpy as np
+
+
 def calcular_tiempo_estimado(distancia_km, pace_min_km):
     """
     Calcula el tiempo estimado para completar una distancia dado un pace.
@@ -82,24 +85,53 @@ def estimar_calorias(distancia_km, desnivel_m, peso_kg=70):
     return int(calorias_base + calorias_desnivel)
 
 
-def comparar_etapas(etapas):
+def mayores(valores, k=None):
+    """
+    Índices de los k valores más grandes, de mayor a menor.
+
+    Con k menor que la cantidad de valores usa una selección parcial en
+    lugar de ordenar todo.
+
+    Args:
+        valores: Array de valores
+        k: Cantidad a devolver (None = todos)
+
+    Returns:
+        Array de índices
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    if k is not None and k < len(valores):
+        candidatos = np.argpartition(-valores, k - 1)[:k] if k > 0 else np.empty(0, dtype=np.int64)
+        return candidatos[np.argsort(-valores[candidatos], kind="stable")]
+    return np.argsort(-valores, kind="stable")
+
+
+def comparar_etapas(etapas, k=1):
     """
     Compara las métricas de diferentes etapas.
-    
+
+    Sólo usa distancia y desnivel, así que también sirve con las filas del
+    índice del catálogo sin cargar los perfiles.
+
     Args:
-        etapas: Lista de diccionarios con datos de etapas
-    
+        etapas: Lista de diccionarios con datos de etapas (cualquier cantidad)
+        k: Cantidad de etapas de cada ranking
+
     Returns:
-        Dict con comparaciones
-    """
-    comparacion = {
-        "mas_larga": max(etapas, key=lambda x: x["distancia_km"]),
-        "mas_desnivel": max(etapas, key=lambda x: x["desnivel_positivo"]),
-        "mas_desnivel_por_km": max(
-            etapas, 
-            key=lambda x: x["desnivel_positivo"] / x["distancia_km"]
-        ),
+        Dict con la etapa destacada de cada criterio ("mas_larga",
+        "mas_desnivel", "mas_desnivel_por_km") y "ranking" con las k
+        primeras de cada uno, de mayor a menor
+    """
+    distancias = np.array([e["distancia_km"] for e in etapas], dtype=np.float64)
+    desniveles = np.array([e["desnivel_positivo"] for e in etapas], dtype=np.float64)
+    criterios = {
+        "mas_larga": distancias,
+        "mas_desnivel": desniveles,
+        "mas_desnivel_por_km": desniveles / distancias,
     }
+    ranking = {clave: [etapas[i] for i in mayores(valores, k)] for clave, valores in criterios.items()}
+    comparacion = {clave: primeras[0] for clave, primeras in ranking.items()}
+    comparacion["ranking"] = ranking
     return comparacion
 
 
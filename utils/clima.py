@@ -0,0 +1,202 @@
+"""
+Ajuste de tiempos por pronóstico del clima para El Cruce Analyzer
+
+Carga una grilla de pronóstico local (CSV o NetCDF), la muestrea a lo largo
+de la ruta a medida que avanza el corredor y ajusta el pace por temperatura
+y viento. Todo está vectorizado sobre puntos de la ruta y olas de largada.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.perfiles import factor_pendiente, grilla_tramos
+from utils.rutas import posiciones_en_km, rumbos
+
+# Villa La Angostura: se usa cuando no hay track GPS de la etapa
+COORDENADAS_EVENTO = (-40.763, -71.646)
+
+
+def cargar_pronostico(archivo):
+    """
+    Carga una grilla regular de pronóstico.
+
+    El CSV debe tener columnas fecha_hora, lat, lon, temperatura_c,
+    viento_u_ms y viento_v_ms (componentes hacia el este y el norte).
+    El NetCDF debe tener las variables t2m (°C), u10 y v10 sobre las
+    dimensiones time, latitude y longitude.
+
+    Args:
+        archivo: Ruta o archivo subido (.csv o .nc)
+
+    Returns:
+        Dict con los ejes "horas", "lats", "lons" y grillas (tiempo x lat x lon)
+        "temperatura", "viento_u" y "viento_v"
+    """
+    nombre = str(getattr(archivo, "name", archivo))
+    if nombre.endswith(".nc"):
+        import xarray as xr  # Dependencia opcional, sólo para NetCDF
+
+        datos = xr.open_dataset(archivo).sortby(["time", "latitude", "longitude"])
+        tiempos = datos["time"].values.astype("datetime64[s]")
+        return _armar_pronostico(
+            tiempos,
+            datos["latitude"].values,
+            datos["longitude"].values,
+            datos["t2m"].values,
+            datos["u10"].values,
+            datos["v10"].values,
+        )
+
+    df = pd.read_csv(archivo, parse_dates=["fecha_hora"])
+    df = df.sort_values(["fecha_hora", "lat", "lon"])
+    tiempos = df["fecha_hora"].unique().to_numpy().astype("datetime64[s]")
+    lats = np.sort(df["lat"].unique())
+    lons = np.sort(df["lon"].unique())
+    forma = (len(tiempos), len(lats), len(lons))
+    if len(df) != np.prod(forma):
+        raise ValueError("El pronóstico no es una grilla regular completa")
+    return _armar_pronostico(
+        tiempos, lats, lons,
+        df["temperatura_c"].to_numpy().reshape(forma),
+        df["viento_u_ms"].to_numpy().reshape(forma),
+        df["viento_v_ms"].to_numpy().reshape(forma),
+    )
+
+
+def _armar_pronostico(tiempos, lats, lons, temperatura, viento_u, viento_v):
+    return {
+        "horas": a_horas(tiempos),
+        "lats": np.asarray(lats, dtype=np.float64),
+        "lons": np.asarray(lons, dtype=np.float64),
+        "temperatura": np.asarray(temperatura, dtype=np.float64),
+        "viento_u": np.asarray(viento_u, dtype=np.float64),
+        "viento_v": np.asarray(viento_v, dtype=np.float64),
+    }
+
+
+def a_horas(fechas):
+    """
+    Convierte fechas a horas desde 1970 para interpolar.
+
+    Args:
+        fechas: Fechas (strings ISO, datetime o datetime64)
+
+    Returns:
+        Array de horas (float)
+    """
+    return np.asarray(fechas, dtype="datetime64[s]").astype(np.float64) / 3600
+
+
+def _indices(eje, valores):
+    """Índice inferior y peso de interpolación lineal sobre un eje ordenado."""
+    if len(eje) == 1:
+        return np.zeros(valores.shape, dtype=np.int64), np.zeros(valores.shape)
+    i = np.clip(np.searchsorted(eje, valores) - 1, 0, len(eje) - 2)
+    peso = np.clip((valores - eje[i]) / (eje[i + 1] - eje[i]), 0, 1)
+    return i, peso
+
+
+def muestrear(pronostico, horas, lats, lons, variable):
+    """
+    Interpola una variable del pronóstico en tiempo y espacio.
+
+    Args:
+        pronostico: Dict devuelto por cargar_pronostico()
+        horas: Array de horas (ver a_horas)
+        lats: Array de latitudes (se transmite contra horas)
+        lons: Array de longitudes (se transmite contra horas)
+        variable: "temperatura", "viento_u" o "viento_v"
+
+    Returns:
+        Array con la forma transmitida de horas, lats y lons
+    """
+    horas, lats, lons = np.broadcast_arrays(horas, lats, lons)
+    grilla = pronostico[variable]
+    it, wt = _indices(pronostico["horas"], horas)
+    iy, wy = _indices(pronostico["lats"], lats)
+    ix, wx = _indices(pronostico["lons"], lons)
+    # Ejes de un solo valor: el vecino "siguiente" es el mismo punto
+    salto_t = min(1, grilla.shape[0] - 1)
+    salto_y = min(1, grilla.shape[1] - 1)
+    salto_x = min(1, grilla.shape[2] - 1)
+
+    resultado = np.zeros(horas.shape)
+    for dt, pt in ((0, 1 - wt), (salto_t, wt)):
+        for dy, py in ((0, 1 - wy), (salto_y, wy)):
+            for dx, px in ((0, 1 - wx), (salto_x, wx)):
+                resultado += pt * py * px * grilla[it + dt, iy + dy, ix + dx]
+    return resultado
+
+
+def factor_clima(temperatura_c, viento_frontal_ms):
+    """
+    Factor multiplicador del pace por temperatura y viento.
+
+    Args:
+        temperatura_c: Temperatura en °C (array)
+        viento_frontal_ms: Componente del viento en contra (m/s, negativo a favor)
+
+    Returns:
+        Factor (1.0 = sin efecto)
+    """
+    calor = 0.004 * np.maximum(temperatura_c - 15, 0)
+    frio = 0.005 * np.maximum(0 - temperatura_c, 0)
+    viento = np.where(viento_frontal_ms > 0, 0.012 * viento_frontal_ms, 0.005 * viento_frontal_ms)
+    return np.clip(1 + calor + frio + viento, 0.9, 1.5)
+
+
+def proyectar_olas(etapa, pace_plano, largadas, pronostico, ruta=None, paso_km=0.5, iteraciones=2):
+    """
+    Proyecta el tiempo de una etapa para varias olas de largada según el clima.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        pace_plano: Pace en plano del corredor (min/km)
+        largadas: Fechas de largada de cada ola
+        pronostico: Dict devuelto por cargar_pronostico()
+        ruta: Dict de cargar_ruta_etapa(); sin ruta se muestrea en el punto
+            del evento y se toma la mitad del viento como componente en contra
+        paso_km: Resolución de la grilla de cálculo en km
+        iteraciones: Pasadas para recalcular la hora de paso con el ajuste
+
+    Returns:
+        Dict con "km" (puntos), "tiempo_base_min", arrays por ola
+        "tiempo_ajustado_min" y arrays (olas x puntos) "temperatura",
+        "viento_frontal" y "factor"
+    """
+    inicios, fines, pendientes = grilla_tramos(etapa, paso_km)
+    medios = (inicios + fines) / 2
+    minutos_tramo = (fines - inicios) * factor_pendiente(pendientes) * pace_plano
+    largadas = a_horas(largadas)[:, None]
+
+    if ruta is not None:
+        lats, lons = posiciones_en_km(ruta, medios)
+        bordes_lat, bordes_lon = posiciones_en_km(ruta, np.append(inicios, fines[-1]))
+        rumbo = rumbos(bordes_lat, bordes_lon)
+        direccion_este, direccion_norte = np.sin(rumbo), np.cos(rumbo)
+    else:
+        lats = np.full(medios.shape, COORDENADAS_EVENTO[0])
+        lons = np.full(medios.shape, COORDENADAS_EVENTO[1])
+
+    factor = np.ones((len(largadas), len(medios)))
+    for _ in range(iteraciones):
+        minutos = minutos_tramo * factor
+        # Hora de paso por la mitad de cada tramo
+        paso = largadas + (np.cumsum(minutos, axis=1) - minutos / 2) / 60
+        temperatura = muestrear(pronostico, paso, lats, lons, "temperatura")
+        u = muestrear(pronostico, paso, lats, lons, "viento_u")
+        v = muestrear(pronostico, paso, lats, lons, "viento_v")
+        if ruta is not None:
+            viento_frontal = -(u * direccion_este + v * direccion_norte)
+        else:
+            viento_frontal = 0.5 * np.hypot(u, v)
+        factor = factor_clima(temperatura, viento_frontal)
+
+    return {
+        "km": medios,
+        "tiempo_base_min": float(minutos_tramo.sum()),
+        "tiempo_ajustado_min": (minutos_tramo * factor).sum(axis=1),
+        "temperatura": temperatura,
+        "viento_frontal": viento_frontal,
+        "factor": factor,
+    }
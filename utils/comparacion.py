@@ -0,0 +1,100 @@
+"""
+Comparación vectorizada de perfiles sobre una grilla común
+
+Trabaja sobre la matriz (perfiles x grilla) de remuestrear_perfiles(), así
+comparar decenas de etapas o ediciones es una sola operación de numpy.
+"""
+
+import numpy as np
+
+
+def diferencias(altitudes, referencia=0):
+    """
+    Diferencia de altitud de cada perfil contra uno de referencia.
+
+    Args:
+        altitudes: Array 2D (perfiles x grilla)
+        referencia: Índice del perfil de referencia
+
+    Returns:
+        Array 2D de diferencias en metros
+    """
+    return altitudes - altitudes[referencia]
+
+
+def pendiente_movil(grilla_km, altitudes, ventana_km=1.0):
+    """
+    Pendiente centrada sobre una ventana de distancia para cada perfil.
+
+    Args:
+        grilla_km: Grilla en km (paso uniforme)
+        altitudes: Array 2D (perfiles x grilla)
+        ventana_km: Ancho de la ventana en km
+
+    Returns:
+        Array 2D de pendientes en %, NaN en los bordes
+    """
+    paso = grilla_km[1] - grilla_km[0]
+    medio = max(int(round(ventana_km / paso / 2)), 1)
+    pendientes = np.full(altitudes.shape, np.nan)
+    pendientes[:, medio:-medio] = (
+        (altitudes[:, 2 * medio:] - altitudes[:, :-2 * medio]) / (2 * medio * paso * 1000) * 100
+    )
+    return pendientes
+
+
+def desnivel_acumulado(altitudes):
+    """
+    Curvas de desnivel positivo acumulado.
+
+    Args:
+        altitudes: Array 2D (perfiles x grilla)
+
+    Returns:
+        Array 2D con el desnivel positivo acumulado en metros (NaN fuera de
+        cada perfil)
+    """
+    subidas = np.maximum(np.diff(altitudes, axis=1), 0)
+    acumulado = np.concatenate(
+        (np.zeros((altitudes.shape[0], 1)), np.cumsum(np.nan_to_num(subidas), axis=1)), axis=1
+    )
+    acumulado[np.isnan(altitudes)] = np.nan
+    return acumulado
+
+
+def matriz_similitud(altitudes):
+    """
+    Similitud de forma entre todos los pares de perfiles.
+
+    Combina la correlación de las altitudes (forma) con el error cuadrático
+    medio relativo a la amplitud (escala). Sólo usa las posiciones donde
+    ambos perfiles tienen datos.
+
+    Args:
+        altitudes: Array 2D (perfiles x grilla)
+
+    Returns:
+        Array 2D simétrico de similitudes entre 0 y 1
+    """
+    validos = ~np.isnan(altitudes)
+    valores = np.nan_to_num(altitudes)
+    comunes = validos.astype(np.float64) @ validos.T.astype(np.float64)
+
+    # Medias, varianzas y covarianzas sobre las posiciones comunes de cada par
+    suma = valores @ validos.T
+    suma_cuadrados = (valores ** 2) @ validos.T
+    producto = valores @ valores.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_a = suma / comunes
+        media_b = suma.T / comunes
+        var_a = suma_cuadrados / comunes - media_a ** 2
+        var_b = suma_cuadrados.T / comunes - media_b ** 2
+        covarianza = producto / comunes - media_a * media_b
+        correlacion = covarianza / np.sqrt(var_a * var_b)
+        ecm = var_a + var_b + (media_a - media_b) ** 2 - 2 * covarianza
+        amplitud = np.sqrt(np.maximum(var_a, var_b))
+        parecido = 1 / (1 + np.sqrt(np.maximum(ecm, 0)) / amplitud)
+
+    similitud = np.clip((np.nan_to_num(correlacion) + 1) / 2, 0, 1) * np.nan_to_num(parecido)
+    np.fill_diagonal(similitud, 1.0)
+    return similitud
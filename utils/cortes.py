@@ -0,0 +1,184 @@
+"""
+Riesgo de corte por oasis para El Cruce Analyzer
+
+Deriva una barrera horaria en cada oasis a partir del tiempo límite por km
+y evalúa, para todo el pelotón a la vez, quién llegaría tarde a la próxima.
+"""
+
+import numpy as np
+
+from utils.calculadora import calcular_tiempo_estimado
+from utils.perfiles import km_equivalentes_en
+
+
+def barreras_corte(etapa, tiempo_limite_min_km=15):
+    """
+    Calcula la barrera horaria de cada oasis y de la llegada de una etapa.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        tiempo_limite_min_km: Tiempo límite en min/km (default: 15)
+
+    Returns:
+        Lista de dicts con "nombre", "km" y "limite_min" (minutos desde la largada)
+    """
+    puntos = [(oasis["nombre"], oasis["km"]) for oasis in etapa["oasis"]]
+    puntos.append((etapa["fin"], etapa["distancia_km"]))
+    return [
+        {
+            "nombre": nombre,
+            "km": km,
+            "limite_min": calcular_tiempo_estimado(km, tiempo_limite_min_km) * 60,
+        }
+        for nombre, km in puntos
+    ]
+
+
+class MotorCortes:
+    """
+    Evalúa el riesgo de no llegar a la próxima barrera de forma vectorizada.
+    """
+
+    def __init__(self, etapas, tiempo_limite_min_km=15, incertidumbre=0.10, margen_minimo_min=5.0):
+        """
+        Args:
+            etapas: Lista de dicts con datos de etapas
+            tiempo_limite_min_km: Tiempo límite en min/km (default: 15)
+            incertidumbre: Desvío relativo del tiempo restante estimado
+            margen_minimo_min: Desvío mínimo en minutos aunque falte poco
+        """
+        self.etapas = etapas
+        self.incertidumbre = incertidumbre
+        self.margen_minimo_min = margen_minimo_min
+        self.tiempo_limite_min_km = tiempo_limite_min_km
+        self.barreras = [barreras_corte(e, tiempo_limite_min_km) for e in etapas]
+        self._km = [np.array([b["km"] for b in bs], dtype=np.float64) for bs in self.barreras]
+        self._limite = [np.array([b["limite_min"] for b in bs]) for bs in self.barreras]
+        self._equivalente = [
+            km_equivalentes_en(e["perfil"], km) for e, km in zip(etapas, self._km)
+        ]
+
+    def evaluar(self, etapa, km, tiempo_min, pace_plano):
+        """
+        Proyecta la llegada de cada corredor a su próxima barrera.
+
+        Args:
+            etapa: Array de índices de etapa (0, 1, 2...)
+            km: Array con el último km registrado
+            tiempo_min: Array con el tiempo en ese km (minutos desde la largada)
+            pace_plano: Array con el pace en plano de cada corredor (min/km)
+
+        Returns:
+            Dict de arrays: "barrera" (índice en barreras[etapa]), "llegada_min",
+            "limite_min", "margen_min", "riesgo" (0-1) y "excedido"
+        """
+        etapa = np.asarray(etapa)
+        km = np.asarray(km, dtype=np.float64)
+        tiempo_min = np.asarray(tiempo_min, dtype=np.float64)
+        pace_plano = np.asarray(pace_plano, dtype=np.float64)
+
+        barrera = np.zeros(len(km), dtype=np.int64)
+        llegada = np.empty(len(km))
+        limite = np.empty(len(km))
+        excedido = np.zeros(len(km), dtype=bool)
+
+        for i, etapa_datos in enumerate(self.etapas):
+            mascara = etapa == i
+            if not mascara.any():
+                continue
+            km_etapa = km[mascara]
+            equivalente = km_equivalentes_en(etapa_datos["perfil"], km_etapa)
+            pasadas = np.searchsorted(self._km[i], km_etapa, side="right")
+            # Próxima barrera estrictamente por delante (la llegada como tope)
+            siguiente = np.minimum(pasadas, len(self._km[i]) - 1)
+            restante = self._equivalente[i][siguiente] - equivalente
+            barrera[mascara] = siguiente
+            llegada[mascara] = tiempo_min[mascara] + restante * pace_plano[mascara]
+            limite[mascara] = self._limite[i][siguiente]
+
+            # Excedido: pasó la última barrera cruzada después de su límite
+            # (hora de paso estimada desde la posición actual con su pace)
+            ultima = pasadas - 1
+            cruzo = ultima >= 0
+            ultima = np.maximum(ultima, 0)
+            paso = tiempo_min[mascara] - (equivalente - self._equivalente[i][ultima]) * pace_plano[mascara]
+            excedido[mascara] = cruzo & (paso > self._limite[i][ultima])
+
+        margen = limite - llegada
+        desvio = np.maximum((llegada - tiempo_min) * self.incertidumbre, self.margen_minimo_min)
+        # Aproximación logística de la probabilidad normal de llegar tarde
+        riesgo = 1 / (1 + np.exp(np.clip(1.702 * margen / desvio, -50, 50)))
+
+        riesgo[excedido] = 1.0
+        return {
+            "barrera": barrera,
+            "llegada_min": llegada,
+            "limite_min": limite,
+            "margen_min": margen,
+            "riesgo": riesgo,
+            "excedido": excedido,
+        }
+
+    def ranking(self, etapa, km, tiempo_min, pace_plano, umbral=0.5):
+        """
+        Ordena el pelotón de mayor a menor riesgo de corte.
+
+        Args:
+            etapa, km, tiempo_min, pace_plano: Ver evaluar()
+            umbral: Riesgo a partir del cual se emite alerta
+
+        Returns:
+            Tupla (orden, evaluacion, alertas): índices ordenados por riesgo,
+            el dict de evaluar() y una máscara booleana de corredores en alerta
+        """
+        evaluacion = self.evaluar(etapa, km, tiempo_min, pace_plano)
+        # Desempate por menor margen para que el orden sea estable
+        orden = np.lexsort((evaluacion["margen_min"], -evaluacion["riesgo"]))
+        alertas = evaluacion["riesgo"] >= umbral
+        return orden, evaluacion, alertas
+
+    def ranking_seguidor(self, seguidor, umbral=0.5):
+        """
+        Ranking de riesgo sobre el estado de un SeguidorCarrera.
+
+        Args:
+            seguidor: Instancia de SeguidorCarrera
+            umbral: Riesgo a partir del cual se emite alerta
+
+        Returns:
+            Igual que ranking()
+        """
+        n = seguidor.n
+        return self.ranking(
+            seguidor.etapa[:n],
+            seguidor.km[:n],
+            seguidor.tiempo_min[:n],
+            seguidor.pace_plano[:n],
+            umbral
+        )
+
+    def nombre_barrera(self, etapa, indice):
+        """Nombre del punto de una barrera."""
+        return self.barreras[etapa][indice]["nombre"]
+
+
+def simular_parciales(etapa, num_corredores, pace_medio=11.0, dispersion=0.2, semilla=None):
+    """
+    Genera parciales simulados de un pelotón en un punto al azar de la etapa.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        num_corredores: Cantidad de corredores
+        pace_medio: Pace en plano medio del pelotón (min/km)
+        dispersion: Desvío relativo del pace entre corredores
+        semilla: Semilla del generador aleatorio
+
+    Returns:
+        Tupla (km, tiempo_min, pace_plano) de arrays
+    """
+    generador = np.random.default_rng(semilla)
+    pace_plano = pace_medio * generador.lognormal(0, dispersion, num_corredores)
+    km = generador.uniform(0, etapa["distancia_km"], num_corredores)
+    ruido = generador.normal(1, 0.05, num_corredores)
+    tiempo_min = km_equivalentes_en(etapa["perfil"], km) * pace_plano * ruido
+    return km, tiempo_min, pace_plano
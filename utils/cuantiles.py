@@ -0,0 +1,322 @@
+"""
+Cuantiles en vivo de los tiempos de paso para El Cruce Analyzer
+
+Cada punto de control (oasis y meta de cada etapa) y cada categoría tiene un
+boceto KLL: un resumen de tamaño acotado de todos los tiempos de paso que
+responde "¿en qué percentil está este tiempo?" con un error de rango de
+alrededor de 1%, sin ordenar todos los tiempos en cada consulta. Los bocetos
+de varios procesos de ingesta se fusionan sumando sus niveles.
+"""
+
+import math
+import random
+
+import numpy as np
+
+K_BOCETO = 200
+FACTOR_NIVELES = 2 / 3
+CATEGORIA_GENERAL = "General"
+
+
+class BocetoKLL:
+    """
+    Boceto de cuantiles KLL (Karnin, Lang y Liberty).
+
+    Los valores entran al nivel 0; cuando un nivel se llena se ordena y se
+    promueve uno de cada dos valores al nivel siguiente, donde cada valor
+    representa el doble de observaciones. Las consultas usan un resumen
+    ordenado que se rearma sólo si entraron valores nuevos.
+    """
+
+    def __init__(self, k=K_BOCETO, semilla=None):
+        """
+        Args:
+            k: Capacidad del nivel más alto; el error de rango es ~1.7/k
+            semilla: Semilla del sorteo de compactación (None = aleatoria)
+        """
+        self.k = k
+        self.n = 0
+        self.niveles = [[]]
+        self._tamano = 0
+        self._rng = random.Random(semilla)
+        self._resumen = None
+
+    def _capacidad(self, nivel):
+        altura = len(self.niveles)
+        return max(2, int(math.ceil(self.k * FACTOR_NIVELES ** (altura - nivel - 1))))
+
+    def _capacidad_total(self):
+        return sum(self._capacidad(h) for h in range(len(self.niveles)))
+
+    def _comprimir(self):
+        while self._tamano >= self._capacidad_total():
+            for h, nivel in enumerate(self.niveles):
+                if len(nivel) < self._capacidad(h):
+                    continue
+                if h + 1 == len(self.niveles):
+                    self.niveles.append([])
+                nivel.sort()
+                # Con cantidad impar el mayor queda en este nivel
+                resto = [nivel.pop()] if len(nivel) % 2 else []
+                self.niveles[h + 1].extend(nivel[self._rng.randint(0, 1)::2])
+                self.niveles[h] = resto
+                break
+            self._tamano = sum(len(nivel) for nivel in self.niveles)
+
+    def agregar(self, valor):
+        """Agrega una observación."""
+        self.niveles[0].append(float(valor))
+        self.n += 1
+        self._tamano += 1
+        self._resumen = None
+        if self._tamano >= self._capacidad_total():
+            self._comprimir()
+
+    def fusionar(self, otro):
+        """
+        Suma al boceto todas las observaciones de otro.
+
+        Args:
+            otro: BocetoKLL con el mismo k
+        """
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append([])
+        for h, nivel in enumerate(otro.niveles):
+            self.niveles[h].extend(nivel)
+        self.n += otro.n
+        self._tamano = sum(len(nivel) for nivel in self.niveles)
+        self._resumen = None
+        self._comprimir()
+
+    def _valores_y_pesos(self):
+        if self._resumen is None:
+            valores = np.array([v for nivel in self.niveles for v in nivel], dtype=np.float64)
+            pesos = np.concatenate([np.full(len(nivel), 2.0 ** h) for h, nivel in enumerate(self.niveles)])
+            orden = np.argsort(valores, kind="stable")
+            self._resumen = (valores[orden], np.cumsum(pesos[orden]))
+        return self._resumen
+
+    def rango(self, valor):
+        """
+        Fracción de observaciones menores o iguales a un valor.
+
+        Args:
+            valor: Valor a ubicar
+
+        Returns:
+            Fracción entre 0 y 1 (NaN si el boceto está vacío)
+        """
+        if self.n == 0:
+            return float("nan")
+        valores, acumulado = self._valores_y_pesos()
+        posicion = int(np.searchsorted(valores, valor, side="right"))
+        return float(acumulado[posicion - 1] / acumulado[-1]) if posicion else 0.0
+
+    def cuantiles(self, probabilidades):
+        """
+        Valores en varias probabilidades acumuladas.
+
+        Args:
+            probabilidades: Array de probabilidades entre 0 y 1
+
+        Returns:
+            Array de valores (NaN si el boceto está vacío)
+        """
+        probabilidades = np.asarray(probabilidades, dtype=np.float64)
+        if self.n == 0:
+            return np.full(probabilidades.shape, np.nan)
+        valores, acumulado = self._valores_y_pesos()
+        posiciones = np.searchsorted(acumulado, probabilidades * acumulado[-1], side="left")
+        return valores[np.minimum(posiciones, len(valores) - 1)]
+
+    def a_dict(self):
+        """Estado serializable (JSON o pickle) para enviarlo a otro proceso."""
+        return {"k": self.k, "n": self.n, "niveles": [list(nivel) for nivel in self.niveles]}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Reconstruye un boceto de a_dict()."""
+        boceto = cls(datos["k"])
+        boceto.n = datos["n"]
+        boceto.niveles = [list(nivel) for nivel in datos["niveles"]] or [[]]
+        boceto._tamano = sum(len(nivel) for nivel in boceto.niveles)
+        return boceto
+
+
+class EstadisticasPeloton:
+    """
+    Bocetos de tiempos de paso por etapa, punto de control y categoría.
+
+    Los puntos de control de cada etapa son sus oasis y la meta. Cada paso
+    de un corredor entra una sola vez, en su categoría y en la general.
+    """
+
+    def __init__(self, etapas, k=K_BOCETO):
+        """
+        Args:
+            etapas: Lista de dicts con datos de etapas
+            k: Tamaño de los bocetos
+        """
+        self.k = k
+        self.puntos = [
+            [o["nombre"] for o in etapa["oasis"]] + [etapa["fin"]] for etapa in etapas
+        ]
+        self.kms_puntos = [
+            np.array([o["km"] for o in etapa["oasis"]] + [etapa["distancia_km"]], dtype=np.float64)
+            for etapa in etapas
+        ]
+        self.bocetos = {}
+        self.categorias = {}
+        self.pasos = {}
+
+    def _boceto(self, etapa, punto, categoria):
+        clave = (etapa, punto, categoria)
+        if clave not in self.bocetos:
+            self.bocetos[clave] = BocetoKLL(self.k)
+        return self.bocetos[clave]
+
+    def registrar_paso(self, dorsal, etapa, punto, tiempo_min, categoria=None):
+        """
+        Registra el tiempo de un corredor en un punto de control.
+
+        Args:
+            dorsal: Dorsal del corredor
+            etapa: Índice de la etapa (0, 1, 2...)
+            punto: Índice del punto de control en la etapa
+            tiempo_min: Minutos desde la largada de la etapa
+            categoria: Categoría del corredor (se recuerda para sus pasos siguientes)
+
+        Returns:
+            True si el paso era nuevo
+        """
+        if categoria:
+            self.categorias[dorsal] = categoria
+        if (dorsal, etapa, punto) in self.pasos:
+            return False
+        self.pasos[(dorsal, etapa, punto)] = tiempo_min
+        self._boceto(etapa, punto, CATEGORIA_GENERAL).agregar(tiempo_min)
+        categoria = self.categorias.get(dorsal)
+        if categoria:
+            self._boceto(etapa, punto, categoria).agregar(tiempo_min)
+        return True
+
+    def registrar_avance(self, dorsal, etapa, km_anterior, tiempo_anterior_min, km, tiempo_min, categoria=None):
+        """
+        Registra los puntos de control cruzados entre dos posiciones.
+
+        El tiempo de cada cruce se interpola entre las dos posiciones, así
+        que sirve tanto para alfombras de cronometraje como para GPS. Sin
+        posición previa observada en la etapa no hay entre qué interpolar:
+        sólo cuenta un punto de control ubicado justo en la posición nueva.
+
+        Args:
+            dorsal: Dorsal del corredor
+            etapa: Índice de la etapa
+            km_anterior, tiempo_anterior_min: Posición previa observada en la
+                etapa (None si es la primera)
+            km, tiempo_min: Posición nueva
+            categoria: Categoría del corredor (opcional)
+
+        Returns:
+            Número de pasos nuevos registrados
+        """
+        kms_puntos = self.kms_puntos[etapa]
+        if categoria:
+            self.categorias[dorsal] = categoria
+        if km_anterior is None:
+            desde = int(np.searchsorted(kms_puntos, km, side="left"))
+            hasta = int(np.searchsorted(kms_puntos, km, side="right"))
+            return sum(self.registrar_paso(dorsal, etapa, punto, tiempo_min) for punto in range(desde, hasta))
+
+        desde = int(np.searchsorted(kms_puntos, km_anterior, side="right"))
+        hasta = int(np.searchsorted(kms_puntos, km, side="right"))
+        registrados = 0
+        for punto in range(desde, hasta):
+            fraccion = (kms_puntos[punto] - km_anterior) / (km - km_anterior)
+            tiempo = tiempo_anterior_min + fraccion * (tiempo_min - tiempo_anterior_min)
+            registrados += self.registrar_paso(dorsal, etapa, punto, tiempo)
+        return registrados
+
+    def percentil(self, etapa, punto, tiempo_min, categoria=CATEGORIA_GENERAL):
+        """
+        Porcentaje del campo que pasó por un punto en menos tiempo.
+
+        Args:
+            etapa: Índice de la etapa
+            punto: Índice del punto de control
+            tiempo_min: Tiempo del corredor en ese punto
+            categoria: Categoría con la que comparar
+
+        Returns:
+            Porcentaje entre 0 y 100 (NaN si nadie pasó todavía)
+        """
+        boceto = self.bocetos.get((etapa, punto, categoria))
+        if boceto is None:
+            return float("nan")
+        # Sin contar al propio corredor: el más rápido está en el top 0%
+        return 100 * boceto.rango(tiempo_min - 1e-9)
+
+    def ultimo_paso(self, dorsal, etapa):
+        """
+        Último punto de control de una etapa por el que pasó un corredor.
+
+        Args:
+            dorsal: Dorsal del corredor
+            etapa: Índice de la etapa
+
+        Returns:
+            Tupla (punto, tiempo_min) o None
+        """
+        for punto in range(len(self.puntos[etapa]) - 1, -1, -1):
+            tiempo = self.pasos.get((dorsal, etapa, punto))
+            if tiempo is not None:
+                return punto, tiempo
+        return None
+
+    def distribucion(self, etapa, probabilidades, categoria=CATEGORIA_GENERAL):
+        """
+        Cuantiles de tiempo de paso de cada punto de control de una etapa.
+
+        Args:
+            etapa: Índice de la etapa
+            probabilidades: Probabilidades a consultar
+            categoria: Categoría
+
+        Returns:
+            Lista de dicts con "punto", "km", "pasaron" y "cuantiles" (array)
+        """
+        filas = []
+        for punto, nombre in enumerate(self.puntos[etapa]):
+            boceto = self.bocetos.get((etapa, punto, categoria))
+            filas.append({
+                "punto": nombre,
+                "km": float(self.kms_puntos[etapa][punto]),
+                "pasaron": boceto.n if boceto else 0,
+                "cuantiles": boceto.cuantiles(probabilidades) if boceto else np.full(len(probabilidades), np.nan),
+            })
+        return filas
+
+    def categorias_disponibles(self):
+        """Categorías con al menos un paso, con la general primero."""
+        return [CATEGORIA_GENERAL] + sorted({c for _, _, c in self.bocetos if c != CATEGORIA_GENERAL})
+
+    def fusionar(self, otras):
+        """
+        Suma los bocetos de otro proceso de ingesta.
+
+        Cada proceso debe recibir corredores distintos (por ejemplo,
+        repartidos por dorsal): los pasos no se deduplican entre procesos.
+
+        Args:
+            otras: EstadisticasPeloton o dict de a_dict()
+        """
+        if isinstance(otras, dict):
+            otras = {tuple(clave): BocetoKLL.desde_dict(datos) for clave, datos in otras["bocetos"]}
+        else:
+            otras = otras.bocetos
+        for clave, boceto in otras.items():
+            self._boceto(*clave).fusionar(boceto)
+
+    def a_dict(self):
+        """Bocetos serializables para fusionarlos en otro proceso."""
+        return {"bocetos": [[list(clave), boceto.a_dict()] for clave, boceto in self.bocetos.items()]}
@@ -0,0 +1,233 @@
+"""
+Altitudes desde un modelo digital de elevación (DEM) para El Cruce Analyzer
+
+Lee grillas de elevación locales mapeadas en memoria (teselas SRTM .hgt o
+GeoTIFF sin comprimir), así sólo se leen del disco las páginas que tocan los
+puntos de la ruta. El muestreo bilineal está vectorizado y procesa la ruta
+en bloques para acotar la memoria aun con millones de puntos.
+
+    python -m utils.elevacion ruta.gpx --dem data/dem --paso-km 0.5
+"""
+
+import argparse
+import re
+from pathlib import Path
+
+import numpy as np
+
+from utils.rutas import distancias_acumuladas, leer_gpx
+
+CARPETA_DEM = Path(__file__).parent.parent / "data" / "dem"
+NODATA_SRTM = -32768
+TAMANO_BLOQUE = 1_000_000
+
+_RE_HGT = re.compile(r"([NS])(\d{2})([EW])(\d{3})", re.IGNORECASE)
+
+
+class ModeloElevacion:
+    """
+    Grilla regular de elevación en grados, con la fila 0 en el borde norte.
+
+    Args:
+        datos: Array 2D (puede ser un np.memmap)
+        lat_norte: Latitud del centro de la primera fila
+        lon_oeste: Longitud del centro de la primera columna
+        paso_lat: Separación entre filas en grados
+        paso_lon: Separación entre columnas en grados
+        nodata: Valor sin dato (o None)
+    """
+
+    def __init__(self, datos, lat_norte, lon_oeste, paso_lat, paso_lon, nodata=None):
+        self.datos = datos
+        self.lat_norte = lat_norte
+        self.lon_oeste = lon_oeste
+        self.paso_lat = paso_lat
+        self.paso_lon = paso_lon
+        self.nodata = nodata
+
+    def muestrear(self, lats, lons, tamano_bloque=TAMANO_BLOQUE):
+        """
+        Interpola bilinealmente la altitud en muchos puntos.
+
+        Args:
+            lats: Array de latitudes en grados
+            lons: Array de longitudes en grados
+            tamano_bloque: Puntos procesados por vez
+
+        Returns:
+            Array de altitudes en metros; NaN fuera de la grilla o sin dato
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        altitudes = np.full(lats.shape, np.nan)
+        for inicio in range(0, len(lats), tamano_bloque):
+            bloque = slice(inicio, inicio + tamano_bloque)
+            altitudes[bloque] = self._muestrear_bloque(lats[bloque], lons[bloque])
+        return altitudes
+
+    def _muestrear_bloque(self, lats, lons):
+        filas, columnas = self.datos.shape
+        y = (self.lat_norte - lats) / self.paso_lat
+        x = (lons - self.lon_oeste) / self.paso_lon
+        dentro = (y >= 0) & (y <= filas - 1) & (x >= 0) & (x <= columnas - 1)
+
+        resultado = np.full(lats.shape, np.nan)
+        y, x = y[dentro], x[dentro]
+        fila = np.minimum(y.astype(np.int64), filas - 2)
+        columna = np.minimum(x.astype(np.int64), columnas - 2)
+        dy, dx = y - fila, x - columna
+
+        # Leer sólo las esquinas de cada punto, ordenadas para acceder al
+        # memmap por filas consecutivas
+        orden = np.argsort(fila * columnas + columna, kind="stable")
+        esquinas = np.empty((4, len(orden)))
+        for k, (df, dc) in enumerate(((0, 0), (0, 1), (1, 0), (1, 1))):
+            esquinas[k, orden] = self.datos[fila[orden] + df, columna[orden] + dc]
+        if self.nodata is not None:
+            esquinas[esquinas == self.nodata] = np.nan
+
+        resultado[dentro] = (
+            esquinas[0] * (1 - dy) * (1 - dx) + esquinas[1] * (1 - dy) * dx
+            + esquinas[2] * dy * (1 - dx) + esquinas[3] * dy * dx
+        )
+        return resultado
+
+
+def abrir_hgt(ruta):
+    """
+    Abre una tesela SRTM .hgt (enteros de 16 bits big-endian).
+
+    El nombre indica la esquina suroeste, por ejemplo S41W072.hgt.
+
+    Args:
+        ruta: Ruta del archivo .hgt
+
+    Returns:
+        ModeloElevacion
+    """
+    ruta = Path(ruta)
+    coincidencia = _RE_HGT.search(ruta.stem)
+    if not coincidencia:
+        raise ValueError(f"Nombre de tesela SRTM inválido: {ruta.name}")
+    hemisferio, lat, meridiano, lon = coincidencia.groups()
+    lat_sur = int(lat) * (1 if hemisferio.upper() == "N" else -1)
+    lon_oeste = int(lon) * (1 if meridiano.upper() == "E" else -1)
+
+    lado = int(round(np.sqrt(ruta.stat().st_size / 2)))
+    if lado * lado * 2 != ruta.stat().st_size:
+        raise ValueError(f"Tamaño de tesela SRTM inválido: {ruta.name}")
+    datos = np.memmap(ruta, dtype=">i2", mode="r", shape=(lado, lado))
+    paso = 1 / (lado - 1)
+    return ModeloElevacion(datos, lat_sur + 1, lon_oeste, paso, paso, NODATA_SRTM)
+
+
+def abrir_geotiff(ruta):
+    """
+    Abre un GeoTIFF sin comprimir en coordenadas geográficas.
+
+    Args:
+        ruta: Ruta del archivo .tif
+
+    Returns:
+        ModeloElevacion
+    """
+    import tifffile  # Dependencia opcional, sólo para GeoTIFF
+
+    with tifffile.TiffFile(ruta) as tiff:
+        pagina = tiff.pages[0]
+        escala = pagina.tags["ModelPixelScaleTag"].value
+        punto = pagina.tags["ModelTiepointTag"].value
+        nodata = pagina.tags.get("GDAL_NODATA")
+        nodata = float(nodata.value.strip("\x00")) if nodata is not None else None
+    datos = tifffile.memmap(ruta, mode="r")
+    paso_lon, paso_lat = escala[0], escala[1]
+    # El punto de anclaje es la esquina del píxel (0, 0); se usa su centro
+    lon_oeste = punto[3] - punto[0] * paso_lon + paso_lon / 2
+    lat_norte = punto[4] + punto[1] * paso_lat - paso_lat / 2
+    return ModeloElevacion(datos, lat_norte, lon_oeste, paso_lat, paso_lon, nodata)
+
+
+def abrir_dem(carpeta=CARPETA_DEM):
+    """
+    Abre todas las teselas .hgt y .tif de una carpeta.
+
+    Args:
+        carpeta: Carpeta con las teselas
+
+    Returns:
+        Lista de ModeloElevacion
+    """
+    modelos = []
+    for ruta in sorted(Path(carpeta).iterdir()):
+        sufijo = ruta.suffix.lower()
+        if sufijo == ".hgt":
+            modelos.append(abrir_hgt(ruta))
+        elif sufijo in (".tif", ".tiff"):
+            modelos.append(abrir_geotiff(ruta))
+    return modelos
+
+
+def muestrear_altitudes(modelos, lats, lons):
+    """
+    Altitud de cada punto tomada de la primera tesela que la cubre.
+
+    Args:
+        modelos: Lista de ModeloElevacion
+        lats: Array de latitudes en grados
+        lons: Array de longitudes en grados
+
+    Returns:
+        Array de altitudes en metros (NaN si ninguna tesela la cubre)
+    """
+    altitudes = np.full(np.shape(lats), np.nan)
+    for modelo in modelos:
+        faltantes = np.isnan(altitudes)
+        if not faltantes.any():
+            break
+        altitudes[faltantes] = modelo.muestrear(np.asarray(lats)[faltantes], np.asarray(lons)[faltantes])
+    return altitudes
+
+
+def perfil_desde_ruta(lats, lons, modelos, paso_km=0.5, distancia_km=None):
+    """
+    Arma un perfil de altimetría a partir de una ruta sin altitudes.
+
+    Args:
+        lats: Array de latitudes en grados
+        lons: Array de longitudes en grados
+        modelos: Lista de ModeloElevacion
+        paso_km: Separación de los puntos del perfil en km
+        distancia_km: Distancia oficial; si se indica, los km se escalan
+
+    Returns:
+        Lista de tuplas (km, altitud), el formato de data/etapas.py
+    """
+    kms = distancias_acumuladas(lats, lons)
+    if distancia_km:
+        kms = kms * distancia_km / kms[-1]
+    altitudes = muestrear_altitudes(modelos, lats, lons)
+    validos = ~np.isnan(altitudes)
+    if not validos.any():
+        raise ValueError("El DEM no cubre la ruta")
+
+    grilla = np.append(np.arange(0, kms[-1], paso_km), kms[-1])
+    perfil = np.interp(grilla, kms[validos], altitudes[validos])
+    return [(round(float(km), 3), int(round(altitud))) for km, altitud in zip(grilla, perfil)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un perfil de etapa desde una ruta GPX y un DEM")
+    parser.add_argument("ruta", help="Archivo GPX con la ruta")
+    parser.add_argument("--dem", default=str(CARPETA_DEM), help="Carpeta con teselas .hgt o .tif")
+    parser.add_argument("--paso-km", type=float, default=0.5)
+    parser.add_argument("--distancia-km", type=float, default=None)
+    argumentos = parser.parse_args()
+
+    lats, lons, _ = leer_gpx(argumentos.ruta)
+    perfil = perfil_desde_ruta(
+        lats, lons, abrir_dem(argumentos.dem), argumentos.paso_km, argumentos.distancia_km
+    )
+    print('"perfil": [')
+    for i in range(0, len(perfil), 5):
+        print("    " + ", ".join(f"({km:g}, {altitud})" for km, altitud in perfil[i:i + 5]) + ",")
+    print("],")
@@ -0,0 +1,327 @@
+"""
+Proyección de posiciones GPS en vivo sobre el recorrido para El Cruce Analyzer
+
+Los dispositivos de seguimiento envían lat/lon cada pocos segundos. Cada
+posición se proyecta sobre el tramo más cercano del track de la etapa,
+buscado en una grilla de celdas que lista los tramos cercanos a cada una.
+Cuando el recorrido pasa dos veces cerca del mismo lugar (ida y vuelta,
+cruces), el progreso anterior de cada corredor y una velocidad máxima
+eligen el tramo correcto; la primera posición de cada corredor, sin
+progreso anterior, se ubica por el km esperado según el tiempo transcurrido
+y su pace. Si varias posiciones seguidas contradicen el progreso guardado,
+el corredor pasa a la otra rama. Todo se calcula por lotes con numpy.
+"""
+
+import numpy as np
+
+from utils.mapa import proyectar_metros
+from utils.perfiles import interpolar_altitudes, km_equivalentes, perfil_a_arrays
+
+TAMANO_CELDA_M = 250.0
+RADIO_MAXIMO_M = 150.0
+VELOCIDAD_MAXIMA_KMH = 25.0
+RETROCESO_TOLERADO_KM = 0.2
+# Costo extra (en metros) de un tramo incompatible con el progreso del corredor
+PENALIZACION_PROGRESO_M = 10_000.0
+# Metros de costo por km de avance: entre tramos cercanos gana el más próximo
+# al progreso anterior (desempata los dos lados de una horquilla)
+COSTO_AVANCE_M_POR_KM = 20.0
+# Posiciones seguidas y coherentes entre sí que contradicen el progreso
+# guardado antes de aceptar que el corredor está en otra rama
+PINGS_CAMBIO_RAMA = 3
+# Distancia mínima (en km de recorrido) al progreso guardado de un tramo de otra rama
+SEPARACION_RAMAS_KM = 1.0
+PACE_PLANO_DEFECTO = 9.0
+
+
+class IndiceTramos:
+    """
+    Grilla regular sobre los tramos de una polilínea.
+
+    Cada tramo se registra en todas las celdas que toca su caja ampliada en
+    el radio de búsqueda, así que los candidatos de un punto son sólo los
+    tramos de su celda. La grilla se guarda en formato CSR (claves
+    ordenadas, inicios y tramos) para consultar lotes sin bucles.
+    """
+
+    def __init__(self, x, y, tamano_celda_m=TAMANO_CELDA_M, radio_m=RADIO_MAXIMO_M):
+        """
+        Args:
+            x: Array de coordenadas x de los puntos de la polilínea en metros
+            y: Array de coordenadas y en metros
+            tamano_celda_m: Lado de las celdas de la grilla
+            radio_m: Distancia máxima de un punto a su tramo
+        """
+        self.ax, self.ay = x[:-1], y[:-1]
+        self.dx, self.dy = np.diff(x), np.diff(y)
+        self.largo2 = np.maximum(self.dx ** 2 + self.dy ** 2, 1e-12)
+        self.tamano_celda_m = tamano_celda_m
+        self.x0 = x.min() - radio_m
+        self.y0 = y.min() - radio_m
+        self.columnas = int((x.max() + radio_m - self.x0) // tamano_celda_m) + 1
+
+        cx0 = self._celda(np.minimum(x[:-1], x[1:]) - radio_m, self.x0)
+        cx1 = self._celda(np.maximum(x[:-1], x[1:]) + radio_m, self.x0)
+        cy0 = self._celda(np.minimum(y[:-1], y[1:]) - radio_m, self.y0)
+        cy1 = self._celda(np.maximum(y[:-1], y[1:]) + radio_m, self.y0)
+        ancho = cx1 - cx0 + 1
+        cantidades = ancho * (cy1 - cy0 + 1)
+
+        tramos = np.repeat(np.arange(len(self.dx)), cantidades)
+        local = np.arange(len(tramos)) - np.repeat(np.cumsum(cantidades) - cantidades, cantidades)
+        claves = (cy0[tramos] + local // ancho[tramos]) * self.columnas + cx0[tramos] + local % ancho[tramos]
+
+        orden = np.argsort(claves, kind="stable")
+        self.tramos = tramos[orden]
+        self.claves, self.inicios = np.unique(claves[orden], return_index=True)
+        self.fines = np.append(self.inicios[1:], len(self.tramos))
+
+    def _celda(self, valores, origen):
+        return ((valores - origen) // self.tamano_celda_m).astype(np.int64)
+
+    def candidatos(self, x, y):
+        """
+        Pares (punto, tramo) a evaluar para un lote de puntos.
+
+        Args:
+            x: Array de coordenadas x en metros
+            y: Array de coordenadas y en metros
+
+        Returns:
+            Tupla (puntos, tramos) de arrays de índices
+        """
+        cx, cy = self._celda(x, self.x0), self._celda(y, self.y0)
+        dentro = (cx >= 0) & (cx < self.columnas) & (cy >= 0)
+        claves = cy * self.columnas + cx
+        posicion = np.minimum(np.searchsorted(self.claves, claves), len(self.claves) - 1)
+        encontrada = dentro & (self.claves[posicion] == claves)
+        cantidades = np.where(encontrada, self.fines[posicion] - self.inicios[posicion], 0)
+
+        puntos = np.repeat(np.arange(len(x)), cantidades)
+        local = np.arange(len(puntos)) - np.repeat(np.cumsum(cantidades) - cantidades, cantidades)
+        return puntos, self.tramos[self.inicios[posicion][puntos] + local]
+
+    def proyectar(self, x, y, puntos, tramos):
+        """
+        Proyección de cada punto sobre cada uno de sus tramos candidatos.
+
+        Args:
+            x, y: Coordenadas de los puntos en metros
+            puntos, tramos: Pares de candidatos()
+
+        Returns:
+            Tupla (fraccion, distancia_m): posición a lo largo del tramo (0 a 1)
+            y distancia del punto a esa posición
+        """
+        px, py = x[puntos] - self.ax[tramos], y[puntos] - self.ay[tramos]
+        fraccion = np.clip((px * self.dx[tramos] + py * self.dy[tramos]) / self.largo2[tramos], 0.0, 1.0)
+        distancia = np.hypot(px - fraccion * self.dx[tramos], py - fraccion * self.dy[tramos])
+        return fraccion, distancia
+
+
+class EmparejadorGPS:
+    """
+    Proyecta posiciones GPS de todo el pelotón sobre el recorrido de una etapa.
+
+    Guarda por corredor el último km y el tiempo de su posición en arrays
+    compactos, como SeguidorCarrera, para que el progreso sólo avance salvo
+    al cambiar de rama.
+    """
+
+    def __init__(self, etapa, ruta, capacidad=4096, tamano_celda_m=TAMANO_CELDA_M, radio_m=RADIO_MAXIMO_M,
+                 velocidad_maxima_kmh=VELOCIDAD_MAXIMA_KMH, retroceso_tolerado_km=RETROCESO_TOLERADO_KM):
+        """
+        Args:
+            etapa: Dict con datos de la etapa (su perfil da las altitudes)
+            ruta: Dict de cargar_ruta_etapa() escalado a la distancia oficial
+            capacidad: Número inicial de corredores reservados
+            tamano_celda_m: Lado de las celdas del índice espacial
+            radio_m: Distancia máxima al recorrido para aceptar una posición
+            velocidad_maxima_kmh: Avance máximo creíble entre dos posiciones
+            retroceso_tolerado_km: Retroceso aceptado por ruido del GPS
+        """
+        self.etapa = etapa
+        self.radio_m = radio_m
+        self.velocidad_maxima_kmh = velocidad_maxima_kmh
+        self.retroceso_tolerado_km = retroceso_tolerado_km
+        self._kms = np.asarray(ruta["km"], dtype=np.float64)
+        self._lat_referencia = float(np.mean(ruta["lat"]))
+        x, y = proyectar_metros(ruta["lat"], ruta["lon"], self._lat_referencia)
+        self.indice_tramos = IndiceTramos(x, y, tamano_celda_m, radio_m)
+
+        # Km equivalentes en plano del perfil: pasan un tiempo a un km esperado
+        self._kms_perfil = perfil_a_arrays(etapa["perfil"])[0]
+        self._equivalentes_perfil = km_equivalentes(etapa["perfil"])
+
+        self.indice = {}
+        self.n = 0
+        self.km = np.zeros(capacidad, dtype=np.float64)
+        self.tiempo_s = np.zeros(capacidad, dtype=np.float64)
+        self.observado = np.zeros(capacidad, dtype=bool)
+        # Posiciones seguidas en otra rama y la última de ellas
+        self.desacuerdos = np.zeros(capacidad, dtype=np.int64)
+        self.km_alternativo = np.zeros(capacidad, dtype=np.float64)
+        self.tiempo_alternativo = np.zeros(capacidad, dtype=np.float64)
+        self.capacidad = capacidad
+
+    def _filas(self, dorsales):
+        filas = np.empty(len(dorsales), dtype=np.int64)
+        for i, dorsal in enumerate(dorsales.tolist()):
+            fila = self.indice.get(dorsal)
+            if fila is None:
+                fila = self.indice[dorsal] = self.n
+                self.n += 1
+            filas[i] = fila
+        if self.n > self.capacidad:
+            capacidad = max(self.n, self.capacidad * 2)
+            for nombre in ("km", "tiempo_s", "observado", "desacuerdos", "km_alternativo", "tiempo_alternativo"):
+                viejo = getattr(self, nombre)
+                nuevo = np.zeros(capacidad, dtype=viejo.dtype)
+                nuevo[:self.capacidad] = viejo
+                setattr(self, nombre, nuevo)
+            self.capacidad = capacidad
+        return filas
+
+    def _incompatible(self, avance, transcurrido):
+        return (avance < -self.retroceso_tolerado_km) | (
+            avance > transcurrido * self.velocidad_maxima_kmh / 3600 + self.retroceso_tolerado_km
+        )
+
+    def _emparejar(self, filas, x, y, tiempos, paces):
+        """
+        Km de cada posición de un lote con a lo sumo una por corredor.
+
+        Returns:
+            Tupla (km, distancia_m, cambio): cambio marca los corredores que
+            pasan a otra rama (su km puede retroceder)
+        """
+        puntos, tramos = self.indice_tramos.candidatos(x, y)
+        fraccion, distancia = self.indice_tramos.proyectar(x, y, puntos, tramos)
+        kms = self._kms[tramos] + fraccion * (self._kms[tramos + 1] - self._kms[tramos])
+        cerca = np.where(distancia <= self.radio_m, distancia, np.inf)
+
+        # Sin posición anterior, la referencia es el km esperado a su pace
+        esperado = np.interp(tiempos / 60 / paces, self._equivalentes_perfil, self._kms_perfil)
+        observado = self.observado[filas]
+        anterior = np.where(observado, self.km[filas], esperado)[puntos]
+        transcurrido = np.maximum(tiempos - self.tiempo_s[filas], 0.0)[puntos]
+
+        # Tramos incompatibles con el último progreso del corredor: siguen
+        # valiendo si no hay otro, pero pierden contra cualquier compatible
+        incompatible = self._incompatible(kms - anterior, transcurrido) & observado[puntos]
+        costo = cerca + incompatible * PENALIZACION_PROGRESO_M + np.abs(kms - anterior) * COSTO_AVANCE_M_POR_KM
+        elegidos = _menor_costo(puntos, costo, len(x))
+
+        km = np.full(len(x), np.nan)
+        distancia_m = np.full(len(x), np.nan)
+        con_tramo = elegidos >= 0
+        km[con_tramo] = kms[elegidos[con_tramo]]
+        distancia_m[con_tramo] = distancia[elegidos[con_tramo]]
+
+        # Ningún tramo cercano es compatible: la posición cuenta como
+        # desacuerdo y se empareja aparte entre los tramos de otra rama,
+        # encadenada a los desacuerdos anteriores (o al km esperado si es
+        # el primero)
+        actual = tiempos >= self.tiempo_s[filas]
+        desacuerdo = np.zeros(len(x), dtype=bool)
+        desacuerdo[con_tramo] = incompatible[elegidos[con_tramo]]
+        desacuerdo &= actual
+        acuerdo = con_tramo & actual & ~desacuerdo
+        self.desacuerdos[filas[acuerdo]] = 0
+        cambio = np.zeros(len(x), dtype=bool)
+        if not desacuerdo.any():
+            return km, distancia_m, cambio
+
+        racha = self.desacuerdos[filas] > 0
+        referencia = np.where(racha, self.km_alternativo[filas], esperado)[puntos]
+        desde_alternativo = np.maximum(tiempos - self.tiempo_alternativo[filas], 0.0)[puntos]
+        incoherente = self._incompatible(kms - referencia, desde_alternativo) & racha[puntos]
+        costo = (
+            np.where(desacuerdo[puntos] & (np.abs(kms - anterior) > SEPARACION_RAMAS_KM), cerca, np.inf)
+            + incoherente * PENALIZACION_PROGRESO_M
+            + np.abs(kms - referencia) * COSTO_AVANCE_M_POR_KM
+        )
+        alternativos = _menor_costo(puntos, costo, len(x))
+        en_desacuerdo = np.flatnonzero(alternativos >= 0)
+        filas_desacuerdo = filas[en_desacuerdo]
+        elegido = alternativos[en_desacuerdo]
+
+        # Un desacuerdo incoherente con la racha empieza una nueva
+        self.desacuerdos[filas_desacuerdo] = np.where(incoherente[elegido], 1, self.desacuerdos[filas_desacuerdo] + 1)
+        self.km_alternativo[filas_desacuerdo] = kms[elegido]
+        self.tiempo_alternativo[filas_desacuerdo] = tiempos[en_desacuerdo]
+
+        cambia = self.desacuerdos[filas_desacuerdo] >= PINGS_CAMBIO_RAMA
+        km[en_desacuerdo[cambia]] = kms[elegido[cambia]]
+        distancia_m[en_desacuerdo[cambia]] = distancia[elegido[cambia]]
+        cambio[en_desacuerdo[cambia]] = True
+        self.desacuerdos[filas_desacuerdo[cambia]] = 0
+        return km, distancia_m, cambio
+
+    def procesar(self, dorsales, lats, lons, tiempos_s, paces_plano=PACE_PLANO_DEFECTO):
+        """
+        Proyecta un lote de posiciones y actualiza el progreso de cada corredor.
+
+        Las posiciones fuera del radio del recorrido se descartan. El km
+        informado nunca retrocede respecto de la posición anterior del
+        corredor, salvo cuando PINGS_CAMBIO_RAMA posiciones seguidas lo
+        ubican en otra rama, y las posiciones más viejas que la última
+        conocida se proyectan sin mover su progreso.
+
+        Args:
+            dorsales: Array de dorsales
+            lats: Array de latitudes en grados
+            lons: Array de longitudes en grados
+            tiempos_s: Array de segundos desde la largada de la etapa
+            paces_plano: Pace en plano de cada corredor (escalar o array),
+                ubica la primera posición de los corredores sin progreso
+
+        Returns:
+            Dict de arrays alineados con la entrada: "km", "altitud",
+            "distancia_m" (al recorrido) y "valido"
+        """
+        dorsales = np.asarray(dorsales, dtype=np.int64)
+        tiempos = np.asarray(tiempos_s, dtype=np.float64)
+        x, y = proyectar_metros(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64),
+                                self._lat_referencia)
+        paces = np.broadcast_to(np.asarray(paces_plano, dtype=np.float64), dorsales.shape)
+        filas = self._filas(dorsales)
+
+        km = np.full(len(dorsales), np.nan)
+        distancia_m = np.full(len(dorsales), np.nan)
+
+        # Varias posiciones de un mismo corredor se procesan por rondas, en
+        # orden de tiempo, para que cada una parta del progreso de la anterior
+        orden = np.lexsort((tiempos, filas))
+        nuevo_grupo = np.r_[True, filas[orden][1:] != filas[orden][:-1]]
+        inicio_grupo = np.maximum.accumulate(np.where(nuevo_grupo, np.arange(len(orden)), 0))
+        ronda = np.empty(len(orden), dtype=np.int64)
+        ronda[orden] = np.arange(len(orden)) - inicio_grupo
+
+        for r in range(int(ronda.max()) + 1 if len(ronda) else 0):
+            lote = np.flatnonzero(ronda == r)
+            km_lote, distancia_lote, cambio = self._emparejar(filas[lote], x[lote], y[lote], tiempos[lote],
+                                                              paces[lote])
+            filas_lote = filas[lote]
+            vigente = ~np.isnan(km_lote) & (tiempos[lote] >= self.tiempo_s[filas_lote])
+            avanza = vigente & ~cambio
+            km_lote[avanza] = np.maximum(km_lote[avanza], self.km[filas_lote[avanza]])
+            self.km[filas_lote[vigente]] = km_lote[vigente]
+            self.tiempo_s[filas_lote[vigente]] = tiempos[lote][vigente]
+            self.observado[filas_lote[vigente]] = True
+            km[lote], distancia_m[lote] = km_lote, distancia_lote
+
+        valido = ~np.isnan(km)
+        altitud = np.full(len(km), np.nan)
+        altitud[valido] = interpolar_altitudes(self.etapa["perfil"], km[valido])
+        return {"km": km, "altitud": altitud, "distancia_m": distancia_m, "valido": valido}
+
+
+def _menor_costo(puntos, costo, n):
+    """Candidato de menor costo finito de cada punto (-1 si no hay)."""
+    elegidos = np.full(n, -1, dtype=np.int64)
+    orden = np.lexsort((costo, puntos))
+    primeros = orden[np.r_[True, puntos[orden][1:] != puntos[orden][:-1]]] if len(orden) else orden
+    primeros = primeros[np.isfinite(costo[primeros])]
+    elegidos[puntos[primeros]] = primeros
+    return elegidos
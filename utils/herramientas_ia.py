@@ -0,0 +1,326 @@
+"""
+Herramientas de cálculo para el asistente de IA de El Cruce Analyzer
+
+Expone las calculadoras locales como funciones que el modelo puede invocar
+y resuelve sin llamar a la API las preguntas numéricas que son inequívocas.
+"""
+
+import json
+import re
+
+from utils.calculadora import (
+    calcular_tiempo_estimado,
+    calcular_pace_necesario,
+    tiempo_limite_etapa,
+    estimar_calorias,
+    formato_tiempo
+)
+from utils.visualizaciones import interpolar_altitud
+
+_ETAPA = {
+    "type": "integer",
+    "description": "Número de etapa (1, 2 o 3); completa distancia y desnivel oficiales",
+}
+
+HERRAMIENTAS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "calcular_tiempo_estimado",
+            "description": "Tiempo para completar una distancia o etapa a un pace dado",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "etapa": _ETAPA,
+                    "distancia_km": {"type": "number"},
+                    "pace_min_km": {"type": "number", "description": "Pace en min/km"},
+                },
+                "required": ["pace_min_km"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "calcular_pace_necesario",
+            "description": "Pace necesario para completar una distancia o etapa en un tiempo objetivo",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "etapa": _ETAPA,
+                    "distancia_km": {"type": "number"},
+                    "tiempo_objetivo_horas": {"type": "number"},
+                },
+                "required": ["tiempo_objetivo_horas"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "tiempo_limite_etapa",
+            "description": "Tiempo límite de una etapa o distancia (15 min/km por defecto)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "etapa": _ETAPA,
+                    "distancia_km": {"type": "number"},
+                    "tiempo_limite_min_km": {"type": "number"},
+                },
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "estimar_calorias",
+            "description": "Calorías estimadas para una etapa o distancia y desnivel",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "etapa": _ETAPA,
+                    "distancia_km": {"type": "number"},
+                    "desnivel_m": {"type": "number"},
+                    "peso_kg": {"type": "number"},
+                },
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "interpolar_altitud",
+            "description": "Altitud en un kilómetro de una etapa según el perfil oficial",
+            "parameters": {
+                "type": "object",
+                "properties": {"etapa": _ETAPA, "km": {"type": "number"}},
+                "required": ["etapa", "km"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "obtener_oasis",
+            "description": "Ubicación (etapa, km y altitud) de los oasis; filtra por etapa o nombre",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "etapa": _ETAPA,
+                    "nombre": {"type": "string", "description": "Por ejemplo 'Oasis E' o 'E'"},
+                },
+            },
+        },
+    },
+]
+
+
+def _etapa_por_numero(etapas, numero):
+    indice = int(numero) - 1
+    if not 0 <= indice < len(etapas):
+        raise IndexError(f"etapa {numero} inexistente")
+    return etapas[indice]
+
+
+def _con_etapa(argumentos, etapas):
+    """Completa distancia y desnivel a partir del número de etapa."""
+    argumentos = dict(argumentos)
+    numero = argumentos.pop("etapa", None)
+    if numero is not None:
+        etapa = _etapa_por_numero(etapas, numero)
+        argumentos.setdefault("distancia_km", etapa["distancia_km"])
+        argumentos.setdefault("desnivel_m", etapa["desnivel_positivo"])
+    return argumentos
+
+
+def buscar_oasis(etapas, etapa=None, nombre=None):
+    """
+    Busca oasis por etapa y/o nombre.
+
+    Args:
+        etapas: Lista de dicts con datos de etapas
+        etapa: Número de etapa (opcional)
+        nombre: Nombre o letra del oasis (opcional)
+
+    Returns:
+        Lista de dicts con "nombre", "etapa", "km" y "altitud_m"
+    """
+    letra = nombre.strip().upper().replace("OASIS", "").strip() if nombre else None
+    encontrados = []
+    for i, datos in enumerate(etapas):
+        if etapa is not None and i != int(etapa) - 1:
+            continue
+        for oasis in datos["oasis"]:
+            if letra and oasis["nombre"].upper().split()[-1] != letra:
+                continue
+            encontrados.append({
+                "nombre": oasis["nombre"],
+                "etapa": i + 1,
+                "km": oasis["km"],
+                "altitud_m": round(interpolar_altitud(datos["perfil"], oasis["km"])),
+            })
+    return encontrados
+
+
+def ejecutar_herramienta(nombre, argumentos_json, etapas):
+    """
+    Ejecuta una herramienta pedida por el modelo.
+
+    Args:
+        nombre: Nombre de la herramienta
+        argumentos_json: Argumentos en JSON
+        etapas: Lista de dicts con datos de etapas
+
+    Returns:
+        Resultado en JSON (string)
+    """
+    try:
+        argumentos = json.loads(argumentos_json or "{}")
+        if nombre == "obtener_oasis":
+            resultado = buscar_oasis(etapas, argumentos.get("etapa"), argumentos.get("nombre"))
+        elif nombre == "interpolar_altitud":
+            etapa = _etapa_por_numero(etapas, argumentos["etapa"])
+            resultado = {"altitud_m": round(interpolar_altitud(etapa["perfil"], argumentos["km"]))}
+        else:
+            argumentos = _con_etapa(argumentos, etapas)
+            if nombre == "calcular_tiempo_estimado":
+                horas = calcular_tiempo_estimado(argumentos["distancia_km"], argumentos["pace_min_km"])
+                resultado = {"horas": horas, "formato": formato_tiempo(horas)}
+            elif nombre == "calcular_pace_necesario":
+                resultado = {"pace_min_km": calcular_pace_necesario(
+                    argumentos["distancia_km"], argumentos["tiempo_objetivo_horas"]
+                )}
+            elif nombre == "tiempo_limite_etapa":
+                horas = tiempo_limite_etapa(
+                    argumentos["distancia_km"], argumentos.get("tiempo_limite_min_km", 15)
+                )
+                resultado = {"horas": horas, "formato": formato_tiempo(horas)}
+            elif nombre == "estimar_calorias":
+                resultado = {"kcal": estimar_calorias(
+                    argumentos["distancia_km"], argumentos["desnivel_m"], argumentos.get("peso_kg", 70)
+                )}
+            else:
+                resultado = {"error": f"Herramienta desconocida: {nombre}"}
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        resultado = {"error": f"Argumentos inválidos: {e}"}
+    return json.dumps(resultado, ensure_ascii=False)
+
+
+# Enrutador local de intenciones
+
+_NUMERO = r"(\d+(?:[.,]\d+)?)"
+# "9:30" (minutos:segundos o horas:minutos) antes que un número suelto
+_DURACION = r"(\d+:[0-5]\d|\d+(?:[.,]\d+)?)"
+_RE_ETAPA = re.compile(r"etapa\s*(\d+)", re.IGNORECASE)
+_RE_PACE = re.compile(_DURACION + r"\s*(?:min(?:utos)?\s*(?:/|por)\s*km|min/km|'/km)", re.IGNORECASE)
+_RE_HORAS = re.compile(_DURACION + r"\s*(?:h|hs|horas?)\b(?:\s*(?:y\s*)?(\d+)\s*(?:min|minutos)\b)?", re.IGNORECASE)
+# Tramos parciales ("del km 10 al 20", "hasta el kilómetro 30"): no se resuelven localmente
+_RE_TRAMO = re.compile(r"\b(?:km|kil[oó]metros?)\s*\d|\b(?:del?|desde)\s+(?:el\s+)?\d+\s*(?:km\s*)?(?:al?|hasta)\s+\d",
+                       re.IGNORECASE)
+# Distancias parciales ("los últimos 10 km", "5 kilómetros de subida")
+_RE_DISTANCIA = re.compile(r"\d+(?:[.,]\d+)?\s*(?:km|kil[oó]metros?)\b", re.IGNORECASE)
+# Varias etapas ("etapas", "etapa 1 y 3", "comparado con la etapa 1")
+_RE_VARIAS_ETAPAS = re.compile(r"\betapas\b|etapa\s*\d+\s*(?:y|e|o|u|,|vs\.?|contra)\s*\d|compar", re.IGNORECASE)
+# Ritmos por unidad, nutrición y condiciones o terreno que las calculadoras no contemplan
+_RE_MATICES = re.compile(
+    r"por\s+hora|/\s*h\b|por\s+d[ií]a|carbohidrat|hidrat|gramos|\bgr?\b|agua|geles|sodio|"
+    r"\bsi\b|llu[ev]|nieve|barro|calor\b|fr[ií]o|viento|noche|bajadas?|subidas?|descensos?|ascensos?|"
+    r"caminand|lesi[oó]n|cansad|mochila",
+    re.IGNORECASE
+)
+_RE_PESO = re.compile(_NUMERO + r"\s*(?:kg|kilos)", re.IGNORECASE)
+_RE_OASIS = re.compile(r"oasis\s+([a-g])\b", re.IGNORECASE)
+
+
+def _numero(texto):
+    return float(texto.replace(",", "."))
+
+
+def _duracion(texto):
+    # "9:30" -> 9.5; "9,5" -> 9.5
+    if ":" in texto:
+        enteros, sesenta = texto.split(":")
+        return int(enteros) + int(sesenta) / 60
+    return _numero(texto)
+
+
+def responder_localmente(pregunta, etapas):
+    """
+    Responde preguntas numéricas inequívocas con las calculadoras locales.
+
+    Args:
+        pregunta: Pregunta del usuario
+        etapas: Lista de dicts con datos de etapas
+
+    Returns:
+        Respuesta en markdown, o None si la pregunta necesita al modelo
+    """
+    texto = pregunta.lower()
+    # Cualquier matiz (ritmo por hora, lluvia, bajadas...) cambia la respuesta
+    if _RE_MATICES.search(texto):
+        return None
+    numeros_etapa = {int(n) for n in _RE_ETAPA.findall(texto)}
+    if len(numeros_etapa) > 1 or _RE_VARIAS_ETAPAS.search(texto):
+        return None
+    numero_etapa = numeros_etapa.pop() if numeros_etapa else None
+    if numero_etapa is not None and not 1 <= numero_etapa <= len(etapas):
+        return None
+    etapa = etapas[numero_etapa - 1] if numero_etapa else None
+
+    # ¿Dónde está el Oasis X?
+    oasis = _RE_OASIS.search(texto)
+    if oasis and re.search(r"d[oó]nde|ubicaci[oó]n|qu[eé] km|en qu[eé] (km|kil[oó]metro)", texto):
+        encontrados = buscar_oasis(etapas, nombre=oasis.group(1))
+        if len(encontrados) == 1:
+            o = encontrados[0]
+            return (
+                f"**{o['nombre']}** está en la **Etapa {o['etapa']}**, en el **km {o['km']}** "
+                f"(~{o['altitud_m']} m de altitud)."
+            )
+
+    # Tiempos hasta un oasis o entre kms son de un tramo, no de la etapa entera
+    if etapa is None or oasis or _RE_TRAMO.search(texto) or _RE_DISTANCIA.search(texto):
+        return None
+
+    pace = _RE_PACE.search(texto)
+    horas = _RE_HORAS.search(texto)
+
+    # ¿Cuánto tardo en la Etapa N a X min/km?
+    if pace and re.search(r"cu[aá]nto|tiempo|tard|demor", texto) and not horas:
+        valor = _duracion(pace.group(1))
+        tiempo = calcular_tiempo_estimado(etapa["distancia_km"], valor)
+        limite = tiempo_limite_etapa(etapa["distancia_km"])
+        estado = "✅ dentro del tiempo límite" if tiempo <= limite else "⚠️ excede el tiempo límite"
+        return (
+            f"A **{pace.group(1)} min/km**, la **{etapa['nombre']}** ({etapa['distancia_km']} km) "
+            f"te llevaría **{formato_tiempo(tiempo)}** ({estado} de {formato_tiempo(limite)})."
+        )
+
+    # ¿Qué pace necesito para hacer la Etapa N en X h?
+    if horas and re.search(r"pace|ritmo", texto) and not pace:
+        tiempo = _duracion(horas.group(1)) + (int(horas.group(2)) / 60 if horas.group(2) else 0)
+        necesario = calcular_pace_necesario(etapa["distancia_km"], tiempo)
+        return (
+            f"Para completar la **{etapa['nombre']}** ({etapa['distancia_km']} km) en "
+            f"**{formato_tiempo(tiempo)}** necesitas un pace promedio de **{necesario:.2f} min/km**."
+        )
+
+    # ¿Cuántas calorías gasto en la Etapa N?
+    if re.search(r"calor[ií]as|kcal", texto):
+        peso = _RE_PESO.search(texto)
+        peso_kg = _numero(peso.group(1)) if peso else 70
+        kcal = estimar_calorias(etapa["distancia_km"], etapa["desnivel_positivo"], peso_kg)
+        return (
+            f"Para la **{etapa['nombre']}** se estiman **~{kcal:,} kcal** "
+            f"para un corredor de {peso_kg:g} kg."
+        )
+
+    # ¿Cuál es el tiempo límite de la Etapa N?
+    if re.search(r"l[ií]mite|corte", texto) and not pace and not horas:
+        limite = tiempo_limite_etapa(etapa["distancia_km"])
+        return (
+            f"El tiempo límite de la **{etapa['nombre']}** ({etapa['distancia_km']} km a 15 min/km) "
+            f"es **{formato_tiempo(limite)}**."
+        )
+
+    return None
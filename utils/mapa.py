@@ -0,0 +1,199 @@
+"""
+Mapa del recorrido con simplificación multirresolución para El Cruce Analyzer
+
+Cada punto del track recibe una sola vez su "importancia" de Douglas-Peucker
+(la tolerancia en metros por debajo de la cual deja de poder descartarse).
+Con eso cualquier nivel de zoom se resuelve con un filtro, y los niveles
+quedan anidados: acercarse sólo agrega puntos.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from utils.cache_disco import cache
+from utils.rutas import CARPETA_RUTAS, RADIO_TIERRA_KM, cargar_ruta_etapa, posiciones_en_km
+
+# Metros por píxel en el ecuador con zoom 0 (teselas de 256 px)
+METROS_PIXEL_ZOOM_0 = 156543.03
+ZOOM_MINIMO = 8
+ZOOM_MAXIMO = 16
+
+
+def proyectar_metros(lats, lons, lat_referencia=None):
+    """
+    Proyección equirectangular local en metros.
+
+    Args:
+        lats: Array de latitudes en grados
+        lons: Array de longitudes en grados
+        lat_referencia: Latitud de la proyección (default: la media de lats);
+            fijarla permite proyectar otros puntos en el mismo plano
+
+    Returns:
+        Tupla (x, y) de arrays en metros
+    """
+    lat0 = np.radians(np.mean(lats) if lat_referencia is None else lat_referencia)
+    x = np.radians(lons) * np.cos(lat0) * RADIO_TIERRA_KM * 1000
+    y = np.radians(lats) * RADIO_TIERRA_KM * 1000
+    return x, y
+
+
+def importancia_douglas_peucker(x, y):
+    """
+    Tolerancia a la que cada punto entra en la simplificación de Douglas-Peucker.
+
+    Un punto aparece en la polilínea simplificada con tolerancia t si su
+    importancia es mayor que t. Los extremos valen infinito.
+
+    Args:
+        x: Array de coordenadas x en metros
+        y: Array de coordenadas y en metros
+
+    Returns:
+        Array de importancias en metros
+    """
+    n = len(x)
+    importancia = np.zeros(n)
+    if n == 0:
+        return importancia
+    importancia[0] = importancia[-1] = np.inf
+
+    pila = [(0, n - 1, np.inf)]
+    while pila:
+        inicio, fin, cota = pila.pop()
+        if fin - inicio < 2:
+            continue
+        dx, dy = x[fin] - x[inicio], y[fin] - y[inicio]
+        px, py = x[inicio + 1:fin] - x[inicio], y[inicio + 1:fin] - y[inicio]
+        largo = np.hypot(dx, dy)
+        if largo > 0:
+            distancias = np.abs(px * dy - py * dx) / largo
+        else:
+            distancias = np.hypot(px, py)
+        i = int(np.argmax(distancias))
+        indice = inicio + 1 + i
+        # Un punto no puede ser más importante que el que partió su tramo
+        importancia[indice] = min(distancias[i], cota)
+        pila.append((inicio, indice, importancia[indice]))
+        pila.append((indice, fin, importancia[indice]))
+    return importancia
+
+
+def tolerancia_zoom(zoom, latitud):
+    """
+    Tolerancia de simplificación para un nivel de zoom (un píxel en metros).
+
+    Args:
+        zoom: Nivel de zoom del mapa
+        latitud: Latitud de referencia en grados
+
+    Returns:
+        Tolerancia en metros
+    """
+    return METROS_PIXEL_ZOOM_0 * np.cos(np.radians(latitud)) / 2 ** zoom
+
+
+@lru_cache(maxsize=8)
+def _piramide_etapa(indice, distancia_km, modificado):
+    ruta = cargar_ruta_etapa(indice, distancia_km)
+    if ruta is None:
+        return None
+    # La importancia sólo depende de las coordenadas del track
+    ruta["importancia"] = cache.obtener_o_calcular(
+        ruta["lat"].tobytes() + ruta["lon"].tobytes(),
+        lambda: {"importancia": importancia_douglas_peucker(*proyectar_metros(ruta["lat"], ruta["lon"]))},
+        "importancia"
+    )["importancia"]
+    for valores in ruta.values():
+        valores.setflags(write=False)
+    return ruta
+
+
+def piramide_etapa(indice, distancia_km=None):
+    """
+    Track de una etapa con la importancia de cada punto, calculada una vez.
+
+    Args:
+        indice: Índice de la etapa (0, 1, 2...)
+        distancia_km: Distancia oficial para escalar los km del track
+
+    Returns:
+        Dict de cargar_ruta_etapa() con el array "importancia", o None si
+        no hay track
+    """
+    archivo = CARPETA_RUTAS / f"etapa_{indice + 1}.gpx"
+    if not archivo.exists():
+        return None
+    return _piramide_etapa(indice, distancia_km, archivo.stat().st_mtime)
+
+
+def simplificar(piramide, tolerancia_m):
+    """
+    Polilínea simplificada de un track para una tolerancia.
+
+    Args:
+        piramide: Dict devuelto por piramide_etapa()
+        tolerancia_m: Tolerancia en metros
+
+    Returns:
+        Dict con arrays "km", "lat" y "lon"
+    """
+    mascara = piramide["importancia"] > tolerancia_m
+    return {clave: piramide[clave][mascara] for clave in ("km", "lat", "lon")}
+
+
+def ruta_para_zoom(piramide, zoom):
+    """
+    Polilínea con sólo los puntos visibles en un nivel de zoom.
+
+    Args:
+        piramide: Dict devuelto por piramide_etapa()
+        zoom: Nivel de zoom del mapa
+
+    Returns:
+        Dict con arrays "km", "lat" y "lon"
+    """
+    zoom = min(max(zoom, ZOOM_MINIMO), ZOOM_MAXIMO)
+    return simplificar(piramide, tolerancia_zoom(zoom, float(np.mean(piramide["lat"]))))
+
+
+def zoom_inicial(lats, lons, ancho_px=800, alto_px=550):
+    """
+    Zoom que encuadra un conjunto de puntos.
+
+    Args:
+        lats: Array de latitudes en grados
+        lons: Array de longitudes en grados
+        ancho_px: Ancho del mapa en píxeles
+        alto_px: Alto del mapa en píxeles
+
+    Returns:
+        Nivel de zoom entero
+    """
+    x, y = proyectar_metros(lats, lons)
+    extension = max((x.max() - x.min()) / ancho_px, (y.max() - y.min()) / alto_px, 1e-9)
+    zoom = np.log2(METROS_PIXEL_ZOOM_0 * np.cos(np.radians(np.mean(lats))) / extension)
+    return int(min(max(np.floor(zoom), ZOOM_MINIMO), ZOOM_MAXIMO))
+
+
+def puntos_interes(etapa, ruta):
+    """
+    Ubicación de largada, oasis y llegada de una etapa sobre su track.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        ruta: Dict con arrays "km", "lat" y "lon" del track completo
+
+    Returns:
+        Lista de dicts con "nombre", "tipo" ("largada", "oasis" o "llegada"),
+        "km", "lat" y "lon"
+    """
+    puntos = [(etapa["inicio"], "largada", 0.0)]
+    puntos += [(o["nombre"], "oasis", o["km"]) for o in etapa["oasis"]]
+    puntos.append((etapa["fin"], "llegada", etapa["distancia_km"]))
+    lats, lons = posiciones_en_km(ruta, [km for _, _, km in puntos])
+    return [
+        {"nombre": nombre, "tipo": tipo, "km": km, "lat": float(lat), "lon": float(lon)}
+        for (nombre, tipo, km), lat, lon in zip(puntos, lats, lons)
+    ]
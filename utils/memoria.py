@@ -0,0 +1,388 @@
+"""
+Perfilado de memoria del servidor por página y por sesión
+
+Opcional (PERFIL_MEMORIA=1): con tracemalloc activo, al comienzo de cada
+ejecución de una página se atribuye lo que creció la memoria trazada desde
+la anterior a la página y la sesión que corrieron en el medio, y se mide lo
+que guarda cada sesión en st.session_state (historial del chat, figuras,
+DataFrames). El desglose por módulo (utils.visualizaciones,
+utils.asistente_ai, páginas, librerías) y por línea se calcula a pedido
+contra una instantánea de referencia, porque agrupar cientos de miles de
+bloques lleva segundos y no puede hacerse en cada ejecución. El resumen se
+ve en la página de depuración o se escribe a un reporte local.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ACTIVO = os.getenv("PERFIL_MEMORIA", "0").lower() in ("1", "true", "si", "sí")
+ARCHIVO_REPORTE = os.getenv("PERFIL_MEMORIA_REPORTE", "reporte_memoria.json")
+CUADROS_TRAZA = int(os.getenv("PERFIL_MEMORIA_CUADROS", "4"))
+MAXIMO_HISTORIAL = 500
+# Las sesiones sin ejecuciones en este tiempo se olvidan, revisando cada INTERVALO_LIMPIEZA_S
+ANTIGUEDAD_SESION_S = 3600
+INTERVALO_LIMPIEZA_S = 300
+
+RAIZ = Path(__file__).parent.parent.resolve()
+
+
+@lru_cache(maxsize=4096)
+def modulo_de_archivo(archivo):
+    """
+    Nombre corto del módulo al que pertenece un archivo fuente.
+
+    Args:
+        archivo: Ruta del archivo .py
+
+    Returns:
+        "utils.x", "data.x", "pages/Nombre", "app", el paquete de una
+        librería ("plotly", "pandas"...) o "python"
+    """
+    if archivo.startswith("<"):
+        return "python"
+    ruta = Path(archivo)
+    try:
+        relativa = ruta.resolve().relative_to(RAIZ)
+    except (ValueError, OSError):
+        relativa = None
+    if relativa is not None and "site-packages" not in relativa.parts:
+        if relativa.parts[0] == "pages":
+            return f"pages/{relativa.stem}"
+        return ".".join(relativa.with_suffix("").parts)
+    partes = ruta.parts
+    for marcador in ("site-packages", "dist-packages"):
+        if marcador in partes:
+            paquete = partes[partes.index(marcador) + 1]
+            return paquete[:-3] if paquete.endswith(".py") else paquete
+    return "python"
+
+
+def tamano_profundo(objeto, vistos=None):
+    """
+    Bytes aproximados de un objeto y de todo lo que contiene.
+
+    Args:
+        objeto: Cualquier objeto (dicts, listas, arrays, DataFrames, figuras...)
+        vistos: Set de ids ya contados (uso interno)
+
+    Returns:
+        Tamaño en bytes
+    """
+    if vistos is None:
+        vistos = set()
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+
+    if isinstance(objeto, np.ndarray):
+        return sys.getsizeof(objeto) if objeto.base is not None else objeto.nbytes + sys.getsizeof(objeto)
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(deep=True).sum())
+    if isinstance(objeto, pd.Series):
+        return int(objeto.memory_usage(deep=True))
+
+    tamano = sys.getsizeof(objeto)
+    if isinstance(objeto, (str, bytes, bytearray, int, float, bool)):
+        return tamano
+    if isinstance(objeto, dict):
+        tamano += sum(tamano_profundo(k, vistos) + tamano_profundo(v, vistos) for k, v in objeto.items())
+    elif isinstance(objeto, (list, tuple, set, frozenset, deque)):
+        tamano += sum(tamano_profundo(v, vistos) for v in objeto)
+    elif hasattr(objeto, "to_plotly_json"):
+        # Figuras de Plotly: sus datos viven en estructuras internas
+        tamano += tamano_profundo(objeto.to_plotly_json(), vistos)
+    elif hasattr(objeto, "__dict__"):
+        tamano += tamano_profundo(vars(objeto), vistos)
+    elif hasattr(objeto, "__slots__"):
+        tamano += sum(
+            tamano_profundo(getattr(objeto, s), vistos) for s in objeto.__slots__ if hasattr(objeto, s)
+        )
+    return tamano
+
+
+def rss_actual():
+    """Memoria residente del proceso en bytes (0 si no se puede leer)."""
+    try:
+        with open("/proc/self/statm", "r") as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource  # Sólo Unix; en Linux ru_maxrss está en KB
+
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+
+def _por_modulo(estadisticas):
+    """Suma estadísticas de tracemalloc agrupadas por archivo a módulos."""
+    modulos = {}
+    for estadistica in estadisticas:
+        archivo = estadistica.traceback[0].filename
+        if archivo == tracemalloc.__file__:
+            continue
+        modulo = modulo_de_archivo(archivo)
+        bytes_, cantidad = modulos.get(modulo, (0, 0))
+        modulos[modulo] = (bytes_ + estadistica.size, cantidad + estadistica.count)
+    return modulos
+
+
+def _es_propio(modulo):
+    return modulo in ("app", "api") or modulo.startswith(("utils.", "data.", "pages/"))
+
+
+class MonitorMemoria:
+    """
+    Memoria por ejecución de página y por sesión, compartida por todas las sesiones.
+    """
+
+    def __init__(self, activo=ACTIVO, archivo=ARCHIVO_REPORTE, cuadros=CUADROS_TRAZA,
+                 maximo_historial=MAXIMO_HISTORIAL):
+        self.activo = activo
+        self.archivo = archivo
+        self.cuadros = cuadros
+        self.historial = deque(maxlen=maximo_historial)
+        self.sesiones = {}
+        self._base = None
+        self._base_modulos = {}
+        self._trazado_anterior = 0
+        self._ultima = None
+        self._limpieza = time.time()
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        """Activa tracemalloc y toma la instantánea de referencia."""
+        with self._lock:
+            self.activo = True
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.cuadros)
+            self._base = tracemalloc.take_snapshot()
+            self._base_modulos = _por_modulo(self._base.statistics("filename"))
+            self._trazado_anterior = tracemalloc.get_traced_memory()[0]
+            self._ultima = None
+
+    def detener(self):
+        """Desactiva el perfilado y libera la instantánea de referencia."""
+        with self._lock:
+            self.activo = False
+            self._base = self._ultima = None
+            self._base_modulos = {}
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def registrar_ejecucion(self, pagina, sesion_id, estado=None):
+        """
+        Registra el comienzo de la ejecución de una página.
+
+        Lo que creció la memoria trazada desde el registro anterior se
+        atribuye a la ejecución anterior (con varias sesiones concurrentes
+        es aproximado).
+
+        Args:
+            pagina: Nombre de la página
+            sesion_id: Identificador de la sesión
+            estado: Dict con el contenido de st.session_state (se mide su tamaño)
+
+        Returns:
+            Dict con el registro de la ejecución anterior, o None
+        """
+        if not self.activo:
+            return None
+        if self._base is None:
+            self.iniciar()
+        tamano_estado = tamano_profundo(estado) if estado is not None else None
+
+        with self._lock:
+            trazado = tracemalloc.get_traced_memory()[0]
+            registro = None
+            if self._ultima is not None:
+                registro = {**self._ultima, "crecimiento_bytes": trazado - self._trazado_anterior}
+                self.historial.append(registro)
+                if registro["sesion"] in self.sesiones:
+                    self.sesiones[registro["sesion"]]["crecimiento_bytes"] += registro["crecimiento_bytes"]
+            self._trazado_anterior = trazado
+
+            sesion = self.sesiones.setdefault(sesion_id, {
+                "ejecuciones": 0, "crecimiento_bytes": 0, "estado_bytes": 0, "estado_inicial_bytes": None,
+            })
+            sesion["ejecuciones"] += 1
+            sesion["pagina"] = pagina
+            sesion["ultima"] = time.time()
+            if tamano_estado is not None:
+                sesion["estado_bytes"] = tamano_estado
+                if sesion["estado_inicial_bytes"] is None:
+                    sesion["estado_inicial_bytes"] = tamano_estado
+            self._ultima = {
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "sesion": sesion_id,
+                "pagina": pagina,
+            }
+        if time.time() - self._limpieza > INTERVALO_LIMPIEZA_S:
+            self.olvidar_sesiones()
+        return registro
+
+    def olvidar_sesiones(self, antiguedad_s=ANTIGUEDAD_SESION_S):
+        """Quita las sesiones sin actividad reciente."""
+        limite = time.time() - antiguedad_s
+        with self._lock:
+            self._limpieza = time.time()
+            for sesion_id in [s for s, datos in self.sesiones.items() if datos["ultima"] < limite]:
+                del self.sesiones[sesion_id]
+
+    def crecimiento_por_modulo(self, limite=15):
+        """
+        Módulos que más crecieron desde la instantánea de referencia.
+
+        Toma una instantánea completa: con mucha memoria trazada lleva segundos.
+
+        Args:
+            limite: Cantidad de módulos
+
+        Returns:
+            Lista de dicts con "modulo", "bytes" y "bloques", de mayor a menor
+        """
+        if self._base is None:
+            return []
+        actuales = _por_modulo(tracemalloc.take_snapshot().statistics("filename"))
+        diferencias = {
+            modulo: (bytes_ - self._base_modulos.get(modulo, (0, 0))[0],
+                     bloques - self._base_modulos.get(modulo, (0, 0))[1])
+            for modulo, (bytes_, bloques) in actuales.items()
+        }
+        ordenados = sorted(diferencias.items(), key=lambda m: m[1][0], reverse=True)[:limite]
+        return [{"modulo": m, "bytes": b, "bloques": c} for m, (b, c) in ordenados if b > 0]
+
+    def lineas_que_crecen(self, limite=15):
+        """
+        Líneas de código propias que más memoria retienen desde la referencia.
+
+        Cada bloque se atribuye al cuadro más profundo de su traza que
+        pertenece al proyecto, así una figura armada por Plotly cuenta para
+        la línea de utils.visualizaciones que la pidió. Es lo más costoso
+        del perfilado.
+
+        Args:
+            limite: Cantidad de líneas
+
+        Returns:
+            Lista de dicts con "modulo", "linea", "bytes" y "bloques"
+        """
+        if self._base is None:
+            return []
+        lineas = {}
+        for diferencia in tracemalloc.take_snapshot().compare_to(self._base, "traceback"):
+            if diferencia.size_diff <= 0:
+                continue
+            for cuadro in diferencia.traceback:
+                modulo = modulo_de_archivo(cuadro.filename)
+                if _es_propio(modulo):
+                    bytes_, bloques = lineas.get((modulo, cuadro.lineno), (0, 0))
+                    lineas[(modulo, cuadro.lineno)] = (bytes_ + diferencia.size_diff, bloques + diferencia.count_diff)
+                    break
+        ordenadas = sorted(lineas.items(), key=lambda l: l[1][0], reverse=True)[:limite]
+        return [{"modulo": m, "linea": l, "bytes": b, "bloques": c} for (m, l), (b, c) in ordenadas]
+
+    def por_pagina(self):
+        """
+        Crecimiento acumulado por página en el historial reciente.
+
+        Returns:
+            Lista de dicts con "pagina", "ejecuciones", "crecimiento_bytes" y
+            "maximo_bytes" (la ejecución que más creció), de mayor a menor
+        """
+        with self._lock:
+            historial = list(self.historial)
+        paginas = {}
+        for registro in historial:
+            datos = paginas.setdefault(
+                registro["pagina"],
+                {"pagina": registro["pagina"], "ejecuciones": 0, "crecimiento_bytes": 0, "maximo_bytes": 0}
+            )
+            datos["ejecuciones"] += 1
+            datos["crecimiento_bytes"] += registro["crecimiento_bytes"]
+            datos["maximo_bytes"] = max(datos["maximo_bytes"], registro["crecimiento_bytes"])
+        return sorted(paginas.values(), key=lambda p: p["crecimiento_bytes"], reverse=True)
+
+    def resumen(self, detalle=True):
+        """
+        Estado actual del perfilado.
+
+        Args:
+            detalle: Si es True incluye el desglose por módulo y por línea (lento)
+
+        Returns:
+            Dict con "fecha", "activo", "rss_bytes", "trazado_bytes",
+            "trazado_pico_bytes", "paginas", "sesiones" y, con detalle,
+            "modulos" y "lineas"
+        """
+        traza_actual, traza_pico = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            sesiones = [
+                {"sesion": s, **datos, "crecimiento_estado_bytes": datos["estado_bytes"] - (datos["estado_inicial_bytes"] or 0)}
+                for s, datos in self.sesiones.items()
+            ]
+        resumen = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "activo": self.activo,
+            "rss_bytes": rss_actual(),
+            "trazado_bytes": traza_actual,
+            "trazado_pico_bytes": traza_pico,
+            "paginas": self.por_pagina(),
+            "sesiones": sorted(sesiones, key=lambda s: s["estado_bytes"], reverse=True),
+        }
+        if detalle:
+            resumen["modulos"] = self.crecimiento_por_modulo()
+            resumen["lineas"] = self.lineas_que_crecen()
+        return resumen
+
+    def escribir_reporte(self, archivo=None):
+        """
+        Escribe el resumen completo a un archivo JSON local.
+
+        Args:
+            archivo: Ruta del reporte (default: PERFIL_MEMORIA_REPORTE)
+
+        Returns:
+            Ruta escrita
+        """
+        archivo = archivo or self.archivo
+        resumen = self.resumen()
+        with open(archivo, "w", encoding="utf-8") as salida:
+            json.dump(resumen, salida, ensure_ascii=False, indent=2)
+        return archivo
+
+
+monitor = MonitorMemoria()
+
+
+def perfilar_pagina(archivo_pagina):
+    """
+    Registra la ejecución de una página de Streamlit si el perfilado está activo.
+
+    Llamar al comienzo de cada página, después de st.set_page_config().
+
+    Args:
+        archivo_pagina: __file__ de la página
+    """
+    if not monitor.activo:
+        return
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    contexto = get_script_run_ctx()
+    sesion_id = contexto.session_id if contexto is not None else "sin_sesion"
+    monitor.registrar_ejecucion(Path(archivo_pagina).stem, sesion_id, st.session_state.to_dict())
@@ -0,0 +1,211 @@
+"""
+Medición de tokens, costos y latencia de las llamadas a OpenAI
+
+Acumula el uso por sesión y global, aplica presupuestos por sesión y por día
+antes de enviar cada pedido y exporta cada llamada a un archivo JSONL local.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Precios en USD por millón de tokens
+PRECIOS = {
+    "gpt-4o-mini": {"entrada": 0.15, "entrada_cache": 0.075, "salida": 0.60},
+}
+
+ARCHIVO_METRICAS = os.getenv("METRICAS_IA_ARCHIVO", "metricas_ia.jsonl")
+PRESUPUESTO_SESION_USD = float(os.getenv("PRESUPUESTO_SESION_USD", "0.05"))
+PRESUPUESTO_DIA_USD = float(os.getenv("PRESUPUESTO_DIA_USD", "2.00"))
+
+
+class PresupuestoExcedido(Exception):
+    """El pedido superaría el presupuesto de la sesión o del día."""
+
+
+def _uso_vacio():
+    return {
+        "llamadas": 0,
+        "tokens_entrada": 0,
+        "tokens_cache": 0,
+        "tokens_salida": 0,
+        "costo_usd": 0.0,
+        "latencia_total_s": 0.0,
+    }
+
+
+def costo_llamada(modelo, tokens_entrada, tokens_cache, tokens_salida):
+    """
+    Calcula el costo de una llamada.
+
+    Args:
+        modelo: Nombre del modelo
+        tokens_entrada: Tokens del prompt (incluye los cacheados)
+        tokens_cache: Tokens del prompt servidos desde caché
+        tokens_salida: Tokens generados
+
+    Returns:
+        Costo en USD (float)
+    """
+    precio = PRECIOS.get(modelo, PRECIOS["gpt-4o-mini"])
+    return (
+        (tokens_entrada - tokens_cache) * precio["entrada"]
+        + tokens_cache * precio["entrada_cache"]
+        + tokens_salida * precio["salida"]
+    ) / 1_000_000
+
+
+class MedidorUso:
+    """
+    Registro de uso de la API compartido por todas las sesiones del servidor.
+    """
+
+    def __init__(self, archivo=ARCHIVO_METRICAS, presupuesto_sesion_usd=PRESUPUESTO_SESION_USD,
+                 presupuesto_dia_usd=PRESUPUESTO_DIA_USD):
+        self.archivo = archivo
+        self.presupuesto_sesion_usd = presupuesto_sesion_usd
+        self.presupuesto_dia_usd = presupuesto_dia_usd
+        self.sesiones = {}
+        self.total = _uso_vacio()
+        self.dia = date.today().isoformat()
+        self.costo_dia_usd = self._costo_registrado(self.dia)
+        self._lock = threading.Lock()
+
+    def _costo_registrado(self, dia):
+        """Suma el costo ya exportado hoy, para respetar el presupuesto tras reiniciar."""
+        if not self.archivo or not os.path.exists(self.archivo):
+            return 0.0
+        costo = 0.0
+        with open(self.archivo, "r", encoding="utf-8") as archivo:
+            for linea in archivo:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    continue
+                if registro.get("fecha", "").startswith(dia):
+                    costo += registro.get("costo_usd", 0.0)
+        return costo
+
+    def _renovar_dia(self):
+        hoy = date.today().isoformat()
+        if hoy != self.dia:
+            self.dia = hoy
+            self.costo_dia_usd = 0.0
+
+    def verificar_presupuesto(self, sesion_id, modelo, mensajes, max_tokens):
+        """
+        Rechaza el pedido si su costo máximo superaría algún presupuesto.
+
+        Args:
+            sesion_id: Identificador de la sesión (o None)
+            modelo: Nombre del modelo
+            mensajes: Mensajes a enviar
+            max_tokens: Límite de tokens de salida
+
+        Raises:
+            PresupuestoExcedido
+        """
+        # Estimación conservadora: ~4 caracteres por token
+        tokens_entrada = sum(len(m.get("content") or "") for m in mensajes) // 4
+        estimado = costo_llamada(modelo, tokens_entrada, 0, max_tokens)
+        with self._lock:
+            self._renovar_dia()
+            if self.costo_dia_usd + estimado > self.presupuesto_dia_usd:
+                raise PresupuestoExcedido("Se alcanzó el presupuesto diario de IA")
+            gastado = self.sesiones.get(sesion_id, _uso_vacio())["costo_usd"]
+            if sesion_id is not None and gastado + estimado > self.presupuesto_sesion_usd:
+                raise PresupuestoExcedido("Se alcanzó el presupuesto de IA de esta sesión")
+
+    def registrar(self, sesion_id, modelo, uso, latencia_s, tipo="chat"):
+        """
+        Registra el uso devuelto por una llamada.
+
+        Args:
+            sesion_id: Identificador de la sesión (o None)
+            modelo: Nombre del modelo
+            uso: Campo `usage` de la respuesta de OpenAI (o None)
+            latencia_s: Duración de la llamada en segundos
+            tipo: Tipo de llamada ("chat", "plan", ...)
+
+        Returns:
+            Dict con el registro exportado
+        """
+        tokens_entrada = getattr(uso, "prompt_tokens", 0) or 0
+        tokens_salida = getattr(uso, "completion_tokens", 0) or 0
+        detalles = getattr(uso, "prompt_tokens_details", None)
+        # Con openai 1.10 los campos que el SDK no modela llegan como dict
+        if isinstance(detalles, dict):
+            tokens_cache = detalles.get("cached_tokens") or 0
+        else:
+            tokens_cache = getattr(detalles, "cached_tokens", 0) or 0
+        costo = costo_llamada(modelo, tokens_entrada, tokens_cache, tokens_salida)
+
+        registro = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "sesion": sesion_id,
+            "tipo": tipo,
+            "modelo": modelo,
+            "tokens_entrada": tokens_entrada,
+            "tokens_cache": tokens_cache,
+            "tokens_salida": tokens_salida,
+            "costo_usd": costo,
+            "latencia_s": round(latencia_s, 3),
+        }
+
+        with self._lock:
+            self._renovar_dia()
+            self.costo_dia_usd += costo
+            for acumulado in (self.total, self.sesiones.setdefault(sesion_id, _uso_vacio())):
+                acumulado["llamadas"] += 1
+                acumulado["tokens_entrada"] += tokens_entrada
+                acumulado["tokens_cache"] += tokens_cache
+                acumulado["tokens_salida"] += tokens_salida
+                acumulado["costo_usd"] += costo
+                acumulado["latencia_total_s"] += latencia_s
+            if self.archivo:
+                with open(self.archivo, "a", encoding="utf-8") as archivo:
+                    archivo.write(json.dumps(registro) + "\n")
+
+        return registro
+
+    def uso_sesion(self, sesion_id):
+        """Dict con el uso acumulado de una sesión."""
+        with self._lock:
+            return dict(self.sesiones.get(sesion_id, _uso_vacio()))
+
+    def uso_total(self):
+        """Dict con el uso acumulado global y el costo del día."""
+        with self._lock:
+            return {**self.total, "costo_dia_usd": self.costo_dia_usd}
+
+
+medidor = MedidorUso()
+
+
+def medir_llamada(cliente, sesion_id, tipo, **kwargs):
+    """
+    Envía un pedido de chat a OpenAI aplicando presupuestos y midiendo el uso.
+
+    Args:
+        cliente: Cliente de OpenAI
+        sesion_id: Identificador de la sesión (o None)
+        tipo: Tipo de llamada para las métricas
+        **kwargs: Argumentos de chat.completions.create
+
+    Returns:
+        Respuesta de OpenAI
+
+    Raises:
+        PresupuestoExcedido
+    """
+    medidor.verificar_presupuesto(sesion_id, kwargs["model"], kwargs["messages"], kwargs.get("max_tokens", 0))
+    inicio = time.perf_counter()
+    respuesta = cliente.chat.completions.create(**kwargs)
+    medidor.registrar(sesion_id, kwargs["model"], respuesta.usage, time.perf_counter() - inicio, tipo)
+    return respuesta
@@ -0,0 +1,129 @@
+"""
+Requerimientos de energía e hidratación por tramo para El Cruce Analyzer
+
+Calcula, para cada tramo entre oasis, los gramos de carbohidratos y los ml
+de líquido que conviene cargar según la pendiente, la duración y el peso.
+"""
+
+import numpy as np
+
+from utils.perfiles import factor_pendiente, grilla_tramos, pace_plano_equivalente
+
+# Límites de ingesta tolerables por hora de carrera
+CARBOHIDRATOS_MIN_G_H = 30
+CARBOHIDRATOS_MAX_G_H = 90
+LIQUIDO_MIN_ML_H = 300
+LIQUIDO_MAX_ML_H = 800
+
+
+def costo_energetico(pendiente_pct):
+    """
+    Costo energético de correr según la pendiente (Minetti et al., 2002).
+
+    Args:
+        pendiente_pct: Pendiente en % (escalar o array)
+
+    Returns:
+        Costo en J por kg y por metro recorrido
+    """
+    i = np.clip(np.asarray(pendiente_pct, dtype=np.float64) / 100, -0.45, 0.45)
+    return 155.4 * i ** 5 - 30.4 * i ** 4 - 43.3 * i ** 3 + 46.3 * i ** 2 + 19.5 * i + 3.6
+
+
+def tramos_oasis(etapa):
+    """
+    Nombres de los tramos entre el inicio, los oasis y la llegada.
+
+    Args:
+        etapa: Dict con datos de la etapa
+
+    Returns:
+        Lista de tuplas (nombre_tramo, km_fin)
+    """
+    puntos = [(o["nombre"], o["km"]) for o in etapa["oasis"]] + [(etapa["fin"], etapa["distancia_km"])]
+    desde = [etapa["inicio"]] + [nombre for nombre, _ in puntos[:-1]]
+    return [(f"{origen} → {nombre}", km) for origen, (nombre, km) in zip(desde, puntos)]
+
+
+def requerimientos_peloton(etapa, pesos_kg, paces_plano, fraccion_carbohidratos=0.6,
+                           reposicion_carbohidratos=0.75, sudor_ml_kcal=1.5,
+                           reposicion_liquido=0.7, paso_km=0.5):
+    """
+    Calcula energía, carbohidratos y líquido por tramo para muchos corredores.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        pesos_kg: Array con el peso de cada corredor
+        paces_plano: Array con el pace en plano de cada corredor (min/km)
+        fraccion_carbohidratos: Parte de la energía que sale de carbohidratos
+        reposicion_carbohidratos: Parte del gasto de carbohidratos a reponer
+        sudor_ml_kcal: Pérdida de sudor por kcal gastada
+        reposicion_liquido: Parte del sudor a reponer
+        paso_km: Resolución de la grilla de cálculo en km
+
+    Returns:
+        Dict con "tramos" (nombres) y arrays (corredores x tramos) de
+        "duracion_h", "kcal", "carbohidratos_g" y "liquido_ml"
+    """
+    pesos_kg = np.asarray(pesos_kg, dtype=np.float64)[:, None]
+    paces_plano = np.asarray(paces_plano, dtype=np.float64)[:, None]
+
+    inicios, fines, pendientes = grilla_tramos(etapa, paso_km)
+    metros = (fines - inicios) * 1000
+    equivalentes = (fines - inicios) * factor_pendiente(pendientes)
+
+    # Índice del primer segmento de cada tramo entre oasis
+    nombres = tramos_oasis(etapa)
+    limites = [0.0] + [km for _, km in nombres[:-1]]
+    primeros = np.searchsorted(inicios, limites)
+
+    duracion_h = np.add.reduceat(equivalentes[None, :] * paces_plano / 60, primeros, axis=1)
+    kcal = np.add.reduceat(
+        pesos_kg * (costo_energetico(pendientes) * metros / 4184)[None, :], primeros, axis=1
+    )
+
+    kcal_hora = kcal / duracion_h
+    carbohidratos_hora = np.clip(
+        kcal_hora * fraccion_carbohidratos / 4 * reposicion_carbohidratos,
+        CARBOHIDRATOS_MIN_G_H, CARBOHIDRATOS_MAX_G_H
+    )
+    liquido_hora = np.clip(
+        kcal_hora * sudor_ml_kcal * reposicion_liquido,
+        LIQUIDO_MIN_ML_H, LIQUIDO_MAX_ML_H
+    )
+
+    return {
+        "tramos": [nombre for nombre, _ in nombres],
+        "duracion_h": duracion_h,
+        "kcal": kcal,
+        "carbohidratos_g": carbohidratos_hora * duracion_h,
+        "liquido_ml": liquido_hora * duracion_h,
+    }
+
+
+def plan_hidratacion(etapa, peso_kg, pace_promedio):
+    """
+    Requerimientos por tramo para un solo corredor.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        peso_kg: Peso del corredor en kg
+        pace_promedio: Pace promedio de la etapa (min/km)
+
+    Returns:
+        Lista de dicts por tramo con "tramo", "km_fin", "duracion_h",
+        "kcal", "carbohidratos_g" y "liquido_ml"
+    """
+    pace_plano = pace_plano_equivalente(etapa, pace_promedio)
+    resultado = requerimientos_peloton(etapa, [peso_kg], [pace_plano])
+    return [
+        {
+            "tramo": nombre,
+            "km_fin": km,
+            "duracion_h": float(resultado["duracion_h"][0, i]),
+            "kcal": int(resultado["kcal"][0, i]),
+            "carbohidratos_g": int(round(resultado["carbohidratos_g"][0, i], -1)),
+            "liquido_ml": int(round(resultado["liquido_ml"][0, i], -1)),
+        }
+        for i, (nombre, km) in enumerate(tramos_oasis(etapa))
+    ]
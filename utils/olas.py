@@ -0,0 +1,193 @@
+"""
+Simulación de la largada en olas y congestión en senderos angostos
+
+Simulador de eventos discretos con una cola de prioridad (heapq): cada
+corredor avanza con su pace ajustado por pendiente y, en los tramos de
+sendero angosto, no puede entrar ni salir antes de que pase el de adelante
+más una separación mínima (la capacidad del sendero). El optimizador reparte
+a los corredores en olas para minimizar la demora total por colas.
+"""
+
+import heapq
+
+import numpy as np
+
+from utils.perfiles import km_equivalentes_en
+from utils.segmentacion import segmentar_perfil
+
+INTERVALO_OLAS_MIN = 10
+CORREDORES_POR_MINUTO = 6
+PENDIENTE_SENDERO_PCT = 5.0
+
+
+def secciones_angostas(etapa, pendiente_minima_pct=PENDIENTE_SENDERO_PCT):
+    """
+    Subidas de la etapa candidatas a sendero angosto.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        pendiente_minima_pct: Pendiente media mínima de la subida
+
+    Returns:
+        Lista de tuplas (km_inicio, km_fin)
+    """
+    return [
+        (s["km_inicio"], s["km_fin"])
+        for s in segmentar_perfil(etapa["perfil"])
+        if s["tipo"] == "subida" and s["pendiente_media"] >= pendiente_minima_pct
+    ]
+
+
+def simular_largada(etapa, paces_plano, olas, secciones, intervalo_min=INTERVALO_OLAS_MIN,
+                    corredores_por_minuto=CORREDORES_POR_MINUTO):
+    """
+    Simula una etapa con largada en olas y secciones de capacidad limitada.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        paces_plano: Array con el pace en plano de cada corredor (min/km)
+        olas: Array con la ola (0, 1, ...) de cada corredor
+        secciones: Lista de tuplas (km_inicio, km_fin) de sendero angosto
+        intervalo_min: Minutos entre olas
+        corredores_por_minuto: Capacidad de cada sección
+
+    Returns:
+        Dict con arrays por corredor "tiempo_min" (desde su largada) y
+        "demora_min", "demora_total_min", arrays por sección
+        "demora_seccion_min" y "espera_maxima_min", y "eventos"
+    """
+    paces = np.asarray(paces_plano, dtype=np.float64)
+    olas = np.asarray(olas)
+    secciones = sorted(secciones)
+    if any(a[1] > b[0] for a, b in zip(secciones[:-1], secciones[1:])):
+        raise ValueError("Las secciones angostas no pueden superponerse")
+
+    # Km equivalentes en plano de la entrada y salida de cada sección y de la llegada
+    puntos = [km for seccion in secciones for km in seccion] + [etapa["distancia_km"]]
+    equivalentes = km_equivalentes_en(etapa["perfil"], puntos).tolist()
+    largadas = (olas * intervalo_min).astype(np.float64)
+    separacion = 1 / corredores_por_minuto
+
+    num_secciones = len(secciones)
+    ultima_entrada = [-np.inf] * num_secciones
+    ultima_salida = [-np.inf] * num_secciones
+    demora_seccion = [0.0] * num_secciones
+    espera_maxima = [0.0] * num_secciones
+    llegadas = np.empty(len(paces))
+    lista_paces = paces.tolist()
+
+    eventos = [(t, i, 0) for i, t in enumerate((largadas + equivalentes[0] * paces).tolist())]
+    heapq.heapify(eventos)
+    procesados = 0
+    while eventos:
+        t, i, k = heapq.heappop(eventos)
+        procesados += 1
+        if k == num_secciones:
+            llegadas[i] = t
+            continue
+        # Sendero angosto: orden de llegada, sin sobrepasos y con separación mínima
+        pace = lista_paces[i]
+        recorrido = (equivalentes[2 * k + 1] - equivalentes[2 * k]) * pace
+        entrada = max(t, ultima_entrada[k] + separacion)
+        salida = max(entrada + recorrido, ultima_salida[k] + separacion)
+        ultima_entrada[k] = entrada
+        ultima_salida[k] = salida
+        demora = salida - t - recorrido
+        demora_seccion[k] += demora
+        espera_maxima[k] = max(espera_maxima[k], demora)
+        heapq.heappush(eventos, (salida + (equivalentes[2 * k + 2] - equivalentes[2 * k + 1]) * pace, i, k + 1))
+
+    tiempo = llegadas - largadas
+    demora = tiempo - equivalentes[-1] * paces
+    return {
+        "tiempo_min": tiempo,
+        "demora_min": demora,
+        "demora_total_min": float(demora.sum()),
+        "demora_seccion_min": np.array(demora_seccion),
+        "espera_maxima_min": np.array(espera_maxima),
+        "eventos": procesados,
+    }
+
+
+def olas_por_cortes(orden, cortes):
+    """
+    Ola de cada corredor a partir de un orden y los cortes entre olas.
+
+    Args:
+        orden: Índices de los corredores en orden de largada
+        cortes: Posiciones en el orden donde empieza cada ola (y el total al final)
+
+    Returns:
+        Array con la ola de cada corredor
+    """
+    olas = np.empty(len(orden), dtype=np.int64)
+    for ola, (desde, hasta) in enumerate(zip(cortes[:-1], cortes[1:])):
+        olas[orden[desde:hasta]] = ola
+    return olas
+
+
+def optimizar_olas(etapa, paces_plano, num_olas, secciones, intervalo_min=INTERVALO_OLAS_MIN,
+                   corredores_por_minuto=CORREDORES_POR_MINUTO, max_evaluaciones=200):
+    """
+    Reparte a los corredores en olas minimizando la demora total por colas.
+
+    Prueba ordenar el pelotón de más rápido a más lento y al revés, con olas
+    del mismo tamaño, y luego mueve los cortes entre olas (búsqueda local
+    con paso decreciente) mientras baje la demora simulada.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        paces_plano: Array con el pace en plano de cada corredor (min/km)
+        num_olas: Cantidad de olas
+        secciones: Lista de tuplas (km_inicio, km_fin) de sendero angosto
+        intervalo_min: Minutos entre olas
+        corredores_por_minuto: Capacidad de cada sección
+        max_evaluaciones: Límite de simulaciones
+
+    Returns:
+        Dict con "olas" (array por corredor), "tamanos", "resultado" (de
+        simular_largada) y "evaluaciones"
+    """
+    paces = np.asarray(paces_plano, dtype=np.float64)
+    n = len(paces)
+    num_olas = max(1, min(num_olas, n))
+    evaluaciones = 0
+
+    def evaluar(orden, cortes):
+        nonlocal evaluaciones
+        evaluaciones += 1
+        return simular_largada(
+            etapa, paces, olas_por_cortes(orden, cortes), secciones, intervalo_min, corredores_por_minuto
+        )
+
+    iniciales = np.linspace(0, n, num_olas + 1).round().astype(np.int64)
+    rapidos_primero = np.argsort(paces, kind="stable")
+    opciones = [(rapidos_primero, evaluar(rapidos_primero, iniciales))]
+    opciones.append((rapidos_primero[::-1], evaluar(rapidos_primero[::-1], iniciales)))
+    orden, mejor = min(opciones, key=lambda o: o[1]["demora_total_min"])
+    cortes = iniciales
+
+    paso = max(n // (4 * num_olas), 1)
+    while paso >= 1 and evaluaciones < max_evaluaciones:
+        mejoro = False
+        for j in range(1, num_olas):
+            for delta in (-paso, paso):
+                candidatos = cortes.copy()
+                candidatos[j] += delta
+                if not candidatos[j - 1] < candidatos[j] < candidatos[j + 1]:
+                    continue
+                resultado = evaluar(orden, candidatos)
+                if resultado["demora_total_min"] < mejor["demora_total_min"] - 1e-9:
+                    cortes, mejor, mejoro = candidatos, resultado, True
+                    break
+            if evaluaciones >= max_evaluaciones:
+                break
+        if not mejoro:
+            paso //= 2
+
+    return {
+        "olas": olas_por_cortes(orden, cortes),
+        "tamanos": np.diff(cortes),
+        "resultado": mejor,
+        "evaluaciones": evaluaciones,
+    }
@@ -0,0 +1,205 @@
+"""
+Optimizador de plan de pace por tramos para El Cruce Analyzer
+
+Reparte un presupuesto de esfuerzo entre los tramos de las tres etapas para
+minimizar el tiempo total, respetando los cortes en cada oasis y con una
+fatiga que se arrastra de un día al siguiente. Se resuelve con programación
+dinámica sobre el esfuerzo consumido.
+"""
+
+import numpy as np
+
+from utils.calculadora import formato_tiempo
+from utils.cortes import barreras_corte
+from utils.perfiles import factor_pendiente, grilla_tramos
+
+# Intensidades posibles por tramo (1.0 = pace en plano base)
+INTENSIDADES = np.round(np.arange(0.80, 1.201, 0.025), 3)
+
+
+def optimizar_plan(etapas, pace_plano, presupuesto_pct=100, fatiga=0.15,
+                   recuperacion=0.6, tiempo_limite_min_km=15, paso_km=1.0, resolucion=400):
+    """
+    Calcula el pace objetivo de cada tramo que minimiza el tiempo total.
+
+    Args:
+        etapas: Lista de dicts con datos de etapas
+        pace_plano: Pace en plano a intensidad normal (min/km)
+        presupuesto_pct: Esfuerzo disponible; 100 equivale a correr todo a
+            intensidad 1.0
+        fatiga: Enlentecimiento por cada 100% de esfuerzo acumulado
+        recuperacion: Fracción del esfuerzo del día que se recupera de noche
+        tiempo_limite_min_km: Tiempo límite en min/km (default: 15)
+        paso_km: Largo máximo de cada tramo en km
+        resolucion: Número de niveles en que se discretiza el presupuesto
+
+    Returns:
+        Dict con "tramos" (lista de dicts) y "tiempo_total_min", o None si
+        ningún plan cumple los cortes con ese presupuesto
+    """
+    tramos = []
+    for i, etapa in enumerate(etapas):
+        inicios, fines, pendientes = grilla_tramos(etapa, paso_km)
+        limites = {b["km"]: (b["nombre"], b["limite_min"])
+                   for b in barreras_corte(etapa, tiempo_limite_min_km)}
+        for inicio, fin, pendiente in zip(inicios, fines, pendientes):
+            nombre, limite = limites.get(fin, (None, np.inf))
+            tramos.append({
+                "etapa": i,
+                "km_inicio": float(inicio),
+                "km_fin": float(fin),
+                "pendiente": float(pendiente),
+                "equivalente": float((fin - inicio) * factor_pendiente(pendiente)),
+                "punto": nombre,
+                "limite_min": limite,
+            })
+
+    referencia = sum(t["equivalente"] for t in tramos)
+    unidad = referencia * presupuesto_pct / 100 / resolucion
+    estados = np.arange(resolucion + 1)
+
+    # total[u]: menor tiempo total habiendo gastado u unidades de esfuerzo.
+    # Cada estado arrastra el tiempo al inicio de la etapa (para los cortes),
+    # el esfuerzo ya recuperado y el gastado al empezar el día.
+    total = np.full(resolucion + 1, np.inf)
+    total[0] = 0.0
+    inicio_etapa = np.zeros(resolucion + 1)
+    recuperado = np.zeros(resolucion + 1)
+    usado_inicio_dia = np.zeros(resolucion + 1)
+    elecciones = []
+
+    for j, tramo in enumerate(tramos):
+        if j > 0 and tramo["etapa"] != tramos[j - 1]["etapa"]:
+            # Noche en el campamento: se recupera parte del esfuerzo del día
+            recuperado = recuperado + recuperacion * (estados - usado_inicio_dia)
+            usado_inicio_dia = estados.astype(np.float64)
+            inicio_etapa = np.where(np.isfinite(total), total, 0.0)
+
+        carga = np.maximum(estados - recuperado, 0) * unidad / referencia
+        factor_fatiga = 1 + fatiga * carga
+
+        nuevo_total = np.full(resolucion + 1, np.inf)
+        nuevo_inicio = np.zeros(resolucion + 1)
+        nuevo_recuperado = np.zeros(resolucion + 1)
+        nuevo_inicio_dia = np.zeros(resolucion + 1)
+        eleccion = np.full((resolucion + 1, 2), -1, dtype=np.int64)
+
+        for k, intensidad in enumerate(INTENSIDADES):
+            costo = _costo(tramo, k, unidad)
+            if costo > resolucion:
+                continue
+            origen = estados[:resolucion + 1 - costo]
+            candidato = total[origen] + tramo["equivalente"] * pace_plano * factor_fatiga[origen] / intensidad
+            # Corte en el oasis o la llegada al final del tramo
+            candidato[candidato - inicio_etapa[origen] > tramo["limite_min"]] = np.inf
+            destino = origen + costo
+            mejora = candidato < nuevo_total[destino]
+            nuevo_total[destino[mejora]] = candidato[mejora]
+            nuevo_inicio[destino[mejora]] = inicio_etapa[origen[mejora]]
+            nuevo_recuperado[destino[mejora]] = recuperado[origen[mejora]]
+            nuevo_inicio_dia[destino[mejora]] = usado_inicio_dia[origen[mejora]]
+            eleccion[destino[mejora]] = np.column_stack((origen[mejora], np.full(mejora.sum(), k)))
+
+        total, inicio_etapa, recuperado, usado_inicio_dia = (
+            nuevo_total, nuevo_inicio, nuevo_recuperado, nuevo_inicio_dia
+        )
+        elecciones.append(eleccion)
+
+    if not np.isfinite(total).any():
+        return None
+
+    # Reconstruir el plan desde el mejor estado final
+    estado = int(np.argmin(total))
+    niveles = []
+    for eleccion in reversed(elecciones):
+        estado, k = eleccion[estado]
+        niveles.append(k)
+    niveles.reverse()
+
+    plan = _armar_plan(tramos, niveles, pace_plano, fatiga, recuperacion, referencia, unidad)
+    # Cada estado guarda un solo camino: se verifica el plan rearmado
+    if any(t["tiempo_etapa_min"] > t["limite_min"] + 1e-6 for t in plan["tramos"]):
+        return None
+    return plan
+
+
+def _costo(tramo, k, unidad):
+    """Esfuerzo de un tramo a una intensidad, en unidades del presupuesto."""
+    return int(round(tramo["equivalente"] * INTENSIDADES[k] ** 3 / unidad))
+
+
+def _armar_plan(tramos, niveles, pace_plano, fatiga, recuperacion, referencia, unidad):
+    """
+    Recalcula tiempos y paces del plan elegido tramo a tramo.
+
+    El esfuerzo se cuenta en las mismas unidades redondeadas que la
+    programación dinámica, así los tiempos coinciden con los verificados
+    contra los cortes.
+    """
+    usado = 0
+    recuperado = 0.0
+    usado_inicio_dia = 0
+    tiempo_etapa = 0.0
+    tiempo_total = 0.0
+    plan = []
+
+    for j, (tramo, k) in enumerate(zip(tramos, niveles)):
+        if j > 0 and tramo["etapa"] != tramos[j - 1]["etapa"]:
+            recuperado += recuperacion * (usado - usado_inicio_dia)
+            usado_inicio_dia = usado
+            tiempo_etapa = 0.0
+
+        intensidad = INTENSIDADES[k]
+        factor_fatiga = 1 + fatiga * max(usado - recuperado, 0) * unidad / referencia
+        tiempo = tramo["equivalente"] * pace_plano * factor_fatiga / intensidad
+        tiempo_etapa += tiempo
+        tiempo_total += tiempo
+        usado += _costo(tramo, k, unidad)
+
+        plan.append({
+            **tramo,
+            "intensidad": float(intensidad),
+            "pace": tiempo / (tramo["km_fin"] - tramo["km_inicio"]),
+            "tiempo_min": tiempo,
+            "tiempo_etapa_min": tiempo_etapa,
+        })
+
+    return {"tramos": plan, "tiempo_total_min": tiempo_total}
+
+
+def tarjeta_parciales(plan, etapas):
+    """
+    Arma una tarjeta de parciales imprimible en Markdown.
+
+    Args:
+        plan: Resultado de optimizar_plan()
+        etapas: Lista de dicts con datos de etapas
+
+    Returns:
+        String en Markdown con una tabla por etapa
+    """
+    lineas = ["# Plan de pace - El Cruce", ""]
+
+    for i, etapa in enumerate(etapas):
+        tramos = [t for t in plan["tramos"] if t["etapa"] == i]
+        lineas.append(f"## {etapa['nombre']} ({etapa['distancia_km']} km)")
+        lineas.append("")
+        lineas.append("| Km | Pendiente | Pace objetivo | Parcial | Punto | Corte |")
+        lineas.append("|---|---|---|---|---|---|")
+        for t in tramos:
+            pace_min = int(t["pace"])
+            pace_seg = int(round((t["pace"] - pace_min) * 60))
+            if pace_seg == 60:
+                pace_min, pace_seg = pace_min + 1, 0
+            corte = formato_tiempo(t["limite_min"] / 60) if t["punto"] else ""
+            lineas.append(
+                f"| {t['km_inicio']:g}-{t['km_fin']:g} | {t['pendiente']:+.0f}% "
+                f"| {pace_min}:{pace_seg:02d} min/km | {formato_tiempo(t['tiempo_etapa_min'] / 60)} "
+                f"| {t['punto'] or ''} | {corte} |"
+            )
+        lineas.append("")
+        lineas.append(f"**Tiempo de etapa:** {formato_tiempo(tramos[-1]['tiempo_etapa_min'] / 60)}")
+        lineas.append("")
+
+    lineas.append(f"**Tiempo total:** {formato_tiempo(plan['tiempo_total_min'] / 60)}")
+    return "\n".join(lineas)
@@ -0,0 +1,127 @@
+"""
+Distribución de pendientes y tiempo por banda para El Cruce Analyzer
+
+Cada tramo del perfil tiene pendiente constante, así que la distancia en
+cada banda es exacta a cualquier resolución del perfil (puntos oficiales
+cada 2 km o un track GPS).
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from utils.perfiles import factor_pendiente, perfil_a_arrays
+
+# Bordes por defecto en %, de las bandas de la estrategia de pace
+BORDES_PENDIENTE = (-10, -3, 3, 5, 10)
+NOMBRES_BANDAS = (
+    "Bajada técnica",
+    "Bajada moderada",
+    "Plano",
+    "Subida suave",
+    "Subida moderada",
+    "Subida pronunciada",
+)
+
+
+def etiquetas_bandas(bordes):
+    """
+    Etiquetas de las bandas definidas por una lista de bordes.
+
+    Args:
+        bordes: Bordes de las bandas en % (ordenados)
+
+    Returns:
+        Lista de strings, una más que bordes
+    """
+    bordes = [float(b) for b in bordes]
+    etiquetas = [f"< {bordes[0]:g}%"]
+    etiquetas += [f"{a:g}% a {b:g}%" for a, b in zip(bordes[:-1], bordes[1:])]
+    etiquetas.append(f"> {bordes[-1]:g}%")
+    if tuple(bordes) == BORDES_PENDIENTE:
+        etiquetas = [f"{nombre} ({e})" for nombre, e in zip(NOMBRES_BANDAS, etiquetas)]
+    return etiquetas
+
+
+def distribucion_pendientes(perfil, bordes=BORDES_PENDIENTE):
+    """
+    Distancia y distancia equivalente en plano en cada banda de pendiente.
+
+    Args:
+        perfil: Lista de tuplas (km, altitud)
+        bordes: Bordes de las bandas en % (ordenados)
+
+    Returns:
+        Tupla (distancias_km, km_equivalentes) de arrays, uno por banda
+    """
+    bordes = tuple(float(b) for b in bordes)
+    if any(b >= c for b, c in zip(bordes[:-1], bordes[1:])):
+        raise ValueError("Los bordes de las bandas deben ser crecientes")
+    return _distribucion(tuple(tuple(punto) for punto in perfil), bordes)
+
+
+@lru_cache(maxsize=256)
+def _distribucion(perfil, bordes):
+    kms, altitudes = perfil_a_arrays(perfil)
+    longitudes = np.diff(kms)
+    pendientes = np.diff(altitudes) / (longitudes * 1000) * 100
+    bandas = np.digitize(pendientes, bordes)
+    distancias = np.bincount(bandas, weights=longitudes, minlength=len(bordes) + 1)
+    equivalentes = np.bincount(
+        bandas, weights=longitudes * factor_pendiente(pendientes), minlength=len(bordes) + 1
+    )
+    distancias.setflags(write=False)
+    equivalentes.setflags(write=False)
+    return distancias, equivalentes
+
+
+def tiempo_en_bandas(etapa, pace_plano, bordes=BORDES_PENDIENTE):
+    """
+    Distancia y tiempo previsto en cada banda de pendiente de una etapa.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        pace_plano: Pace en terreno plano (min/km)
+        bordes: Bordes de las bandas en % (ordenados)
+
+    Returns:
+        Lista de dicts con "banda", "distancia_km", "porcentaje",
+        "tiempo_min" y "pace_min_km"
+    """
+    distancias, equivalentes = distribucion_pendientes(etapa["perfil"], bordes)
+    tiempos = equivalentes * pace_plano
+    total = distancias.sum()
+    return [
+        {
+            "banda": etiqueta,
+            "distancia_km": float(distancia),
+            "porcentaje": float(distancia / total * 100),
+            "tiempo_min": float(tiempo),
+            "pace_min_km": float(tiempo / distancia) if distancia > 0 else None,
+        }
+        for etiqueta, distancia, tiempo in zip(etiquetas_bandas(bordes), distancias, tiempos)
+    ]
+
+
+def histograma_pendientes(perfil, ancho_pct=1.0):
+    """
+    Histograma de distancia por pendiente con bins de ancho fijo.
+
+    Args:
+        perfil: Lista de tuplas (km, altitud)
+        ancho_pct: Ancho de cada bin en %
+
+    Returns:
+        Tupla (centros_pct, distancias_km) de arrays
+    """
+    kms, altitudes = perfil_a_arrays(perfil)
+    pendientes = np.diff(altitudes) / (np.diff(kms) * 1000) * 100
+    desde = np.floor(pendientes.min() / ancho_pct) * ancho_pct
+    # Con pendiente constante en un múltiplo del ancho igual queda un bin
+    hasta = max(np.ceil(pendientes.max() / ancho_pct) * ancho_pct, desde + ancho_pct)
+    bordes = np.arange(desde, hasta + ancho_pct / 2, ancho_pct)
+    distancias, _ = distribucion_pendientes(perfil, bordes)
+    # Las bandas abiertas de los extremos quedan vacías salvo el máximo exacto
+    distancias = distancias[1:].copy()
+    distancias[-2] += distancias[-1]
+    return bordes[:-1] + ancho_pct / 2, distancias[:-1]
@@ -0,0 +1,194 @@
+"""
+Motor de perfiles de altimetría para El Cruce Analyzer
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+def perfil_a_arrays(perfil):
+    """
+    Convierte un perfil de lista de tuplas a arrays de numpy.
+
+    Args:
+        perfil: Lista de tuplas (km, altitud)
+
+    Returns:
+        Tupla (kms, altitudes) de arrays float64
+    """
+    return _perfil_a_arrays(tuple(tuple(punto) for punto in perfil))
+
+
+@lru_cache(maxsize=256)
+def _perfil_a_arrays(perfil):
+    datos = np.asarray(perfil, dtype=np.float64)
+    kms = datos[:, 0].copy()
+    altitudes = datos[:, 1].copy()
+    kms.setflags(write=False)
+    altitudes.setflags(write=False)
+    return kms, altitudes
+
+
+def interpolar_altitudes(perfil, kms_objetivo):
+    """
+    Interpola la altitud en muchos kilómetros a la vez.
+
+    Args:
+        perfil: Lista de tuplas (km, altitud)
+        kms_objetivo: Array o lista de kilómetros
+
+    Returns:
+        Array de altitudes interpoladas
+    """
+    kms, altitudes = perfil_a_arrays(perfil)
+    return np.interp(np.asarray(kms_objetivo, dtype=np.float64), kms, altitudes)
+
+
+def pendientes_perfil(perfil):
+    """
+    Calcula la pendiente de cada tramo del perfil.
+
+    Args:
+        perfil: Lista de tuplas (km, altitud)
+
+    Returns:
+        Array de pendientes en % (uno menos que puntos del perfil)
+    """
+    kms, altitudes = perfil_a_arrays(perfil)
+    return np.diff(altitudes) / (np.diff(kms) * 1000) * 100
+
+
+def factor_pendiente(pendiente_pct):
+    """
+    Factor multiplicador del pace según la pendiente del terreno.
+
+    Vale 1.0 en plano, ~1.5 al 10% de subida y tiene su mínimo cerca
+    del -10%; las bajadas más empinadas vuelven a ser lentas.
+
+    Args:
+        pendiente_pct: Pendiente en % (escalar o array)
+
+    Returns:
+        Factor (mismo formato que la entrada)
+    """
+    g = np.asarray(pendiente_pct, dtype=np.float64)
+    factor = 1 + 0.033 * g + 0.0017 * g ** 2
+    return np.maximum(factor, 0.8)
+
+
+def km_equivalentes(perfil):
+    """
+    Distancia equivalente en plano acumulada en cada punto del perfil.
+
+    Args:
+        perfil: Lista de tuplas (km, altitud)
+
+    Returns:
+        Array con los km equivalentes acumulados (empieza en 0)
+    """
+    return _km_equivalentes(tuple(tuple(punto) for punto in perfil))
+
+
+@lru_cache(maxsize=256)
+def _km_equivalentes(perfil):
+    kms, _ = _perfil_a_arrays(perfil)
+    tramos = np.diff(kms) * factor_pendiente(pendientes_perfil(perfil))
+    acumulado = np.concatenate(([0.0], np.cumsum(tramos)))
+    acumulado.setflags(write=False)
+    return acumulado
+
+
+def km_equivalentes_en(perfil, kms_objetivo):
+    """
+    Km equivalentes en plano acumulados hasta cada km objetivo.
+
+    Args:
+        perfil: Lista de tuplas (km, altitud)
+        kms_objetivo: Escalar o array de kilómetros
+
+    Returns:
+        Km equivalentes (mismo formato que la entrada)
+    """
+    kms, _ = perfil_a_arrays(perfil)
+    return np.interp(kms_objetivo, kms, km_equivalentes(perfil))
+
+
+def tiempo_hasta_km(perfil, kms_objetivo, pace_plano):
+    """
+    Tiempo estimado hasta uno o varios km ajustando el pace por pendiente.
+
+    Args:
+        perfil: Lista de tuplas (km, altitud)
+        kms_objetivo: Escalar o array de kilómetros
+        pace_plano: Pace en terreno plano (min/km), escalar o array
+
+    Returns:
+        Tiempo en minutos
+    """
+    return km_equivalentes_en(perfil, kms_objetivo) * pace_plano
+
+
+def pace_plano_equivalente(etapa, pace_promedio):
+    """
+    Convierte un pace promedio de etapa a su pace equivalente en plano.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        pace_promedio: Pace promedio sobre toda la etapa (min/km)
+
+    Returns:
+        Pace en plano (min/km)
+    """
+    total_equivalente = km_equivalentes_en(etapa["perfil"], etapa["distancia_km"])
+    return pace_promedio * etapa["distancia_km"] / total_equivalente
+
+
+def grilla_tramos(etapa, paso_km=1.0):
+    """
+    Divide una etapa en tramos cortando también en cada oasis.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        paso_km: Largo máximo de cada tramo en km
+
+    Returns:
+        Tupla (inicios, fines, pendientes) de arrays
+    """
+    cortes = np.arange(0, etapa["distancia_km"], paso_km)
+    cortes = np.union1d(cortes, [o["km"] for o in etapa["oasis"]] + [etapa["distancia_km"]])
+    altitudes = interpolar_altitudes(etapa["perfil"], cortes)
+    pendientes = np.diff(altitudes) / (np.diff(cortes) * 1000) * 100
+    return cortes[:-1], cortes[1:], pendientes
+
+
+def remuestrear_perfiles(perfiles, paso_km=0.1, normalizado=False, puntos=201):
+    """
+    Lleva varios perfiles a una misma grilla de distancia.
+
+    Args:
+        perfiles: Lista de perfiles (listas de tuplas (km, altitud))
+        paso_km: Paso de la grilla en km (si no es normalizado)
+        normalizado: Si es True la grilla va de 0 a 100% del recorrido
+        puntos: Cantidad de puntos de la grilla normalizada
+
+    Returns:
+        Tupla (grilla, altitudes): grilla 1D en km o en %, y array 2D
+        (perfiles x grilla); fuera del largo de cada perfil vale NaN
+    """
+    arrays = [perfil_a_arrays(perfil) for perfil in perfiles]
+
+    if normalizado:
+        grilla = np.linspace(0, 100, puntos)
+        altitudes = np.vstack([
+            np.interp(grilla, (kms - kms[0]) / (kms[-1] - kms[0]) * 100, alts)
+            for kms, alts in arrays
+        ])
+        return grilla, altitudes
+
+    largo = max(kms[-1] for kms, _ in arrays)
+    grilla = np.arange(0, largo + paso_km / 2, paso_km)
+    altitudes = np.vstack([
+        np.interp(grilla, kms, alts, right=np.nan) for kms, alts in arrays
+    ])
+    return grilla, altitudes
@@ -0,0 +1,338 @@
+"""
+Planes de entrenamiento estructurados por semana para El Cruce Analyzer
+
+Cada semana se define por cuántas faltan para la carrera, el nivel y el pace
+objetivo: de eso salen la fase y el volumen (calculados acá, sin IA) y el
+detalle de sesiones que pide el asistente en JSON. Las semanas se guardan en
+caché con esa clave, así cambiar la cantidad de semanas sólo genera las que
+se agregan y el resto del plan se reutiliza. El plan se exporta como tabla,
+CSV o calendario ICS.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+# Volumen semanal de referencia por nivel (km, desnivel positivo en m)
+VOLUMEN_NIVEL = {
+    "Principiante": (30, 800),
+    "Intermedio": (45, 1500),
+    "Avanzado": (60, 2200),
+}
+
+# Fases según las semanas que faltan: (hasta_semanas, nombre, factor_km, factor_desnivel)
+FASES = [
+    (2, "Afinamiento", 0.55, 0.45),
+    (6, "Específico", 1.0, 1.25),
+    (12, "Construcción", 0.85, 0.9),
+    (None, "Base", 0.7, 0.6),
+]
+FACTOR_DESCARGA = 0.7
+SEMANAS_POR_LLAMADA = 6
+TAMANO_CACHE = 2000
+# Cambiar al modificar el prompt o el formato invalida las semanas guardadas
+VERSION_PLAN = 1
+
+_SEMANAS = OrderedDict()
+_lock = threading.Lock()
+
+
+def _nivel_base(nivel):
+    return next((clave for clave in VOLUMEN_NIVEL if nivel.startswith(clave)), "Intermedio")
+
+
+def especificacion_semana(semanas_restantes, nivel):
+    """
+    Fase y volumen objetivo de una semana.
+
+    Args:
+        semanas_restantes: Semanas que faltan para la carrera (1 = semana de carrera)
+        nivel: Nivel del corredor (texto que empieza con Principiante,
+            Intermedio o Avanzado)
+
+    Returns:
+        Dict con "semanas_restantes", "fase", "descarga", "km" y "desnivel_m"
+    """
+    km, desnivel = VOLUMEN_NIVEL[_nivel_base(nivel)]
+    _, fase, factor_km, factor_desnivel = next(
+        f for f in FASES if f[0] is None or semanas_restantes <= f[0]
+    )
+    # Una semana de descarga cada cuatro, fuera del afinamiento
+    descarga = semanas_restantes > 2 and semanas_restantes % 4 == 0
+    if descarga:
+        factor_km *= FACTOR_DESCARGA
+        factor_desnivel *= FACTOR_DESCARGA
+    return {
+        "semanas_restantes": semanas_restantes,
+        "fase": fase,
+        "descarga": descarga,
+        "km": int(round(km * factor_km, -1)),
+        "desnivel_m": int(round(desnivel * factor_desnivel, -2)),
+    }
+
+
+def clave_semana(semanas_restantes, nivel, pace_objetivo, modelo):
+    """
+    Clave de caché de una semana a partir de todo lo que cambia su contenido.
+
+    Args:
+        semanas_restantes: Semanas que faltan para la carrera
+        nivel: Nivel del corredor
+        pace_objetivo: Pace objetivo en min/km
+        modelo: Modelo que genera el detalle
+
+    Returns:
+        String hexadecimal
+    """
+    datos = repr((VERSION_PLAN, semanas_restantes, nivel, round(float(pace_objetivo), 2), modelo))
+    return hashlib.blake2b(datos.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def semana_en_cache(clave):
+    """Semana guardada para una clave, o None."""
+    with _lock:
+        semana = _SEMANAS.get(clave)
+        if semana is not None:
+            _SEMANAS.move_to_end(clave)
+        return semana
+
+
+def guardar_semana(clave, semana):
+    """Guarda una semana y descarta las usadas hace más tiempo."""
+    with _lock:
+        _SEMANAS[clave] = semana
+        _SEMANAS.move_to_end(clave)
+        while len(_SEMANAS) > TAMANO_CACHE:
+            _SEMANAS.popitem(last=False)
+
+
+def prompt_semanas(especificaciones, nivel, pace_objetivo):
+    """
+    Pedido de detalle en JSON para varias semanas.
+
+    Args:
+        especificaciones: Lista de dicts de especificacion_semana()
+        nivel: Nivel del corredor
+        pace_objetivo: Pace objetivo en min/km
+
+    Returns:
+        Texto del prompt
+    """
+    lineas = [
+        f"- Faltan {e['semanas_restantes']} semanas: fase {e['fase']}"
+        + (" (semana de descarga)" if e["descarga"] else "")
+        + f", ~{e['km']} km y ~{e['desnivel_m']} m de desnivel positivo en la semana"
+        for e in especificaciones
+    ]
+    return f"""Detalla semanas de un plan de entrenamiento para El Cruce Saucony 2025.
+
+Perfil del corredor:
+- Nivel actual: {nivel}
+- Objetivo de pace: {pace_objetivo} min/km
+- Etapas a completar: 3 días consecutivos, ~93km totales, +4,400m desnivel
+
+Semanas a detallar (respeta la fase y el volumen indicados):
+{chr(10).join(lineas)}
+
+Trabaja resistencia aeróbica, fuerza en piernas, técnica de subida/bajada y adaptación al desnivel acumulado.
+La semana en que falta 1 es la de la carrera.
+
+Responde sólo un objeto JSON con esta forma:
+{{"semanas": [{{"semanas_restantes": 8, "objetivo": "...", "punto_clave": "...",
+"sesiones": [{{"dia": "Lunes", "tipo": "Rodaje suave", "duracion_min": 50, "desnivel_m": 200, "descripcion": "..."}}]}}]}}
+
+Usa días de {", ".join(DIAS)}; los días sin sesión son descanso y no se listan."""
+
+
+def _entero(valor):
+    try:
+        return max(int(round(float(valor))), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parsear_semanas(texto, especificaciones):
+    """
+    Convierte la respuesta JSON del modelo en semanas validadas.
+
+    Args:
+        texto: Contenido de la respuesta
+        especificaciones: Lista de dicts de especificacion_semana() pedidos
+
+    Returns:
+        Dict {semanas_restantes: semana} con las semanas válidas; cada semana
+        tiene la especificación más "objetivo", "punto_clave" y "sesiones"
+
+    Raises:
+        ValueError: Si la respuesta no es un objeto JSON
+    """
+    datos = json.loads(texto)
+    if not isinstance(datos, dict):
+        raise ValueError("La respuesta no es un objeto JSON")
+    pedidas = {e["semanas_restantes"]: e for e in especificaciones}
+    semanas = {}
+    for semana in datos.get("semanas") or []:
+        if not isinstance(semana, dict):
+            continue
+        restantes = _entero(semana.get("semanas_restantes"))
+        if restantes not in pedidas or not isinstance(semana.get("sesiones"), list):
+            continue
+        sesiones = [
+            {
+                "dia": s["dia"],
+                "tipo": str(s.get("tipo", "")).strip() or "Entrenamiento",
+                "duracion_min": _entero(s.get("duracion_min")),
+                "desnivel_m": _entero(s.get("desnivel_m")),
+                "descripcion": str(s.get("descripcion", "")).strip(),
+            }
+            for s in semana["sesiones"]
+            if isinstance(s, dict) and s.get("dia") in DIAS
+        ]
+        semanas[restantes] = {
+            **pedidas[restantes],
+            "objetivo": str(semana.get("objetivo", "")).strip(),
+            "punto_clave": str(semana.get("punto_clave", "")).strip(),
+            "sesiones": sorted(sesiones, key=lambda s: DIAS.index(s["dia"])),
+        }
+    return semanas
+
+
+def inicio_semana(fecha_carrera, semanas_restantes):
+    """Lunes de una semana del plan (la última es la semana de la carrera)."""
+    lunes_carrera = fecha_carrera - timedelta(days=fecha_carrera.weekday())
+    return lunes_carrera - timedelta(weeks=semanas_restantes - 1)
+
+
+def numero_semana(semana, semanas_totales):
+    """
+    Número de una semana dentro del plan pedido (1 = la primera).
+
+    Se calcula con las semanas que faltan para la carrera, así el número no
+    cambia aunque falten semanas anteriores en el plan.
+
+    Args:
+        semana: Dict de la semana (con "semanas_restantes")
+        semanas_totales: Semanas pedidas para el plan
+
+    Returns:
+        Número de semana
+    """
+    return semanas_totales - semana["semanas_restantes"] + 1
+
+
+def _semanas_totales(plan, semanas_totales):
+    if semanas_totales is not None:
+        return semanas_totales
+    return max((semana["semanas_restantes"] for semana in plan), default=0)
+
+
+def plan_a_tabla(plan, fecha_carrera=None, semanas_totales=None):
+    """
+    Una fila por sesión del plan.
+
+    Args:
+        plan: Lista de semanas (de la primera a la semana de carrera)
+        fecha_carrera: Fecha de la primera etapa (opcional, agrega fechas)
+        semanas_totales: Semanas pedidas para el plan (por defecto, las de
+            la semana más lejana a la carrera)
+
+    Returns:
+        DataFrame con semana, fecha, dia, fase, tipo, duracion_min,
+        desnivel_m y descripcion
+    """
+    semanas_totales = _semanas_totales(plan, semanas_totales)
+    filas = []
+    for semana in plan:
+        numero = numero_semana(semana, semanas_totales)
+        for sesion in semana["sesiones"]:
+            fecha = None
+            if fecha_carrera is not None:
+                fecha = inicio_semana(fecha_carrera, semana["semanas_restantes"]) + timedelta(
+                    days=DIAS.index(sesion["dia"])
+                )
+            filas.append({"semana": numero, "fecha": fecha, "dia": sesion["dia"], "fase": semana["fase"],
+                          **{c: sesion[c] for c in ("tipo", "duracion_min", "desnivel_m", "descripcion")}})
+    columnas = ["semana", "fecha", "dia", "fase", "tipo", "duracion_min", "desnivel_m", "descripcion"]
+    return pd.DataFrame(filas, columns=columnas)
+
+
+def plan_a_markdown(plan, semanas_totales=None):
+    """
+    Texto Markdown del plan, una sección por semana.
+
+    Args:
+        plan: Lista de semanas
+        semanas_totales: Semanas pedidas para el plan (ver plan_a_tabla)
+
+    Returns:
+        String Markdown
+    """
+    semanas_totales = _semanas_totales(plan, semanas_totales)
+    partes = []
+    for semana in plan:
+        titulo = f"## Semana {numero_semana(semana, semanas_totales)} · {semana['fase']}" + (" (descarga)" if semana["descarga"] else "")
+        partes.append(titulo)
+        partes.append(f"**Objetivo:** {semana['objetivo']}  \n"
+                      f"**Volumen:** ~{semana['km']} km · +{semana['desnivel_m']} m  \n"
+                      f"**Punto clave:** {semana['punto_clave']}")
+        partes.extend(
+            f"- **{s['dia']}:** {s['tipo']} ({s['duracion_min']} min, +{s['desnivel_m']} m)"
+            + (f" — {s['descripcion']}" if s["descripcion"] else "")
+            for s in semana["sesiones"]
+        )
+        partes.append("")
+    return "\n\n".join(partes)
+
+
+def _escapar_ics(texto):
+    return texto.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _plegar_ics(linea):
+    # Las líneas de iCalendar no deben pasar de 75 octetos
+    bytes_ = linea.encode("utf-8")
+    partes = []
+    while len(bytes_) > 75:
+        corte = 75 if not partes else 74
+        while (bytes_[corte] & 0xC0) == 0x80:  # No partir un carácter UTF-8
+            corte -= 1
+        partes.append(bytes_[:corte].decode("utf-8"))
+        bytes_ = bytes_[corte:]
+    partes.append(bytes_.decode("utf-8"))
+    return "\r\n ".join(partes)
+
+
+def plan_a_ics(tabla):
+    """
+    Calendario iCalendar con un evento de día completo por sesión.
+
+    Args:
+        tabla: DataFrame de plan_a_tabla() con fechas
+
+    Returns:
+        String .ics
+    """
+    marca = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lineas = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//El Cruce Analyzer//Plan de entrenamiento//ES",
+              "CALSCALE:GREGORIAN"]
+    for fila in tabla.itertuples(index=False):
+        fecha = fila.fecha if isinstance(fila.fecha, date) else pd.Timestamp(fila.fecha).date()
+        uid = hashlib.blake2b(f"{fecha}{fila.tipo}{fila.descripcion}".encode("utf-8"), digest_size=12).hexdigest()
+        lineas += [
+            "BEGIN:VEVENT",
+            f"UID:{uid}@elcruce-analyzer",
+            f"DTSTAMP:{marca}",
+            f"DTSTART;VALUE=DATE:{fecha:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{fecha + timedelta(days=1):%Y%m%d}",
+            f"SUMMARY:{_escapar_ics(f'{fila.tipo} ({fila.duracion_min} min, +{fila.desnivel_m} m)')}",
+            f"DESCRIPTION:{_escapar_ics(f'Semana {fila.semana} · {fila.fase}. {fila.descripcion}')}",
+            "END:VEVENT",
+        ]
+    lineas.append("END:VCALENDAR")
+    return "\r\n".join(_plegar_ics(linea) for linea in lineas) + "\r\n"
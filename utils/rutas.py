@@ -0,0 +1,119 @@
+"""
+Rutas GPS de las etapas para El Cruce Analyzer
+"""
+
+import io
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+
+from utils.cache_disco import cache
+
+# Carpeta con los tracks oficiales (etapa_1.gpx, etapa_2.gpx, ...)
+CARPETA_RUTAS = Path(__file__).parent.parent / "data" / "rutas"
+
+RADIO_TIERRA_KM = 6371.0
+
+
+def leer_gpx(archivo):
+    """
+    Lee los puntos de un track GPX sin cargar todo el árbol XML.
+
+    Args:
+        archivo: Ruta o archivo abierto en modo binario
+
+    Returns:
+        Tupla (lats, lons, altitudes) de arrays; altitud NaN si falta
+    """
+    lats, lons, altitudes = [], [], []
+    for _, elemento in ET.iterparse(archivo, events=("end",)):
+        etiqueta = elemento.tag.rsplit("}", 1)[-1]
+        if etiqueta in ("trkpt", "rtept"):
+            lats.append(float(elemento.get("lat")))
+            lons.append(float(elemento.get("lon")))
+            altitud = next((hijo.text for hijo in elemento if hijo.tag.endswith("ele")), None)
+            altitudes.append(float(altitud) if altitud else np.nan)
+            elemento.clear()
+    return np.array(lats), np.array(lons), np.array(altitudes)
+
+
+def distancias_acumuladas(lats, lons):
+    """
+    Distancia acumulada a lo largo de una ruta (fórmula de haversine).
+
+    Args:
+        lats: Array de latitudes en grados
+        lons: Array de longitudes en grados
+
+    Returns:
+        Array de km acumulados (empieza en 0)
+    """
+    lat = np.radians(lats)
+    lon = np.radians(lons)
+    a = (np.sin(np.diff(lat) / 2) ** 2
+         + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2)
+    tramos = 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(a))
+    return np.concatenate(([0.0], np.cumsum(tramos)))
+
+
+def rumbos(lats, lons):
+    """
+    Rumbo de cada tramo de la ruta.
+
+    Args:
+        lats: Array de latitudes en grados
+        lons: Array de longitudes en grados
+
+    Returns:
+        Array de rumbos en radianes (0 = norte, sentido horario)
+    """
+    lat = np.radians(lats)
+    dlon = np.radians(np.diff(lons))
+    x = np.sin(dlon) * np.cos(lat[1:])
+    y = np.cos(lat[:-1]) * np.sin(lat[1:]) - np.sin(lat[:-1]) * np.cos(lat[1:]) * np.cos(dlon)
+    return np.arctan2(x, y)
+
+
+def cargar_ruta_etapa(indice, distancia_km=None):
+    """
+    Carga el track GPX de una etapa si está disponible.
+
+    Args:
+        indice: Índice de la etapa (0, 1, 2...)
+        distancia_km: Distancia oficial; si se indica, los km del track se
+            escalan para coincidir con ella
+
+    Returns:
+        Dict con arrays "km", "lat", "lon" y "altitud", o None si no hay track
+    """
+    archivo = CARPETA_RUTAS / f"etapa_{indice + 1}.gpx"
+    if not archivo.exists():
+        return None
+    contenido = archivo.read_bytes()
+    ruta = cache.obtener_o_calcular(contenido, lambda: _procesar_gpx(contenido), "ruta")
+    if distancia_km:
+        ruta["km"] = ruta["km"] * distancia_km / ruta["km"][-1]
+    return ruta
+
+
+def _procesar_gpx(contenido):
+    lats, lons, altitudes = leer_gpx(io.BytesIO(contenido))
+    return {"km": distancias_acumuladas(lats, lons), "lat": lats, "lon": lons, "altitud": altitudes}
+
+
+def posiciones_en_km(ruta, kms_objetivo):
+    """
+    Interpola latitud y longitud en kilómetros de la ruta.
+
+    Args:
+        ruta: Dict devuelto por cargar_ruta_etapa()
+        kms_objetivo: Array de kilómetros
+
+    Returns:
+        Tupla (lats, lons) de arrays
+    """
+    return (
+        np.interp(kms_objetivo, ruta["km"], ruta["lat"]),
+        np.interp(kms_objetivo, ruta["km"], ruta["lon"]),
+    )
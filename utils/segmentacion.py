@@ -0,0 +1,231 @@
+"""
+Segmentación automática de perfiles en subidas, bajadas y tramos ondulados
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Umbrales por defecto
+REVERSION_M = 30
+DESNIVEL_MINIMO_M = 80
+PENDIENTE_MINIMA_PCT = 3.0
+VENTANA_KM = 0.2
+
+
+def segmentar_perfil(perfil, reversion_m=REVERSION_M, desnivel_minimo_m=DESNIVEL_MINIMO_M,
+                     pendiente_minima_pct=PENDIENTE_MINIMA_PCT, ventana_km=VENTANA_KM):
+    """
+    Divide un perfil en subidas, bajadas y tramos ondulados en tiempo lineal.
+
+    Los extremos se detectan con histéresis: una subida termina recién cuando
+    la altitud cae más de `reversion_m` desde el máximo alcanzado (y viceversa),
+    así el ruido de un GPS no corta los tramos.
+
+    Args:
+        perfil: Lista de tuplas (km, altitud), a cualquier resolución
+        reversion_m: Desnivel en contra que confirma un cambio de tendencia
+        desnivel_minimo_m: Desnivel mínimo para considerar subida o bajada
+        pendiente_minima_pct: Pendiente media mínima para subida o bajada
+        ventana_km: Distancia sobre la que se mide la pendiente máxima
+
+    Returns:
+        Lista de dicts con "tipo", "km_inicio", "km_fin", "longitud_km",
+        "altitud_inicio", "altitud_fin", "desnivel_positivo",
+        "desnivel_negativo", "pendiente_media" y "pendiente_maxima"
+    """
+    segmentos = _segmentar(
+        tuple(tuple(punto) for punto in perfil),
+        reversion_m, desnivel_minimo_m, pendiente_minima_pct, ventana_km
+    )
+    return [dict(s) for s in segmentos]
+
+
+@lru_cache(maxsize=128)
+def _segmentar(perfil, reversion_m, desnivel_minimo_m, pendiente_minima_pct, ventana_km):
+    datos = np.asarray(perfil, dtype=np.float64)
+    kms, altitudes = datos[:, 0], datos[:, 1]
+
+    # A resolución de GPS, suavizar el ruido con una media móvil de la ventana
+    if len(kms) > 1:
+        puntos_ventana = int(ventana_km / ((kms[-1] - kms[0]) / (len(kms) - 1)))
+        if puntos_ventana > 1:
+            altitudes = _media_movil(altitudes, puntos_ventana)
+
+    # Extremos con histéresis en una sola pasada
+    extremos = [0]
+    tendencia = 0
+    maximo = minimo = 0
+    for i in range(1, len(altitudes)):
+        altitud = altitudes[i]
+        if tendencia == 0:
+            # Todavía sin tendencia: esperar a que se aleje lo suficiente
+            maximo = i if altitud > altitudes[maximo] else maximo
+            minimo = i if altitud < altitudes[minimo] else minimo
+            if altitud - altitudes[minimo] >= reversion_m:
+                tendencia, maximo = 1, i
+                if minimo:
+                    extremos.append(minimo)
+            elif altitudes[maximo] - altitud >= reversion_m:
+                tendencia, minimo = -1, i
+                if maximo:
+                    extremos.append(maximo)
+        elif tendencia == 1:
+            if altitud >= altitudes[maximo]:
+                maximo = i
+            elif altitudes[maximo] - altitud >= reversion_m:
+                extremos.append(maximo)
+                tendencia, minimo = -1, i
+        else:
+            if altitud <= altitudes[minimo]:
+                minimo = i
+            elif altitud - altitudes[minimo] >= reversion_m:
+                extremos.append(minimo)
+                tendencia, maximo = 1, i
+    ultimo = maximo if tendencia == 1 else minimo if tendencia == -1 else None
+    if ultimo and ultimo != extremos[-1]:
+        extremos.append(ultimo)
+    if extremos[-1] != len(altitudes) - 1:
+        extremos.append(len(altitudes) - 1)
+
+    # Desniveles acumulados y pendientes sobre la ventana, para cada tramo
+    diferencias = np.diff(altitudes)
+    subida_acumulada = np.concatenate(([0.0], np.cumsum(np.maximum(diferencias, 0))))
+    bajada_acumulada = np.concatenate(([0.0], np.cumsum(np.maximum(-diferencias, 0))))
+    paso = max(ventana_km, np.min(np.diff(kms)) if len(kms) > 1 else ventana_km)
+    grilla = np.arange(kms[0], kms[-1] + paso / 2, paso)
+    pendientes_grilla = np.diff(np.interp(grilla, kms, altitudes)) / (paso * 1000) * 100
+
+    segmentos = []
+    for inicio, fin in zip(extremos[:-1], extremos[1:]):
+        km_inicio, km_fin = kms[inicio], kms[fin]
+        longitud = km_fin - km_inicio
+        if longitud <= 0:
+            continue
+        neto = altitudes[fin] - altitudes[inicio]
+        media = neto / (longitud * 1000) * 100
+        if abs(neto) >= desnivel_minimo_m and abs(media) >= pendiente_minima_pct:
+            tipo = "subida" if neto > 0 else "bajada"
+        else:
+            tipo = "ondulado"
+
+        # Unir tramos ondulados consecutivos
+        if tipo == "ondulado" and segmentos and segmentos[-1]["tipo"] == "ondulado":
+            inicio = segmentos.pop()["_indice_inicio"]
+            km_inicio = kms[inicio]
+            longitud = km_fin - km_inicio
+            media = (altitudes[fin] - altitudes[inicio]) / (longitud * 1000) * 100
+
+        desde = np.searchsorted(grilla, km_inicio, side="left")
+        hasta = max(np.searchsorted(grilla, km_fin, side="right") - 1, desde + 1)
+        ventana = pendientes_grilla[desde:hasta]
+        if len(ventana) == 0:
+            maxima = media
+        elif tipo == "bajada":
+            maxima = float(ventana.min())
+        elif tipo == "subida":
+            maxima = float(ventana.max())
+        else:
+            maxima = float(ventana[np.argmax(np.abs(ventana))])
+
+        segmentos.append({
+            "tipo": tipo,
+            "km_inicio": float(km_inicio),
+            "km_fin": float(km_fin),
+            "longitud_km": float(longitud),
+            "altitud_inicio": float(altitudes[inicio]),
+            "altitud_fin": float(altitudes[fin]),
+            "desnivel_positivo": float(subida_acumulada[fin] - subida_acumulada[inicio]),
+            "desnivel_negativo": float(bajada_acumulada[fin] - bajada_acumulada[inicio]),
+            "pendiente_media": float(media),
+            "pendiente_maxima": maxima,
+            "_indice_inicio": inicio,
+        })
+
+    for segmento in segmentos:
+        del segmento["_indice_inicio"]
+    return tuple(segmentos)
+
+
+def _media_movil(valores, ancho):
+    """Media móvil centrada de ancho fijo, repitiendo los extremos."""
+    relleno = np.pad(valores, (ancho // 2, ancho - 1 - ancho // 2), mode="edge")
+    acumulado = np.concatenate(([0.0], np.cumsum(relleno)))
+    return (acumulado[ancho:] - acumulado[:-ancho]) / ancho
+
+
+def describir_segmento(segmento):
+    """
+    Descripción corta de un segmento.
+
+    Args:
+        segmento: Dict devuelto por segmentar_perfil()
+
+    Returns:
+        String, por ejemplo "Subida km 0-12 (+800 m, 6.7% medio, máx 10%)"
+    """
+    tipo = segmento["tipo"].capitalize()
+    rango = f"km {round(segmento['km_inicio'], 1):g}-{round(segmento['km_fin'], 1):g}"
+    if segmento["tipo"] == "subida":
+        desnivel = f"+{segmento['desnivel_positivo']:.0f} m"
+    elif segmento["tipo"] == "bajada":
+        desnivel = f"-{segmento['desnivel_negativo']:.0f} m"
+    else:
+        desnivel = f"+{segmento['desnivel_positivo']:.0f}/-{segmento['desnivel_negativo']:.0f} m"
+    return (
+        f"{tipo} {rango} ({desnivel}, {segmento['pendiente_media']:.1f}% medio, "
+        f"máx {segmento['pendiente_maxima']:.0f}%)"
+    )
+
+
+def consejos_etapa(etapa, segmentos):
+    """
+    Genera consejos de carrera a partir de los segmentos de una etapa.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        segmentos: Lista devuelta por segmentar_perfil()
+
+    Returns:
+        Lista de strings en markdown
+    """
+    consejos = []
+    subidas = [s for s in segmentos if s["tipo"] == "subida"]
+    bajadas = [s for s in segmentos if s["tipo"] == "bajada"]
+    ondulados = [s for s in segmentos if s["tipo"] == "ondulado"]
+    oasis = etapa.get("oasis", [])
+
+    if subidas:
+        mayor = max(subidas, key=lambda s: s["desnivel_positivo"])
+        consejos.append(
+            f"La subida clave es del km {round(mayor['km_inicio'], 1):g} al {round(mayor['km_fin'], 1):g} "
+            f"(+{mayor['desnivel_positivo']:.0f} m hasta {mayor['altitud_fin']:.0f} m): "
+            "sal conservador y camina a paso firme en lo más empinado"
+        )
+        previos = [o for o in oasis if o["km"] <= mayor["km_inicio"]]
+        if previos:
+            consejos.append(
+                f"Carga bien en el {previos[-1]['nombre']} (km {previos[-1]['km']}) antes de esa subida"
+            )
+        elif mayor["km_inicio"] == 0:
+            consejos.append("La etapa arranca subiendo: entra en calor antes de la largada")
+
+    if bajadas:
+        mayor = max(bajadas, key=lambda s: s["desnivel_negativo"])
+        consejos.append(
+            f"Bajada larga del km {round(mayor['km_inicio'], 1):g} al {round(mayor['km_fin'], 1):g} "
+            f"(-{mayor['desnivel_negativo']:.0f} m, hasta {abs(mayor['pendiente_maxima']):.0f}%): "
+            "cuida las rodillas y aprovecha para recuperar tiempo con control"
+        )
+
+    km_ondulado = sum(s["longitud_km"] for s in ondulados)
+    if km_ondulado >= etapa["distancia_km"] * 0.3:
+        consejos.append(
+            f"{km_ondulado:.0f} km de terreno ondulado: ritmo constante, sin arranques en cada repecho"
+        )
+
+    ultimos = [s for s in segmentos if s["km_inicio"] >= etapa["distancia_km"] * 0.6]
+    if any(s["tipo"] == "subida" for s in ultimos):
+        consejos.append("Quedan subidas en el último tercio: reserva energía para el final")
+
+    return consejos
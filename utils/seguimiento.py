@@ -0,0 +1,364 @@
+"""
+Seguimiento en vivo de la carrera para El Cruce Analyzer
+
+Ingesta eventos de paso (alfombras de cronometraje y oasis) y mantiene
+actualizadas las horas estimadas de llegada de cada corredor.
+"""
+
+import json
+import math
+import os
+import socket
+
+import numpy as np
+
+from utils.cuantiles import EstadisticasPeloton
+from utils.emparejamiento_gps import EmparejadorGPS
+from utils.perfiles import km_equivalentes, km_equivalentes_en
+
+# Columnas de la caché de estimaciones (minutos desde la largada de la etapa,
+# salvo FIN_CARRERA que es el tiempo total acumulado de la carrera)
+ETA_PROXIMO_OASIS = 0
+ETA_FIN_ETAPA = 1
+ETA_FIN_CARRERA = 2
+
+
+class SeguidorCarrera:
+    """
+    Estado por corredor guardado en arrays compactos.
+
+    Cada evento actualiza una sola fila en O(1) y la marca como pendiente;
+    las estimaciones se recalculan sólo para las filas pendientes.
+    """
+
+    def __init__(self, etapas, capacidad=4096, pace_plano_inicial=9.0, rutas=None):
+        """
+        Args:
+            etapas: Lista de dicts con datos de etapas
+            capacidad: Número inicial de corredores reservados
+            pace_plano_inicial: Pace en plano supuesto antes del primer paso
+            rutas: Lista de tracks de cargar_ruta_etapa() por etapa (o None
+                donde falte); habilita los eventos de posición GPS
+        """
+        self.etapas = etapas
+        self.pace_plano_inicial = pace_plano_inicial
+        self.num_etapas = len(etapas)
+
+        # Datos precalculados por etapa
+        self._distancias = np.array([e["distancia_km"] for e in etapas], dtype=np.float64)
+        self._equivalentes_totales = np.array(
+            [km_equivalentes(e["perfil"])[-1] for e in etapas]
+        )
+        self._oasis_km = [np.array([o["km"] for o in e["oasis"]], dtype=np.float64) for e in etapas]
+        self._oasis_equivalentes = [
+            km_equivalentes_en(e["perfil"], km) for e, km in zip(etapas, self._oasis_km)
+        ]
+
+        # Proyección de posiciones GPS sobre el track de cada etapa
+        self._emparejadores = [
+            EmparejadorGPS(etapa, ruta) if ruta is not None else None
+            for etapa, ruta in zip(etapas, rutas or [None] * self.num_etapas)
+        ]
+        self.posiciones_descartadas = 0
+
+        # Distribución de tiempos de paso por oasis y categoría
+        self.estadisticas = EstadisticasPeloton(etapas)
+
+        self.indice = {}
+        self.n = 0
+        self.version = 0
+        self._pendientes = set()
+        self._reservar(capacidad)
+
+    def _reservar(self, capacidad):
+        """Crea o agranda los arrays de estado."""
+        viejo = self.n
+
+        def agrandar(nombre, forma, dtype, relleno):
+            nuevo = np.full(forma, relleno, dtype=dtype)
+            if hasattr(self, nombre):
+                nuevo[:viejo] = getattr(self, nombre)[:viejo]
+            setattr(self, nombre, nuevo)
+
+        agrandar("dorsales", capacidad, np.int32, 0)
+        agrandar("etapa", capacidad, np.int8, 0)
+        agrandar("km", capacidad, np.float32, 0.0)
+        agrandar("tiempo_min", capacidad, np.float32, 0.0)
+        agrandar("pace_plano", capacidad, np.float32, self.pace_plano_inicial)
+        agrandar("tiempos_etapa", (capacidad, self.num_etapas), np.float32, np.nan)
+        agrandar("proximo_oasis", capacidad, np.int8, -1)
+        agrandar("etas", (capacidad, 3), np.float32, np.nan)
+        self.capacidad = capacidad
+
+    def _fila(self, dorsal):
+        fila = self.indice.get(dorsal)
+        if fila is None:
+            if self.n == self.capacidad:
+                self._reservar(self.capacidad * 2)
+            fila = self.n
+            self.n += 1
+            self.indice[dorsal] = fila
+            self.dorsales[fila] = dorsal
+        return fila
+
+    def registrar_evento(self, evento):
+        """
+        Registra un evento de paso.
+
+        Args:
+            evento: Dict con "dorsal", "etapa" (1, 2, 3...), "km" y
+                "tiempo_s" (segundos desde la largada de la etapa); opcional
+                "categoria"
+
+        Raises:
+            ValueError: Si la etapa no existe o el km o el tiempo no son válidos
+            KeyError: Si falta algún campo
+        """
+        dorsal = int(evento["dorsal"])
+        etapa = int(evento["etapa"]) - 1
+        km = float(evento["km"])
+        tiempo_min = float(evento["tiempo_s"]) / 60
+        if not 0 <= etapa < self.num_etapas:
+            raise ValueError(f"Etapa inexistente: {evento['etapa']}")
+        if not (math.isfinite(km) and km >= 0 and math.isfinite(tiempo_min) and tiempo_min >= 0):
+            raise ValueError(f"Posición inválida: km {evento['km']}, tiempo {evento['tiempo_s']} s")
+        # La fila se crea recién con un evento válido: nunca queda un corredor sin estimaciones
+        primero = dorsal not in self.indice
+        fila = self._fila(dorsal)
+        km = min(km, self._distancias[etapa])
+
+        # Ignorar eventos atrasados o repetidos
+        if etapa < self.etapa[fila] or (etapa == self.etapa[fila] and km < self.km[fila]):
+            return
+
+        # Los pasos se interpolan sólo desde una posición observada en la etapa
+        sin_anterior = primero or etapa != self.etapa[fila]
+        self.estadisticas.registrar_avance(
+            dorsal, etapa,
+            None if sin_anterior else float(self.km[fila]),
+            None if sin_anterior else float(self.tiempo_min[fila]),
+            km, tiempo_min, evento.get("categoria")
+        )
+
+        self.etapa[fila] = etapa
+        self.km[fila] = km
+        self.tiempo_min[fila] = tiempo_min
+
+        equivalente = km_equivalentes_en(self.etapas[etapa]["perfil"], km)
+        if equivalente > 0:
+            self.pace_plano[fila] = tiempo_min / equivalente
+
+        if km >= self._distancias[etapa]:
+            self.tiempos_etapa[fila, etapa] = tiempo_min
+
+        self._pendientes.add(fila)
+        self.version += 1
+
+    def registrar_posiciones(self, etapa, dorsales, lats, lons, tiempos_s):
+        """
+        Proyecta un lote de posiciones GPS sobre el track y las registra como pasos.
+
+        Args:
+            etapa: Número de etapa (1, 2, 3...)
+            dorsales: Array de dorsales
+            lats: Array de latitudes
+            lons: Array de longitudes
+            tiempos_s: Array de segundos desde la largada de la etapa
+
+        Returns:
+            Número de posiciones sobre el recorrido
+        """
+        emparejador = self._emparejadores[etapa - 1]
+        if emparejador is None:
+            self.posiciones_descartadas += len(dorsales)
+            return 0
+        # El pace estimado de cada corredor ubica su primera posición en la etapa
+        paces = np.array([
+            self.pace_plano[self.indice[d]] if d in self.indice else self.pace_plano_inicial
+            for d in np.asarray(dorsales).tolist()
+        ], dtype=np.float64)
+        resultado = emparejador.procesar(dorsales, lats, lons, tiempos_s, paces)
+        validos = np.flatnonzero(resultado["valido"])
+        self.posiciones_descartadas += len(dorsales) - len(validos)
+
+        # Sólo la última posición de cada corredor cambia sus estimaciones
+        dorsales = np.asarray(dorsales)[validos]
+        tiempos = np.asarray(tiempos_s, dtype=np.float64)[validos]
+        orden = np.lexsort((tiempos, dorsales))
+        ultimas = orden[np.r_[dorsales[orden][1:] != dorsales[orden][:-1], True]] if len(orden) else orden
+        for i in ultimas:
+            self.registrar_evento({
+                "dorsal": dorsales[i], "etapa": etapa, "km": resultado["km"][validos[i]], "tiempo_s": tiempos[i]
+            })
+        return len(validos)
+
+    def procesar_lineas(self, lineas):
+        """
+        Registra eventos en formato JSON, uno por línea.
+
+        Los eventos con "lat" y "lon" en lugar de "km" son posiciones GPS:
+        se juntan y se proyectan por lotes al final.
+
+        Args:
+            lineas: Iterable de strings
+
+        Returns:
+            Número de eventos válidos registrados
+        """
+        registrados = 0
+        posiciones = {}
+        for linea in lineas:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                evento = json.loads(linea)
+                if "km" not in evento and "lat" in evento:
+                    posiciones.setdefault(int(evento["etapa"]), []).append(
+                        (int(evento["dorsal"]), float(evento["lat"]), float(evento["lon"]), float(evento["tiempo_s"]))
+                    )
+                    continue
+                self.registrar_evento(evento)
+                registrados += 1
+            except (ValueError, KeyError, IndexError, TypeError):
+                continue
+
+        for etapa, lote in posiciones.items():
+            if not 1 <= etapa <= self.num_etapas:
+                self.posiciones_descartadas += len(lote)
+                continue
+            dorsales, lats, lons, tiempos = (np.array(columna) for columna in zip(*lote))
+            registrados += self.registrar_posiciones(etapa, dorsales, lats, lons, tiempos)
+        return registrados
+
+    def actualizar_etas(self):
+        """
+        Recalcula las estimaciones sólo de los corredores con eventos nuevos.
+
+        Returns:
+            Número de corredores recalculados
+        """
+        if not self._pendientes:
+            return 0
+        filas = np.fromiter(self._pendientes, dtype=np.int64)
+        self._pendientes.clear()
+
+        for fila in filas:
+            etapa = self.etapa[fila]
+            pace = self.pace_plano[fila]
+            equivalente = km_equivalentes_en(self.etapas[etapa]["perfil"], self.km[fila])
+
+            # Próximo oasis por delante del corredor
+            oasis_km = self._oasis_km[etapa]
+            siguiente = int(np.searchsorted(oasis_km, self.km[fila], side="right"))
+            if siguiente < len(oasis_km):
+                self.proximo_oasis[fila] = siguiente
+                restante = self._oasis_equivalentes[etapa][siguiente] - equivalente
+                self.etas[fila, ETA_PROXIMO_OASIS] = self.tiempo_min[fila] + restante * pace
+            else:
+                self.proximo_oasis[fila] = -1
+                self.etas[fila, ETA_PROXIMO_OASIS] = np.nan
+
+            fin_etapa = self.tiempo_min[fila] + (self._equivalentes_totales[etapa] - equivalente) * pace
+            self.etas[fila, ETA_FIN_ETAPA] = fin_etapa
+
+            anteriores = np.nansum(self.tiempos_etapa[fila, :etapa])
+            siguientes = self._equivalentes_totales[etapa + 1:].sum() * pace
+            self.etas[fila, ETA_FIN_CARRERA] = anteriores + fin_etapa + siguientes
+
+        return len(filas)
+
+    def tablero(self):
+        """
+        Devuelve las columnas del tablero en vivo sin recalcular.
+
+        Returns:
+            Dict de arrays (vistas sobre el estado) con una fila por corredor
+        """
+        self.actualizar_etas()
+        n = self.n
+        return {
+            "dorsal": self.dorsales[:n],
+            "etapa": self.etapa[:n] + 1,
+            "km": self.km[:n],
+            "tiempo_min": self.tiempo_min[:n],
+            "proximo_oasis": self.proximo_oasis[:n],
+            "eta_proximo_oasis_min": self.etas[:n, ETA_PROXIMO_OASIS],
+            "eta_fin_etapa_min": self.etas[:n, ETA_FIN_ETAPA],
+            "eta_fin_carrera_min": self.etas[:n, ETA_FIN_CARRERA],
+        }
+
+    def nombre_proximo_oasis(self, fila):
+        """Nombre del próximo oasis de un corredor, o del final de la etapa."""
+        etapa = self.etapas[self.etapa[fila]]
+        indice = self.proximo_oasis[fila]
+        return etapa["oasis"][indice]["nombre"] if indice >= 0 else etapa["fin"]
+
+
+class _LectorLineas:
+    """Acumula texto recibido por partes y lo separa en líneas completas."""
+
+    _resto = ""
+
+    def _separar(self, datos):
+        lineas = (self._resto + datos).split("\n")
+        self._resto = lineas.pop()
+        return lineas
+
+
+class LectorArchivo(_LectorLineas):
+    """
+    Lee líneas nuevas de un archivo que crece (equivalente a `tail -f`).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.posicion = 0
+
+    def leer(self):
+        """
+        Returns:
+            Lista de líneas completas agregadas desde la última lectura
+        """
+        if not os.path.exists(self.ruta):
+            return []
+        if os.path.getsize(self.ruta) < self.posicion:
+            # El archivo fue truncado o rotado: empezar de nuevo
+            self.posicion = 0
+            self._resto = ""
+        with open(self.ruta, "r", encoding="utf-8") as archivo:
+            archivo.seek(self.posicion)
+            datos = archivo.read()
+            self.posicion = archivo.tell()
+        return self._separar(datos)
+
+
+class LectorSocket(_LectorLineas):
+    """
+    Lee líneas de un feed TCP de cronometraje sin bloquear.
+    """
+
+    def __init__(self, host, puerto, timeout=2.0):
+        self.host = host
+        self.puerto = puerto
+        self._socket = socket.create_connection((host, puerto), timeout=timeout)
+        self._socket.setblocking(False)
+
+    def leer(self):
+        """
+        Returns:
+            Lista de líneas completas recibidas desde la última lectura
+        """
+        partes = []
+        while True:
+            try:
+                datos = self._socket.recv(65536)
+            except BlockingIOError:
+                break
+            if not datos:
+                break
+            partes.append(datos.decode("utf-8", errors="replace"))
+        return self._separar("".join(partes))
+
+    def cerrar(self):
+        self._socket.close()
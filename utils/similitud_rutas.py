@@ -0,0 +1,262 @@
+"""
+Búsqueda de rutas de entrenamiento parecidas a un tramo de carrera
+
+Compara un tramo de una etapa (por ejemplo la subida de 12 km de la Etapa 1)
+con cada ventana del mismo largo de una biblioteca de rutas, usando Dynamic
+Time Warping con banda de Sakoe-Chiba sobre la altitud relativa o la
+pendiente. La cota inferior LB_Keogh descarta casi todas las ventanas sin
+calcular el DTW, que además se calcula en lotes vectorizados, y la
+biblioteca se reparte en un pool de procesos.
+"""
+
+import heapq
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.cache_disco import cache
+from utils.rutas import distancias_acumuladas, leer_gpx
+
+PUNTOS_SERIE = 64
+BANDA = 0.1
+PASO_VENTANA_KM = 0.25
+PASO_PERFIL_KM = 0.05
+TAMANO_LOTE_DTW = 32
+TIPOS_SERIE = ("altitud", "pendiente")
+
+
+def perfil_ruta(contenido, paso_km=PASO_PERFIL_KM):
+    """
+    Perfil de altimetría de una ruta GPX con paso fijo.
+
+    Args:
+        contenido: Bytes del archivo GPX
+        paso_km: Separación de los puntos del perfil en km
+
+    Returns:
+        Dict con arrays "km" y "altitud" (vacíos si la ruta no tiene altitudes)
+    """
+    lats, lons, altitudes = leer_gpx(io.BytesIO(contenido))
+    validos = ~np.isnan(altitudes)
+    if validos.sum() < 2:
+        return {"km": np.empty(0), "altitud": np.empty(0)}
+    kms = distancias_acumuladas(lats, lons)
+    grilla = np.append(np.arange(0, kms[-1], paso_km), kms[-1])
+    return {"km": grilla, "altitud": np.interp(grilla, kms[validos], altitudes[validos])}
+
+
+def _leer_ruta(archivo):
+    nombre, contenido = archivo
+    try:
+        perfil = cache.obtener_o_calcular(
+            contenido, lambda: perfil_ruta(contenido), "perfil_ruta", PASO_PERFIL_KM
+        )
+        return nombre, perfil["km"], perfil["altitud"], None
+    except Exception as e:  # Un archivo dañado no frena al resto
+        return nombre, None, None, str(e)
+
+
+def cargar_biblioteca(archivos, procesos=None):
+    """
+    Lee una biblioteca de rutas GPX en un pool de procesos.
+
+    Args:
+        archivos: Iterable de tuplas (nombre, bytes)
+        procesos: Cantidad de procesos (default: CPUs disponibles; 1 = sin pool)
+
+    Returns:
+        Tupla (rutas, errores): lista de tuplas (nombre, kms, altitudes) y
+        lista de tuplas (nombre, mensaje)
+    """
+    if procesos == 1:
+        resultados = list(map(_leer_ruta, archivos))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(_leer_ruta, archivos, chunksize=8))
+    rutas = [(nombre, kms, altitudes) for nombre, kms, altitudes, error in resultados if not error and len(kms)]
+    errores = [(nombre, error or "La ruta no tiene altitudes") for nombre, kms, _, error in resultados
+               if error or not len(kms)]
+    return rutas, errores
+
+
+def ventanas(kms, altitudes, km_inicios, largo_km, puntos=PUNTOS_SERIE, tipo="altitud"):
+    """
+    Series de puntos fijos de varias ventanas de una ruta.
+
+    Args:
+        kms: Array de km del perfil
+        altitudes: Array de altitudes del perfil
+        km_inicios: Array con el km de inicio de cada ventana
+        largo_km: Largo de las ventanas en km
+        puntos: Puntos por serie
+        tipo: "altitud" (relativa al inicio de la ventana) o "pendiente" (%)
+
+    Returns:
+        Array (ventanas x puntos)
+    """
+    grilla = np.asarray(km_inicios, dtype=np.float64)[:, None] + np.linspace(0, largo_km, puntos)[None, :]
+    serie = np.interp(grilla, kms, altitudes)
+    if tipo == "pendiente":
+        return np.gradient(serie, largo_km * 1000 / (puntos - 1), axis=1) * 100
+    return serie - serie[:, :1]
+
+
+def envolvente(serie, radio):
+    """
+    Envolvente superior e inferior de una serie para LB_Keogh.
+
+    Args:
+        serie: Array 1D
+        radio: Radio de la banda en puntos
+
+    Returns:
+        Tupla (superior, inferior)
+    """
+    deslizante = np.lib.stride_tricks.sliding_window_view(np.pad(serie, radio, mode="edge"), 2 * radio + 1)
+    return deslizante.max(axis=1), deslizante.min(axis=1)
+
+
+def lb_keogh(candidatas, superior, inferior):
+    """
+    Cota inferior de la distancia DTW de muchas series a la consulta.
+
+    Args:
+        candidatas: Array (series x puntos)
+        superior: Envolvente superior de la consulta
+        inferior: Envolvente inferior de la consulta
+
+    Returns:
+        Array de cotas, comparables con dtw_lote()
+    """
+    exceso = np.maximum(candidatas - superior, 0) + np.maximum(inferior - candidatas, 0)
+    return np.sqrt((exceso ** 2).sum(axis=1))
+
+
+def dtw_lote(consulta, candidatas, radio):
+    """
+    Distancia DTW con banda de Sakoe-Chiba de una consulta a muchas series.
+
+    El recorrido de la matriz es secuencial, pero cada celda se calcula a la
+    vez para todas las series del lote.
+
+    Args:
+        consulta: Array 1D de largo n
+        candidatas: Array (series x n)
+        radio: Radio de la banda en puntos
+
+    Returns:
+        Array de distancias (raíz de la suma de cuadrados del camino óptimo)
+    """
+    n = len(consulta)
+    costos = (consulta[None, :, None] - candidatas[:, None, :]) ** 2
+    acumulado = np.full((len(candidatas), n + 1, n + 1), np.inf)
+    acumulado[:, 0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(max(1, i - radio), min(n, i + radio) + 1):
+            acumulado[:, i, j] = costos[:, i - 1, j - 1] + np.minimum(
+                np.minimum(acumulado[:, i - 1, j], acumulado[:, i, j - 1]), acumulado[:, i - 1, j - 1]
+            )
+    return np.sqrt(acumulado[:, n, n])
+
+
+def _mejor_ventana(consulta, superior, inferior, radio, candidatas, umbral):
+    """Menor DTW entre las ventanas cuya cota no supera al mejor conocido."""
+    cotas = lb_keogh(candidatas, superior, inferior)
+    orden = np.argsort(cotas)
+    mejor, indice, calculadas = np.inf, -1, 0
+    for inicio in range(0, len(orden), TAMANO_LOTE_DTW):
+        limite = min(mejor, umbral)
+        lote = orden[inicio:inicio + TAMANO_LOTE_DTW]
+        lote = lote[cotas[lote] < limite]
+        if len(lote) == 0:
+            break  # Las cotas están ordenadas: ninguna ventana restante puede mejorar
+        distancias = dtw_lote(consulta, candidatas[lote], radio)
+        calculadas += len(lote)
+        if distancias.min() < mejor:
+            mejor, indice = float(distancias.min()), int(lote[np.argmin(distancias)])
+    return mejor, indice, calculadas
+
+
+def _buscar_en_rutas(argumentos):
+    consulta, largo_km, tipo, radio, paso_ventana_km, k, rutas = argumentos
+    superior, inferior = envolvente(consulta, radio)
+    mejores = []  # Heap de (-distancia, ...) con los k mejores de este lote de rutas
+    total_ventanas = total_calculadas = cortas = 0
+    for nombre, kms, altitudes in rutas:
+        if kms[-1] < largo_km:
+            cortas += 1
+            continue
+        inicios = np.arange(0, kms[-1] - largo_km + 1e-9, paso_ventana_km)
+        candidatas = ventanas(kms, altitudes, inicios, largo_km, len(consulta), tipo)
+        umbral = -mejores[0][0] if len(mejores) == k else np.inf
+        distancia, indice, calculadas = _mejor_ventana(consulta, superior, inferior, radio, candidatas, umbral)
+        total_ventanas += len(inicios)
+        total_calculadas += calculadas
+        if indice >= 0:
+            resultado = (-distancia, nombre, float(inicios[indice]))
+            if len(mejores) < k:
+                heapq.heappush(mejores, resultado)
+            else:
+                heapq.heappushpop(mejores, resultado)
+    return [(-d, nombre, km) for d, nombre, km in mejores], total_ventanas, total_calculadas, cortas
+
+
+def buscar_similares(etapa, km_inicio, km_fin, rutas, k=5, tipo="altitud", puntos=PUNTOS_SERIE, banda=BANDA,
+                     paso_ventana_km=PASO_VENTANA_KM, procesos=None):
+    """
+    Rutas de la biblioteca con el tramo más parecido a un tramo de una etapa.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        km_inicio: Inicio del tramo de carrera
+        km_fin: Fin del tramo de carrera
+        rutas: Lista de tuplas (nombre, kms, altitudes) de cargar_biblioteca()
+        k: Cantidad de rutas a devolver
+        tipo: Serie comparada, "altitud" (relativa) o "pendiente"
+        puntos: Puntos de cada serie
+        banda: Ancho de la banda de DTW como fracción de la serie
+        paso_ventana_km: Separación entre ventanas candidatas en cada ruta
+        procesos: Cantidad de procesos (default: CPUs disponibles; 1 = sin pool)
+
+    Returns:
+        Dict con "resultados" (lista de dicts con "ruta", "km_inicio",
+        "km_fin" y "distancia", en m RMS o % RMS según el tipo, de menor a
+        mayor), "ventanas", "dtw_calculados" y "rutas_cortas"
+    """
+    if tipo not in TIPOS_SERIE:
+        raise ValueError(f"Tipo de serie inválido: {tipo}")
+    largo_km = km_fin - km_inicio
+    if largo_km <= 0:
+        raise ValueError("El tramo de carrera debe tener largo positivo")
+    perfil = np.asarray(etapa["perfil"], dtype=np.float64)
+    consulta = ventanas(perfil[:, 0], perfil[:, 1], [km_inicio], largo_km, puntos, tipo)[0]
+    radio = max(1, int(round(banda * puntos)))
+
+    # Varios lotes por proceso para repartir bien rutas de distinto largo
+    cantidad = max(1, len(rutas) // (4 * (procesos or 8)))
+    lotes = [
+        (consulta, largo_km, tipo, radio, paso_ventana_km, k, rutas[i:i + cantidad])
+        for i in range(0, len(rutas), cantidad)
+    ]
+    if procesos == 1:
+        parciales = list(map(_buscar_en_rutas, lotes))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            parciales = list(pool.map(_buscar_en_rutas, lotes))
+
+    encontrados = heapq.nsmallest(k, (r for mejores, *_ in parciales for r in mejores))
+    return {
+        "resultados": [
+            {
+                "ruta": nombre,
+                "km_inicio": km,
+                "km_fin": km + largo_km,
+                "distancia": distancia / np.sqrt(puntos),
+            }
+            for distancia, nombre, km in encontrados
+        ],
+        "ventanas": sum(p[1] for p in parciales),
+        "dtw_calculados": sum(p[2] for p in parciales),
+        "rutas_cortas": sum(p[3] for p in parciales),
+    }
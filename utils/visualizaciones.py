@@ -2,18 +2,26 @@
 Funciones de visualización con Plotly para El Cruce Analyzer
 """
 
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 
+from data.modelo import modelo_etapa
+from utils.comparacion import desnivel_acumulado, diferencias, matriz_similitud, pendiente_movil
+from utils.perfiles import remuestrear_perfiles
 
-def grafico_altimetria(etapa, mostrar_oasis=True):
+COLORES = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f']
+
+
+def grafico_altimetria(etapa, mostrar_oasis=True, segmentos=None):
     """
     Crea gráfico de altimetría para una etapa.
     
     Args:
         etapa: Dict con datos de la etapa
         mostrar_oasis: Bool para mostrar ubicación de oasis
+        segmentos: Lista de segmentos para sombrear subidas y bajadas (opcional)
     
     Returns:
         Figura de Plotly
@@ -37,6 +45,26 @@ def grafico_altimetria(etapa, mostrar_oasis=True):
         hovertemplate='<b>Km %{x:.1f}</b><br>Altitud: %{y}m<extra></extra>'
     ))
     
+    # Sombrear subidas y bajadas
+    if segmentos:
+        colores_segmento = {
+            "subida": 'rgba(214, 39, 40, 0.12)',
+            "bajada": 'rgba(44, 160, 44, 0.12)',
+        }
+        for segmento in segmentos:
+            if segmento["tipo"] not in colores_segmento:
+                continue
+            fig.add_vrect(
+                x0=segmento["km_inicio"],
+                x1=segmento["km_fin"],
+                fillcolor=colores_segmento[segmento["tipo"]],
+                line_width=0,
+                layer="below",
+                annotation_text=f"{segmento['pendiente_media']:+.0f}%",
+                annotation_position="top left",
+                annotation_font_size=10
+            )
+    
     # Agregar marcadores de oasis si está habilitado
     if mostrar_oasis and etapa.get("oasis"):
         for oasis in etapa["oasis"]:
@@ -75,6 +103,435 @@ def grafico_altimetria(etapa, mostrar_oasis=True):
     return fig
 
 
+def grafico_bandas_pendiente(bandas):
+    """
+    Distancia y tiempo previsto en cada banda de pendiente.
+    
+    Args:
+        bandas: Lista devuelta por tiempo_en_bandas()
+    
+    Returns:
+        Figura de Plotly
+    """
+    nombres = [b["banda"] for b in bandas]
+    
+    fig = make_subplots(
+        rows=1, cols=2,
+        subplot_titles=('Distancia (km)', 'Tiempo previsto (min)'),
+        shared_yaxes=True
+    )
+    
+    fig.add_trace(
+        go.Bar(
+            y=nombres,
+            x=[b["distancia_km"] for b in bandas],
+            orientation='h',
+            marker_color='#1f77b4',
+            text=[f"{b['distancia_km']:.1f} km ({b['porcentaje']:.0f}%)" for b in bandas],
+            textposition='auto',
+            hovertemplate='<b>%{y}</b><br>%{x:.1f} km<extra></extra>'
+        ),
+        row=1, col=1
+    )
+    
+    fig.add_trace(
+        go.Bar(
+            y=nombres,
+            x=[b["tiempo_min"] for b in bandas],
+            orientation='h',
+            marker_color='#ff7f0e',
+            text=[f"{b['tiempo_min']:.0f} min" for b in bandas],
+            textposition='auto',
+            hovertemplate='<b>%{y}</b><br>%{x:.0f} min<extra></extra>'
+        ),
+        row=1, col=2
+    )
+    
+    fig.update_layout(
+        showlegend=False,
+        height=350,
+        template="plotly_white",
+        margin=dict(l=50, r=50, t=60, b=50)
+    )
+    
+    return fig
+
+
+def grafico_histograma_pendientes(centros, distancias, ancho_pct=1.0):
+    """
+    Histograma de distancia por pendiente.
+    
+    Args:
+        centros: Centros de los bins en %
+        distancias: Distancia en km de cada bin
+        ancho_pct: Ancho de los bins en %
+    
+    Returns:
+        Figura de Plotly
+    """
+    colores = ['#2ca02c' if c < -3 else '#d62728' if c > 3 else '#7f7f7f' for c in centros]
+    
+    fig = go.Figure(go.Bar(
+        x=centros,
+        y=distancias,
+        width=ancho_pct * 0.9,
+        marker_color=colores,
+        hovertemplate='%{x:.1f}%<br>%{y:.2f} km<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title="Histograma de Pendientes",
+        xaxis_title="Pendiente (%)",
+        yaxis_title="Distancia (km)",
+        height=350,
+        template="plotly_white",
+        showlegend=False,
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    
+    return fig
+
+
+def grafico_mapa_ruta(trazados, puntos, zoom):
+    """
+    Mapa del recorrido con oasis, largadas y llegadas.
+    
+    Args:
+        trazados: Lista de tuplas (nombre, ruta) con arrays "km", "lat" y "lon"
+        puntos: Lista de dicts de puntos_interes()
+        zoom: Nivel de zoom inicial
+    
+    Returns:
+        Figura de Plotly
+    """
+    fig = go.Figure()
+    
+    for i, (nombre, ruta) in enumerate(trazados):
+        fig.add_trace(go.Scattermapbox(
+            lat=ruta["lat"],
+            lon=ruta["lon"],
+            customdata=ruta["km"],
+            mode='lines',
+            name=nombre,
+            line=dict(color=COLORES[i % len(COLORES)], width=4),
+            hovertemplate='<b>' + nombre + '</b><br>Km %{customdata:.1f}<extra></extra>'
+        ))
+    
+    estilos = {
+        "oasis": ('#d62728', 12, "💧 "),
+        "largada": ('#2ca02c', 14, "🏁 "),
+        "llegada": ('#000000', 14, "🏕️ "),
+    }
+    for tipo, (color, tamano, icono) in estilos.items():
+        seleccion = [p for p in puntos if p["tipo"] == tipo]
+        if not seleccion:
+            continue
+        fig.add_trace(go.Scattermapbox(
+            lat=[p["lat"] for p in seleccion],
+            lon=[p["lon"] for p in seleccion],
+            mode='markers',
+            name=tipo.capitalize(),
+            marker=dict(size=tamano, color=color),
+            text=[icono + p["nombre"] for p in seleccion],
+            hovertemplate='<b>%{text}</b><extra></extra>'
+        ))
+    
+    todas_lats = [lat for _, ruta in trazados for lat in (ruta["lat"].min(), ruta["lat"].max())]
+    todas_lons = [lon for _, ruta in trazados for lon in (ruta["lon"].min(), ruta["lon"].max())]
+    fig.update_layout(
+        mapbox=dict(
+            style="open-street-map",
+            center=dict(lat=(min(todas_lats) + max(todas_lats)) / 2, lon=(min(todas_lons) + max(todas_lons)) / 2),
+            zoom=zoom
+        ),
+        height=550,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=0, r=0, t=40, b=0)
+    )
+    
+    return fig
+
+
+def grafico_curva_pace(curva):
+    """
+    Curva personal de pace según pendiente.
+    
+    Args:
+        curva: Dict devuelto por ajustar_curva()
+    
+    Returns:
+        Figura de Plotly
+    """
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=curva["centros"],
+        y=curva["mediana"],
+        mode='markers',
+        name='Mediana por pendiente',
+        marker=dict(color='#1f77b4', size=9),
+        error_y=dict(
+            type='data',
+            symmetric=False,
+            array=curva["p75"] - curva["mediana"],
+            arrayminus=curva["mediana"] - curva["p25"],
+            color='rgba(31, 119, 180, 0.4)'
+        ),
+        customdata=curva["muestras"],
+        hovertemplate='%{x:.0f}%: %{y:.1f} min/km<br>%{customdata} tramos<extra></extra>'
+    ))
+    
+    pendientes = np.linspace(curva["pendiente_minima"], curva["pendiente_maxima"], 100)
+    fig.add_trace(go.Scatter(
+        x=pendientes,
+        y=np.polyval(curva["coeficientes"], pendientes),
+        mode='lines',
+        name='Curva ajustada',
+        line=dict(color='#ff7f0e', width=3),
+        hovertemplate='%{x:.1f}%: %{y:.1f} min/km<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title="Tu Pace según la Pendiente",
+        xaxis_title="Pendiente (%)",
+        yaxis_title="Pace (min/km)",
+        height=400,
+        template="plotly_white",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+
+    return fig
+
+
+def grafico_demora_olas(planes):
+    """
+    Demora media por cola de cada ola en uno o más planes de largada.
+
+    Args:
+        planes: Lista de tuplas (nombre, olas, resultado) con el array de ola
+            por corredor y el dict de simular_largada()
+
+    Returns:
+        Figura de Plotly
+    """
+    fig = go.Figure()
+
+    for i, (nombre, olas, resultado) in enumerate(planes):
+        corredores = np.bincount(olas)
+        media = np.bincount(olas, weights=resultado["demora_min"]) / np.maximum(corredores, 1)
+        fig.add_trace(go.Bar(
+            x=[f"Ola {ola + 1}" for ola in range(len(corredores))],
+            y=media,
+            name=nombre,
+            marker_color=COLORES[i % len(COLORES)],
+            customdata=corredores,
+            hovertemplate='<b>' + nombre + '</b><br>%{y:.1f} min de demora<br>%{customdata} corredores<extra></extra>'
+        ))
+
+    fig.update_layout(
+        title="Demora Media por Ola",
+        xaxis_title="Ola",
+        yaxis_title="Demora en senderos (min)",
+        barmode='group',
+        height=400,
+        template="plotly_white",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+
+    return fig
+
+
+def grafico_carga_oasis(curvas):
+    """
+    Llegadas por franja horaria a cada oasis con su banda de incertidumbre.
+
+    Args:
+        curvas: Dict devuelto por PronosticoOasis.curvas()
+
+    Returns:
+        Figura de Plotly
+    """
+    fig = go.Figure()
+    horas = curvas["inicio_min"] / 60
+
+    for i, nombre in enumerate(curvas["oasis"]):
+        color = COLORES[i % len(COLORES)]
+        r, g, b = (int(color[k:k + 2], 16) for k in (1, 3, 5))
+        fig.add_trace(go.Scatter(
+            x=np.concatenate((horas, horas[::-1])),
+            y=np.concatenate((curvas["superior"][i], curvas["inferior"][i][::-1])),
+            fill='toself',
+            fillcolor=f'rgba({r}, {g}, {b}, 0.2)',
+            line=dict(width=0),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+        fig.add_trace(go.Scatter(
+            x=horas,
+            y=curvas["esperados"][i],
+            mode='lines',
+            name=nombre,
+            line=dict(color=color, width=3, shape='hv'),
+            customdata=np.stack((curvas["inferior"][i], curvas["superior"][i]), axis=-1),
+            hovertemplate='<b>' + nombre + '</b><br>%{y:.0f} corredores (%{customdata[0]:.0f}-%{customdata[1]:.0f})<extra></extra>'
+        ))
+
+    fig.update_layout(
+        title="Llegadas por Franja Horaria",
+        xaxis_title="Horas desde la largada",
+        yaxis_title="Corredores por franja",
+        hovermode='x unified',
+        height=450,
+        template="plotly_white",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=50, r=50, t=100, b=50)
+    )
+
+    return fig
+
+
+def grafico_rutas_similares(etapa, km_inicio, km_fin, coincidencias):
+    """
+    Altitud relativa de un tramo de carrera y de las rutas más parecidas.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        km_inicio: Inicio del tramo de carrera
+        km_fin: Fin del tramo de carrera
+        coincidencias: Lista de tuplas (nombre, kms, altitudes, km_inicio) con
+            el perfil de cada ruta y dónde empieza su tramo parecido
+
+    Returns:
+        Figura de Plotly
+    """
+    largo = km_fin - km_inicio
+    grilla = np.linspace(0, largo, 200)
+    perfil = np.asarray(etapa["perfil"], dtype=np.float64)
+    tramo = np.interp(km_inicio + grilla, perfil[:, 0], perfil[:, 1])
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=grilla,
+        y=tramo - tramo[0],
+        mode='lines',
+        name=f"{etapa['nombre']} (km {km_inicio:g}-{km_fin:g})",
+        line=dict(color='#1f77b4', width=4),
+        hovertemplate='km %{x:.1f}: %{y:+.0f}m<extra></extra>'
+    ))
+
+    for i, (nombre, kms, altitudes, inicio) in enumerate(coincidencias):
+        serie = np.interp(inicio + grilla, kms, altitudes)
+        fig.add_trace(go.Scatter(
+            x=grilla,
+            y=serie - serie[0],
+            mode='lines',
+            name=f"{nombre} (km {inicio:g}-{inicio + largo:g})",
+            line=dict(color=COLORES[(i + 1) % len(COLORES)], width=2, dash='dot'),
+            hovertemplate='km %{x:.1f}: %{y:+.0f}m<extra></extra>'
+        ))
+
+    fig.update_layout(
+        title="Tramo de Carrera vs Rutas de Entrenamiento",
+        xaxis_title="Distancia desde el inicio del tramo (km)",
+        yaxis_title="Altitud relativa (m)",
+        hovermode='x unified',
+        height=450,
+        template="plotly_white",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=50, r=50, t=100, b=50)
+    )
+
+    return fig
+
+
+def grafico_corredores_perfil(etapa, kms, altitudes, dorsales):
+    """
+    Posición de los corredores en carrera sobre el perfil de una etapa.
+
+    Args:
+        etapa: Dict con datos de la etapa
+        kms: Array con el km de cada corredor
+        altitudes: Array con la altitud del perfil en esos km
+        dorsales: Array de dorsales
+
+    Returns:
+        Figura de Plotly
+    """
+    fig = grafico_altimetria(etapa, mostrar_oasis=True)
+
+    # Scattergl: miles de marcadores sin trabar el navegador
+    fig.add_trace(go.Scattergl(
+        x=kms,
+        y=altitudes,
+        mode='markers',
+        name='Corredores',
+        customdata=dorsales,
+        marker=dict(size=6, color='#ff7f0e', opacity=0.6),
+        hovertemplate='Dorsal %{customdata}<br>Km %{x:.2f} · %{y:.0f}m<extra></extra>'
+    ))
+
+    fig.update_layout(title=f"{etapa['nombre']} - Corredores en el Recorrido", hovermode='closest')
+
+    return fig
+
+
+def grafico_distribucion_pasos(filas, probabilidades):
+    """
+    Bandas de tiempo de paso del pelotón en cada punto de control.
+
+    Args:
+        filas: Lista de dicts de EstadisticasPeloton.distribucion()
+        probabilidades: Probabilidades consultadas, simétricas y ordenadas
+            (por ejemplo 0.1, 0.25, 0.5, 0.75, 0.9)
+
+    Returns:
+        Figura de Plotly
+    """
+    etiquetas = [f"{f['punto']} (km {f['km']:g})" for f in filas]
+    horas = np.array([f["cuantiles"] for f in filas]) / 60
+    medio = len(probabilidades) // 2
+
+    fig = go.Figure()
+
+    # Una banda por par de cuantiles simétricos, de la más ancha a la más angosta
+    for i in range(medio):
+        fig.add_trace(go.Scatter(
+            x=etiquetas, y=horas[:, -1 - i], mode='lines', line=dict(width=0),
+            showlegend=False, hoverinfo='skip'
+        ))
+        fig.add_trace(go.Scatter(
+            x=etiquetas, y=horas[:, i], mode='lines', line=dict(width=0),
+            fill='tonexty', fillcolor=f'rgba(31, 119, 180, {0.15 + 0.15 * i:.2f})',
+            name=f"P{probabilidades[i] * 100:g}-P{probabilidades[-1 - i] * 100:g}",
+            hoverinfo='skip'
+        ))
+
+    fig.add_trace(go.Scatter(
+        x=etiquetas,
+        y=horas[:, medio],
+        mode='lines+markers',
+        name=f"P{probabilidades[medio] * 100:g}",
+        line=dict(color='#1f77b4', width=3),
+        customdata=[f["pasaron"] for f in filas],
+        hovertemplate='%{x}<br>Mediana: %{y:.2f}h<br>Pasaron: %{customdata}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title="Tiempos de Paso del Pelotón",
+        xaxis_title="Punto de control",
+        yaxis_title="Tiempo desde la largada (h)",
+        height=400,
+        template="plotly_white",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+
+    return fig
+
+
 def interpolar_altitud(perfil, km_objetivo):
     """
     Interpola la altitud en un kilómetro específico del perfil.
@@ -176,7 +633,7 @@ def grafico_desnivel_por_km(etapas):
         Figura de Plotly
     """
     nombres = [e["nombre"] for e in etapas]
-    desnivel_km = [e["desnivel_positivo"] / e["distancia_km"] for e in etapas]
+    desnivel_km = [modelo_etapa(e).intensidad_m_km for e in etapas]
     
     fig = go.Figure()
     
@@ -202,36 +659,35 @@ def grafico_desnivel_por_km(etapas):
     return fig
 
 
-def grafico_altimetrias_superpuestas(etapas):
+def grafico_altimetrias_superpuestas(etapas, normalizado=False):
     """
     Superpone los perfiles de altimetría de todas las etapas.
     
     Args:
         etapas: Lista de dicts con datos de etapas
+        normalizado: Si es True el eje x es el % del recorrido de cada etapa
     
     Returns:
         Figura de Plotly
     """
     fig = go.Figure()
     
-    colores = ['#1f77b4', '#ff7f0e', '#2ca02c']
+    grilla, altitudes = remuestrear_perfiles([e["perfil"] for e in etapas], normalizado=normalizado)
+    unidad = "%" if normalizado else "Km "
     
     for i, etapa in enumerate(etapas):
-        distancias = [punto[0] for punto in etapa["perfil"]]
-        altitudes = [punto[1] for punto in etapa["perfil"]]
-        
         fig.add_trace(go.Scatter(
-            x=distancias,
-            y=altitudes,
+            x=grilla,
+            y=altitudes[i],
             mode='lines',
             name=etapa["nombre"],
-            line=dict(color=colores[i], width=3),
-            hovertemplate='<b>' + etapa["nombre"] + '</b><br>Km %{x:.1f}<br>Alt: %{y}m<extra></extra>'
+            line=dict(color=COLORES[i % len(COLORES)], width=3),
+            hovertemplate='<b>' + etapa["nombre"] + '</b><br>' + unidad + '%{x:.1f}<br>Alt: %{y:.0f}m<extra></extra>'
         ))
     
     fig.update_layout(
         title="Comparación de Perfiles de Altimetría",
-        xaxis_title="Distancia (km)",
+        xaxis_title="Recorrido (%)" if normalizado else "Distancia (km)",
         yaxis_title="Altitud (m)",
         hovermode='x unified',
         height=500,
@@ -246,4 +702,162 @@ def grafico_altimetrias_superpuestas(etapas):
         margin=dict(l=50, r=50, t=100, b=50)
     )
     
-    return fig
\ No newline at end of file
+    return fig
+
+
+def grafico_desnivel_acumulado(etapas, normalizado=False):
+    """
+    Curvas de desnivel positivo acumulado de todas las etapas.
+    
+    Args:
+        etapas: Lista de dicts con datos de etapas
+        normalizado: Si es True el eje x es el % del recorrido de cada etapa
+    
+    Returns:
+        Figura de Plotly
+    """
+    grilla, altitudes = remuestrear_perfiles([e["perfil"] for e in etapas], normalizado=normalizado)
+    acumulado = desnivel_acumulado(altitudes)
+    
+    fig = go.Figure()
+    
+    for i, etapa in enumerate(etapas):
+        fig.add_trace(go.Scatter(
+            x=grilla,
+            y=acumulado[i],
+            mode='lines',
+            name=etapa["nombre"],
+            line=dict(color=COLORES[i % len(COLORES)], width=3),
+            hovertemplate='<b>' + etapa["nombre"] + '</b><br>+%{y:.0f}m<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        title="Desnivel Positivo Acumulado",
+        xaxis_title="Recorrido (%)" if normalizado else "Distancia (km)",
+        yaxis_title="Desnivel acumulado (m)",
+        hovermode='x unified',
+        height=450,
+        template="plotly_white",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=50, r=50, t=100, b=50)
+    )
+    
+    return fig
+
+
+def grafico_diferencias_altitud(etapas, referencia=0, normalizado=True):
+    """
+    Diferencia de altitud de cada etapa contra una de referencia.
+    
+    Args:
+        etapas: Lista de dicts con datos de etapas
+        referencia: Índice de la etapa de referencia
+        normalizado: Si es True el eje x es el % del recorrido de cada etapa
+    
+    Returns:
+        Figura de Plotly
+    """
+    grilla, altitudes = remuestrear_perfiles([e["perfil"] for e in etapas], normalizado=normalizado)
+    diferencia = diferencias(altitudes, referencia)
+    
+    fig = go.Figure()
+    
+    for i, etapa in enumerate(etapas):
+        if i == referencia:
+            continue
+        fig.add_trace(go.Scatter(
+            x=grilla,
+            y=diferencia[i],
+            mode='lines',
+            name=etapa["nombre"],
+            line=dict(color=COLORES[i % len(COLORES)], width=3),
+            hovertemplate='<b>' + etapa["nombre"] + '</b><br>%{y:+.0f}m<extra></extra>'
+        ))
+    
+    fig.add_hline(y=0, line_dash="dash", line_color="gray")
+    fig.update_layout(
+        title=f"Altitud respecto de la {etapas[referencia]['nombre']}",
+        xaxis_title="Recorrido (%)" if normalizado else "Distancia (km)",
+        yaxis_title="Diferencia de altitud (m)",
+        hovermode='x unified',
+        height=450,
+        template="plotly_white",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=50, r=50, t=100, b=50)
+    )
+    
+    return fig
+
+
+def grafico_pendiente_movil(etapas, ventana_km=1.0):
+    """
+    Pendiente media sobre una ventana móvil de todas las etapas.
+    
+    Args:
+        etapas: Lista de dicts con datos de etapas
+        ventana_km: Ancho de la ventana en km
+    
+    Returns:
+        Figura de Plotly
+    """
+    grilla, altitudes = remuestrear_perfiles([e["perfil"] for e in etapas])
+    pendientes = pendiente_movil(grilla, altitudes, ventana_km)
+    
+    fig = go.Figure()
+    
+    for i, etapa in enumerate(etapas):
+        fig.add_trace(go.Scatter(
+            x=grilla,
+            y=pendientes[i],
+            mode='lines',
+            name=etapa["nombre"],
+            line=dict(color=COLORES[i % len(COLORES)], width=2),
+            hovertemplate='<b>' + etapa["nombre"] + '</b><br>Km %{x:.1f}<br>%{y:+.1f}%<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        title=f"Pendiente Media en Ventanas de {ventana_km:g} km",
+        xaxis_title="Distancia (km)",
+        yaxis_title="Pendiente (%)",
+        hovermode='x unified',
+        height=450,
+        template="plotly_white",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=50, r=50, t=100, b=50)
+    )
+    
+    return fig
+
+
+def grafico_similitud(etapas):
+    """
+    Mapa de calor de la similitud de forma entre perfiles.
+    
+    Args:
+        etapas: Lista de dicts con datos de etapas
+    
+    Returns:
+        Figura de Plotly
+    """
+    _, altitudes = remuestrear_perfiles([e["perfil"] for e in etapas], normalizado=True)
+    nombres = [e["nombre"] for e in etapas]
+    
+    fig = go.Figure(go.Heatmap(
+        z=matriz_similitud(altitudes),
+        x=nombres,
+        y=nombres,
+        zmin=0,
+        zmax=1,
+        colorscale='Blues',
+        texttemplate='%{z:.2f}',
+        hovertemplate='%{y} vs %{x}<br>Similitud: %{z:.2f}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title="Similitud de Perfiles (forma sobre % del recorrido)",
+        height=400,
+        template="plotly_white",
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    
+    return fig